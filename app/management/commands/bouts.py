@@ -1,11 +1,19 @@
 import asyncio
 
 from asgiref.sync import sync_to_async
+from django.db.models import Q
 
 from app.management.commands import AsyncBaseCommand
 from app.models import Basho, Bout, Division, Rikishi
+from libs.head_to_head import refresh_head_to_head
+from libs.ingest import finish_job, job_name, save_checkpoint, start_job
 from libs.sumoapi import SumoApiClient
 
+# Rikishi whose bouts are saved together before the job cursor advances
+CHUNK_SIZE = 50
+# Fields of the ``unique_bout`` constraint
+BOUT_KEY = ("basho_id", "day", "match_no", "east_id", "west_id")
+
 
 @sync_to_async
 def get_rikishi_map():
@@ -21,12 +29,35 @@ def get_division_map():
     return {d.name: d for d in Division.objects.all()}
 
 
+@sync_to_async
+def get_existing_bout_keys(rikishi_ids, basho_id=None):
+    """Return unique keys of stored bouts involving ``rikishi_ids``."""
+
+    qs = Bout.objects.filter(
+        Q(east_id__in=rikishi_ids) | Q(west_id__in=rikishi_ids)
+    )
+    if basho_id:
+        qs = qs.filter(basho_id=basho_id)
+    return set(qs.values_list(*BOUT_KEY))
+
+
+def bout_key(bout):
+    """Return the ``unique_bout`` key of an unsaved ``Bout``."""
+
+    return tuple(getattr(bout, field) for field in BOUT_KEY)
+
+
 class Command(AsyncBaseCommand):
     help = "Import bouts for a rikishi"
 
     def add_arguments(self, parser):
         parser.add_argument("rikishi_id", nargs="?", type=int)
         parser.add_argument("--basho", dest="basho_id")
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted run after its last checkpoint",
+        )
 
     async def rikishi_id_iter(self, rikishi_id=None):
         """Yield one or more rikishi IDs."""
@@ -35,13 +66,13 @@ class Command(AsyncBaseCommand):
             yield rikishi_id
             return
 
-        qs = Rikishi.objects.values_list("id", flat=True)
+        qs = Rikishi.objects.values_list("id", flat=True).order_by("id")
         async for rid in qs.aiterator():
             yield rid
 
-    async def _process_rikishi(self, api, rikishi_id, params, sem, rmap, dmap):
-        async with sem:
-            data = await api.get_rikishi_matches(rikishi_id, **params)
+    async def _process_rikishi(self, api, rikishi_id, params, rmap, dmap):
+        # Concurrency is limited by the client's adaptive limiter
+        data = await api.get_rikishi_matches(rikishi_id, **params)
 
         records = data.get("records") or []
         bouts = []
@@ -70,31 +101,65 @@ class Command(AsyncBaseCommand):
             )
         return bouts
 
-    async def run(self, rikishi_id=None, basho_id=None, **options):
+    async def run(
+        self, rikishi_id=None, basho_id=None, resume=False, **options
+    ):
         async with SumoApiClient() as api:
             params = {"bashoId": basho_id} if basho_id else {}
+            job = await sync_to_async(start_job)(
+                job_name("bouts", rikishi=rikishi_id, basho=basho_id), resume
+            )
             rikishi_map, division_map = await asyncio.gather(
                 get_rikishi_map(), get_division_map()
             )
-            semaphore = asyncio.Semaphore(10)
-            tasks = []
-            async for rid in self.rikishi_id_iter(rikishi_id):
-                task = asyncio.create_task(
-                    self._process_rikishi(
-                        api,
-                        rid,
-                        params,
-                        semaphore,
-                        rikishi_map,
-                        division_map,
+            ids = [rid async for rid in self.rikishi_id_iter(rikishi_id)]
+            if job.last_rikishi_id is not None:
+                self.stdout.write(
+                    f"Resuming after rikishi {job.last_rikishi_id}"
+                )
+                ids = [rid for rid in ids if rid > job.last_rikishi_id]
+
+            oldest = job.oldest_basho
+            imported = 0
+            for start in range(0, len(ids), CHUNK_SIZE):
+                chunk = ids[start : start + CHUNK_SIZE]
+                results = await asyncio.gather(
+                    *(
+                        self._process_rikishi(
+                            api,
+                            rid,
+                            params,
+                            rikishi_map,
+                            division_map,
+                        )
+                        for rid in chunk
                     )
                 )
-                tasks.append(task)
-            results = await asyncio.gather(*tasks)
-            bouts = [b for sub in results for b in sub]
-            if bouts:
-                await Bout.objects.abulk_create(
-                    bouts, batch_size=500, ignore_conflicts=True
+                # Only new bouts change head-to-head records
+                existing = await get_existing_bout_keys(chunk, basho_id)
+                new = {}
+                for bout in (b for sub in results for b in sub):
+                    key = bout_key(bout)
+                    if key not in existing:
+                        new.setdefault(key, bout)
+                bouts = list(new.values())
+                if bouts:
+                    await Bout.objects.abulk_create(
+                        bouts, batch_size=500, ignore_conflicts=True
+                    )
+                    oldest = min(
+                        [b.basho_id for b in bouts]
+                        + ([oldest] if oldest else [])
+                    )
+                    imported += len(bouts)
+                await sync_to_async(save_checkpoint)(
+                    job, last_rikishi_id=chunk[-1], oldest_basho=oldest
                 )
-            msg = self.style.SUCCESS(f"Imported {len(bouts)} bouts")
+
+            if oldest:
+                # Records are cumulative, so rebuild from the oldest basho
+                # that gained bouts, including those saved before a resume
+                await sync_to_async(refresh_head_to_head)(oldest)
+            await sync_to_async(finish_job)(job)
+            msg = self.style.SUCCESS(f"Imported {imported} bouts")
             self.stdout.write(msg)
@@ -1,405 +1,252 @@
-import csv
-from collections import defaultdict, deque
-from datetime import date
+import os
+import time
+
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.core.management.base import CommandError
 
 from app.management.commands import AsyncBaseCommand
-from app.models import BashoHistory, BashoRating, Bout, Heya, Shusshin
-from libs.constants import RECENT_BOUT_WINDOW
+from app.models import Basho, BashoHistory, BashoRating, Heya, Rikishi, Shusshin
+from libs.boutstore import BoutStore
+from libs.dataset import (
+    FORMATS,
+    FeatureState,
+    append_dataset,
+    avg_rating_change,
+    build_features_sharded,
+    guess_format,
+    rank_values,
+    sort_bouts,
+    state_path,
+    write_dataset,
+)
+
+
+def _codes(values, slugs):
+    """Map slugs to their position in ``slugs`` (``NaN`` when missing)."""
+    mapping = {slug: idx for idx, slug in enumerate(slugs)}
+    return pd.Series(values, dtype=object).map(mapping).astype(float)
+
+
+def load_tables(state=None):
+    """Load every table needed by :func:`libs.dataset.build_features`.
+
+    With a :class:`FeatureState` only bouts, histories and ratings after
+    ``state.basho`` are loaded and rating changes continue from the state.
+    """
+    after = state.basho if state else ""
+    heya_slugs = list(
+        Heya.objects.order_by("slug").values_list("slug", flat=True)
+    )
+    shusshin_slugs = list(
+        Shusshin.objects.order_by("slug").values_list("slug", flat=True)
+    )
+
+    basho = pd.DataFrame(
+        Basho.objects.order_by("slug").values_list(
+            "slug", "year", "month", "start_date"
+        ),
+        columns=["slug", "year", "month", "start"],
+    ).set_index("slug")
+    fallback = pd.to_datetime(
+        {"year": basho["year"], "month": basho["month"], "day": 1}
+    )
+    basho["start"] = pd.to_datetime(basho["start"]).fillna(fallback)
+
+    rikishi = pd.DataFrame(
+        Rikishi.objects.order_by().values_list(
+            "id",
+            "birth_date",
+            "debut",
+            "height",
+            "weight",
+            "heya_id",
+            "shusshin_id",
+        ),
+        columns=[
+            "id",
+            "birth_date",
+            "debut",
+            "height",
+            "weight",
+            "heya",
+            "shusshin",
+        ],
+    ).set_index("id")
+    for column in ("birth_date", "debut"):
+        rikishi[column] = pd.to_datetime(rikishi[column])
+    for column in ("height", "weight"):
+        rikishi[column] = rikishi[column].astype(float)
+    rikishi["heya"] = _codes(rikishi["heya"], heya_slugs)
+    rikishi["shusshin"] = _codes(rikishi["shusshin"], shusshin_slugs)
+
+    history = pd.DataFrame(
+        BashoHistory.objects.filter(basho_id__gt=after)
+        .order_by()
+        .values_list(
+            "rikishi_id",
+            "basho_id",
+            "height",
+            "weight",
+            "rank__division__level",
+            "rank__order",
+            "rank__direction",
+        ),
+        columns=[
+            "rikishi",
+            "basho",
+            "height",
+            "weight",
+            "level",
+            "order",
+            "direction",
+        ],
+    )
+    history["rank"] = rank_values(
+        history["level"], history["order"], history["direction"]
+    ).astype(float)
+    history = history.set_index(["rikishi", "basho"])[
+        ["rank", "height", "weight"]
+    ].astype(float)
+
+    ratings = pd.DataFrame(
+        BashoRating.objects.filter(basho_id__gt=after)
+        .order_by()
+        .values_list(
+            "rikishi_id",
+            "basho_id",
+            "previous_rating",
+            "previous_rd",
+            "previous_vol",
+            "rating",
+        ),
+        columns=[
+            "rikishi",
+            "basho",
+            "previous_rating",
+            "previous_rd",
+            "previous_vol",
+            "rating",
+        ],
+    )
+    change = avg_rating_change(ratings, prior=state and state.changes)
+    ratings = ratings.set_index(["rikishi", "basho"])
+    ratings["avg_change"] = change.reindex(ratings.index)
+
+    store = BoutStore.load()
+    if state:
+        done = store.basho_slice(state.basho)
+        if done.stop - done.start != state.bouts:
+            raise CommandError(
+                f"Bouts of {state.basho} changed since the last export; "
+                "run a full export"
+            )
+        store = store.take(slice(done.stop, None))
+    bouts = sort_bouts(
+        pd.DataFrame(
+            {
+                "basho": store.basho_slugs[store.basho],
+                "division": store.division,
+                "day": store.day,
+                "match_no": store.match_no,
+                "east": store.east,
+                "west": store.west,
+                "east_win": store.east_win,
+            }
+        )
+    )
+    return (
+        heya_slugs,
+        shusshin_slugs,
+        {
+            "bouts": bouts,
+            "basho": basho,
+            "rikishi": rikishi,
+            "history": history,
+            "ratings": ratings,
+        },
+    )
 
 
 class Command(AsyncBaseCommand):
-    """Export bout data as a CSV training dataset."""
+    """Export bout data as a training dataset."""
 
     help = "Generate dataset for ML training"
 
     def add_arguments(self, parser):
-        parser.add_argument("outfile", help="CSV file path")
-
-    async def run(self, outfile, **options):
-        heya_slugs = [
-            s
-            async for s in Heya.objects.order_by("slug").values_list(
-                "slug", flat=True
-            )
-        ]
-        shusshin_slugs = [
-            s
-            async for s in Shusshin.objects.order_by("slug").values_list(
-                "slug", flat=True
-            )
-        ]
-        heya_map = {slug: idx for idx, slug in enumerate(heya_slugs)}
-        shusshin_map = {slug: idx for idx, slug in enumerate(shusshin_slugs)}
-
-        headers = [
-            "year",
-            "month",
-            "division",
-            "day",
-            "match_no",
-            "east_id",
-            "west_id",
-            "east_rank",
-            "west_rank",
-            "east_rating",
-            "west_rating",
-            "east_rd",
-            "west_rd",
-            "east_vol",
-            "west_vol",
-            "east_height",
-            "west_height",
-            "east_weight",
-            "west_weight",
-            "east_bmi",
-            "west_bmi",
-            "east_age",
-            "west_age",
-            "east_experience",
-            "west_experience",
-            "east_record",
-            "west_record",
-            "rating_diff",
-            "height_diff",
-            "weight_diff",
-            "age_diff",
-            "experience_diff",
-            "record_diff",
-            "rank_diff",
-            "rd_diff",
-            "vol_diff",
-            "bmi_diff",
-            "same_heya",
-            "same_shusshin",
-            "east_heya",
-            "west_heya",
-            "east_shusshin",
-            "west_shusshin",
-            "east_win_rate",
-            "west_win_rate",
-            "east_streak",
-            "west_streak",
-            "east_avg_rating_change",
-            "west_avg_rating_change",
-        ]
-        headers.append("east_win")
-        with open(outfile, "w", newline="") as fh:
-            writer = csv.writer(fh)
-            writer.writerow(headers)
-
-            self.stdout.write("Querying basho histories...")
-            hist_map: dict[tuple[int, int], BashoHistory] = {}
-            async for hist in BashoHistory.objects.select_related(
-                "rank__division"
-            ).aiterator(chunk_size=1000):
-                hist_map[(hist.rikishi_id, hist.basho_id)] = hist
-
-            self.stdout.write("Querying ratings...")
-            rating_map: dict[tuple[int, int], BashoRating] = {}
-            rating_history: dict[int, list[BashoRating]] = defaultdict(list)
-            rating_qs = BashoRating.objects.select_related("basho")
-            async for rating in rating_qs.aiterator(chunk_size=1000):
-                rating_map[(rating.rikishi_id, rating.basho_id)] = rating
-                rating_history[rating.rikishi_id].append(rating)
-
-            avg_change_map: dict[tuple[int, int], float] = {}
-            for rikishi_id, ratings in rating_history.items():
-                ratings.sort(key=lambda r: (r.basho.year, r.basho.month))
-                changes: deque[float] = deque(maxlen=3)
-                for rec in ratings:
-                    avg = sum(changes) / len(changes) if changes else 0.0
-                    avg_change_map[(rikishi_id, rec.basho_id)] = round(avg, 2)
-                    changes.append(rec.rating - rec.previous_rating)
-
-            self.stdout.write("Querying bouts...")
-            qs = Bout.objects.select_related(
-                "basho",
-                "east__heya",
-                "west__heya",
-                "east__shusshin",
-                "west__shusshin",
-                "division",
-            ).order_by(
-                "basho__year",
-                "basho__month",
-                "day",
-                "-division",
-                "match_no",
-            )
-
-            processed = 0
-            step = 1000
-            totals_map: dict[tuple[int, int], dict[int, int]] = {}
-            start_map: dict[tuple[int, int, date], dict[int, int]] = {}
-            recent_results: defaultdict[int, deque[int]] = defaultdict(
-                lambda: deque(maxlen=RECENT_BOUT_WINDOW)
+        parser.add_argument("outfile", help="Output file path")
+        parser.add_argument(
+            "--format",
+            dest="fmt",
+            choices=FORMATS,
+            help=(
+                "Output format; feather is the Arrow IPC file format. "
+                "Defaults to the outfile suffix, else csv"
+            ),
+        )
+        parser.add_argument(
+            "--append",
+            action="store_true",
+            help=(
+                "Only add bouts newer than the last export, continuing from "
+                "the state file saved beside OUTFILE"
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            metavar="N",
+            help="Split the bouts into N era shards built in parallel",
+        )
+
+    async def run(self, outfile, fmt=None, append=False, workers=1, **options):
+        fmt = fmt or guess_format(outfile)
+        started = time.perf_counter()
+        state = None
+        if append:
+            path = state_path(outfile)
+            if not path.exists() or not os.path.exists(outfile):
+                raise CommandError(
+                    f"No previous export found at {outfile}; "
+                    "run without --append first"
+                )
+            state = FeatureState.load(path)
+            self.stdout.write(f"Appending bouts after {state.basho}...")
+
+        self.stdout.write("Loading tables...")
+        heya, shusshin, tables = await sync_to_async(load_tables)(state)
+        if state and (heya != state.heya or shusshin != state.shusshin):
+            raise CommandError(
+                "Heya or shusshin list changed since the last export; "
+                "run a full export"
             )
-            streaks: defaultdict[int, int] = defaultdict(int)
-
-            async for bout in qs.aiterator(chunk_size=1000):
-                start = bout.basho.start_date or date(
-                    bout.basho.year,
-                    bout.basho.month,
-                    1,
-                )
-                pair = tuple(sorted((bout.east_id, bout.west_id)))
-
-                totals = totals_map.setdefault(
-                    pair,
-                    {bout.east_id: 0, bout.west_id: 0},
-                )
-                start_key = (pair[0], pair[1], start)
-                if start_key not in start_map:
-                    start_map[start_key] = totals.copy()
-
-                prior_counts = start_map[start_key]
-
-                east_hist = hist_map.get((bout.east_id, bout.basho_id))
-                west_hist = hist_map.get((bout.west_id, bout.basho_id))
-                east_rating = rating_map.get((bout.east_id, bout.basho_id))
-                west_rating = rating_map.get((bout.west_id, bout.basho_id))
-
-                east_win_rate = (
-                    sum(recent_results[bout.east_id])
-                    / len(recent_results[bout.east_id])
-                    if recent_results[bout.east_id]
-                    else 0.0
-                )
-                west_win_rate = (
-                    sum(recent_results[bout.west_id])
-                    / len(recent_results[bout.west_id])
-                    if recent_results[bout.west_id]
-                    else 0.0
-                )
-                east_streak = streaks[bout.east_id]
-                west_streak = streaks[bout.west_id]
-                east_avg_change = avg_change_map.get(
-                    (bout.east_id, bout.basho_id),
-                    0.0,
-                )
-                west_avg_change = avg_change_map.get(
-                    (bout.west_id, bout.basho_id),
-                    0.0,
-                )
-
-                east_record = prior_counts.get(bout.east_id, 0)
-                west_record = prior_counts.get(bout.west_id, 0)
-
-                east_age = (
-                    (start - bout.east.birth_date).days / 365.25
-                    if bout.east.birth_date
-                    else None
-                )
-                west_age = (
-                    (start - bout.west.birth_date).days / 365.25
-                    if bout.west.birth_date
-                    else None
-                )
-                east_experience = (
-                    (start - bout.east.debut).days / 365.25
-                    if bout.east.debut
-                    else None
-                )
-                west_experience = (
-                    (start - bout.west.debut).days / 365.25
-                    if bout.west.debut
-                    else None
-                )
-                east_height = (
-                    east_hist and east_hist.height or bout.east.height or ""
-                )
-                west_height = (
-                    west_hist and west_hist.height or bout.west.height or ""
-                )
-                east_weight = (
-                    east_hist and east_hist.weight or bout.east.weight or ""
-                )
-                west_weight = (
-                    west_hist and west_hist.weight or bout.west.weight or ""
-                )
-                east_bmi = (
-                    round(east_weight / ((east_height / 100) ** 2), 2)
-                    if east_height and east_weight
-                    else ""
-                )
-                west_bmi = (
-                    round(west_weight / ((west_height / 100) ** 2), 2)
-                    if west_height and west_weight
-                    else ""
-                )
-
-                rating_diff = (
-                    round(
-                        east_rating.previous_rating
-                        - west_rating.previous_rating,
-                        2,
-                    )
-                    if east_rating and west_rating
-                    else ""
-                )
-                height_diff = (
-                    round(east_height - west_height, 1)
-                    if east_height and west_height
-                    else ""
-                )
-                weight_diff = (
-                    round(east_weight - west_weight, 1)
-                    if east_weight and west_weight
-                    else ""
-                )
-                age_diff = (
-                    round(east_age - west_age, 2)
-                    if east_age is not None and west_age is not None
-                    else ""
-                )
-                experience_diff = (
-                    round(east_experience - west_experience, 2)
-                    if east_experience is not None
-                    and west_experience is not None
-                    else ""
-                )
-                record_diff = east_record - west_record
-                rank_diff = (
-                    east_hist.rank.value - west_hist.rank.value
-                    if east_hist and west_hist
-                    else ""
-                )
-                east_rd = east_rating.previous_rd if east_rating else ""
-                west_rd = west_rating.previous_rd if west_rating else ""
-                rd_diff = (
-                    round(east_rd - west_rd, 2)
-                    if east_rating and west_rating
-                    else ""
-                )
-                east_vol = (
-                    round(east_rating.previous_vol, 5) if east_rating else ""
-                )
-                west_vol = (
-                    round(west_rating.previous_vol, 5) if west_rating else ""
-                )
-                vol_diff = (
-                    round(east_vol - west_vol, 5)
-                    if east_rating and west_rating
-                    else ""
-                )
-                bmi_diff = (
-                    round(east_bmi - west_bmi, 2)
-                    if east_bmi and west_bmi
-                    else ""
-                )
-
-                same_heya = (
-                    1
-                    if bout.east.heya_id
-                    and bout.west.heya_id
-                    and bout.east.heya_id == bout.west.heya_id
-                    else 0
-                )
-                same_shusshin = (
-                    1
-                    if bout.east.shusshin_id
-                    and bout.west.shusshin_id
-                    and bout.east.shusshin_id == bout.west.shusshin_id
-                    else 0
-                )
-
-                east_heya = (
-                    heya_map.get(bout.east.heya.slug)
-                    if bout.east.heya_id
-                    else ""
-                )
-                west_heya = (
-                    heya_map.get(bout.west.heya.slug)
-                    if bout.west.heya_id
-                    else ""
-                )
-                east_shusshin = (
-                    shusshin_map.get(bout.east.shusshin.slug)
-                    if bout.east.shusshin_id
-                    else ""
-                )
-                west_shusshin = (
-                    shusshin_map.get(bout.west.shusshin.slug)
-                    if bout.west.shusshin_id
-                    else ""
-                )
-
-                writer.writerow(
-                    [
-                        bout.basho.year,
-                        bout.basho.month,
-                        bout.division.level,
-                        bout.day,
-                        bout.match_no,
-                        bout.east_id,
-                        bout.west_id,
-                        east_hist.rank.value if east_hist else "",
-                        west_hist.rank.value if west_hist else "",
-                        east_rating.previous_rating if east_rating else "",
-                        west_rating.previous_rating if west_rating else "",
-                        east_rd,
-                        west_rd,
-                        east_vol,
-                        west_vol,
-                        east_height,
-                        west_height,
-                        east_weight,
-                        west_weight,
-                        east_bmi,
-                        west_bmi,
-                        round(east_age, 2) if east_age is not None else "",
-                        round(west_age, 2) if west_age is not None else "",
-                        round(east_experience, 2)
-                        if east_experience is not None
-                        else "",
-                        round(west_experience, 2)
-                        if west_experience is not None
-                        else "",
-                        east_record,
-                        west_record,
-                        rating_diff,
-                        height_diff,
-                        weight_diff,
-                        age_diff,
-                        experience_diff,
-                        record_diff,
-                        rank_diff,
-                        rd_diff,
-                        vol_diff,
-                        bmi_diff,
-                        same_heya,
-                        same_shusshin,
-                        east_heya,
-                        west_heya,
-                        east_shusshin,
-                        west_shusshin,
-                        round(east_win_rate, 3),
-                        round(west_win_rate, 3),
-                        east_streak,
-                        west_streak,
-                        east_avg_change,
-                        west_avg_change,
-                        1 if bout.winner_id == bout.east_id else 0,
-                    ]
-                )
-
-                totals[bout.winner_id] = totals.get(bout.winner_id, 0) + 1
-                recent_results[bout.east_id].append(
-                    1 if bout.winner_id == bout.east_id else 0
-                )
-                recent_results[bout.west_id].append(
-                    1 if bout.winner_id == bout.west_id else 0
-                )
-                if bout.winner_id == bout.east_id:
-                    streaks[bout.east_id] += 1
-                    streaks[bout.west_id] = 0
-                else:
-                    streaks[bout.west_id] += 1
-                    streaks[bout.east_id] = 0
-
-                processed += 1
-                if processed % step == 0:
-                    self.stdout.write(f"Processed {processed} bouts")
-
-        msg = self.style.SUCCESS(f"Dataset saved to {outfile}")
+        bouts = tables["bouts"]
+        if state and bouts.empty:
+            self.stdout.write(self.style.SUCCESS("Dataset already up to date"))
+            return
+
+        self.stdout.write(f"Computing features for {len(bouts)} bouts...")
+        frame = build_features_sharded(**tables, state=state, workers=workers)
+
+        try:
+            if state:
+                append_dataset(frame, outfile, fmt)
+            else:
+                write_dataset(frame, outfile, fmt)
+        except ImportError as exc:
+            raise CommandError(f"{fmt} output requires pyarrow") from exc
+        if not bouts.empty:
+            FeatureState.build(
+                bouts,
+                tables["ratings"].reset_index(),
+                heya,
+                shusshin,
+                prior=state,
+            ).save(state_path(outfile))
+
+        elapsed = time.perf_counter() - started
+        msg = self.style.SUCCESS(
+            f"Dataset saved to {outfile} ({len(frame)} rows, {elapsed:.2f}s)"
+        )
         self.stdout.write(msg)
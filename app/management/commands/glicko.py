@@ -1,74 +1,207 @@
-from django.core.management.base import BaseCommand
+import time
 
-from app.models import Basho, BashoHistory, BashoRating, Bout
-from libs.glicko2 import Player
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import OuterRef, Subquery
+
+from app.models import Basho, BashoHistory, BashoRating, RatingSnapshot
+from libs.boutstore import BoutStore
+from libs.db import bulk_upsert
+from libs.glicko2_batch import PlayerTable
+
+RATING_FIELDS = [
+    "previous_rating",
+    "previous_rd",
+    "previous_vol",
+    "rating",
+    "rd",
+    "vol",
+]
+
+
+def load_periods(since=None):
+    """Return every rated basho as in-memory arrays in chronological order.
+
+    Bouts come from the columnar :class:`BoutStore` and basho histories are
+    streamed with a single query. Each item is ``(basho_slug, east_ids,
+    west_ids, east_wins, rikishi_ids)``; basho without bouts are omitted.
+    """
+    store = BoutStore.load()
+    histories = BashoHistory.objects.order_by("basho_id", "rikishi_id")
+    if since:
+        store = store.since(since)
+        histories = histories.filter(basho_id__gte=since)
+
+    active: dict[str, list[int]] = {}
+    for basho_id, rikishi_id in histories.values_list(
+        "basho_id", "rikishi_id"
+    ).iterator(chunk_size=5000):
+        active.setdefault(basho_id, []).append(rikishi_id)
+
+    return [
+        (
+            slug,
+            bouts.east,
+            bouts.west,
+            bouts.east_win,
+            np.array(active.get(slug, []), dtype=np.int64),
+        )
+        for slug, bouts in store.periods()
+    ]
+
+
+def load_players(since):
+    """Return a ``PlayerTable`` seeded with the last rating before ``since``.
+
+    Each rikishi's most recent ``BashoRating`` strictly before the basho
+    ``since`` provides the starting rating, RD and volatility.
+    """
+    latest = (
+        BashoRating.objects.filter(
+            rikishi_id=OuterRef("rikishi_id"), basho_id__lt=since
+        )
+        .order_by("-basho_id")
+        .values("basho_id")[:1]
+    )
+    rows = list(
+        BashoRating.objects.filter(
+            basho_id__lt=since, basho_id=Subquery(latest)
+        )
+        .order_by()
+        .values_list("rikishi_id", "rating", "rd", "vol")
+    )
+    players = PlayerTable()
+    if rows:
+        ids, rating, rd, vol = zip(*rows, strict=True)
+        players.load(ids, rating, rd, vol)
+    return players
+
+
+def load_snapshot(before, **kwargs):
+    """Return ``(basho_slug, PlayerTable)`` for the nearest snapshot.
+
+    Only snapshots strictly before the basho ``before`` are considered.
+    ``kwargs`` are forwarded to :meth:`PlayerTable.from_bytes`. Returns
+    ``None`` when no snapshot is available.
+    """
+    snapshot = (
+        RatingSnapshot.objects.filter(basho_id__lt=before)
+        .order_by("-basho_id")
+        .first()
+    )
+    if snapshot is None:
+        return None
+    return snapshot.basho_id, PlayerTable.from_bytes(snapshot.data, **kwargs)
+
+
+def save_snapshot(basho_id, players):
+    """Persist the current ``players`` state for the basho ``basho_id``."""
+    RatingSnapshot.objects.update_or_create(
+        basho_id=basho_id,
+        defaults={"players": len(players), "data": players.to_bytes()},
+    )
 
 
 class Command(BaseCommand):
     help = "Calculate Glicko ratings for each rikishi in each basho"
 
-    def handle(self, *args, **options):
-        # Clear existing ratings
-        self.stdout.write("Clearing existing ratings...")
-        BashoRating.objects.all().delete()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            metavar="BASHO",
+            help=(
+                "Only recompute ratings from this basho slug onward, "
+                "starting from the ratings stored before it"
+            ),
+        )
+        parser.add_argument(
+            "--snapshot-every",
+            type=int,
+            default=6,
+            metavar="N",
+            help="Store a state snapshot every N rated basho (0 disables)",
+        )
 
-        self.stdout.write("Calculating Glicko ratings...")
-        players: dict[int, Player] = {}
+    def handle(self, *args, since=None, snapshot_every=6, **options):
+        timings = {"load": 0.0, "compute": 0.0, "write": 0.0}
+        started = time.perf_counter()
+        resume = None
+        if since:
+            if not Basho.objects.filter(slug=since).exists():
+                raise CommandError(f"Unknown basho {since}")
+            RatingSnapshot.objects.filter(basho_id__gte=since).delete()
+            snapshot = load_snapshot(since)
+            if snapshot:
+                resume, players = snapshot
+                self.stdout.write(f"Resuming from snapshot {resume}...")
+            else:
+                self.stdout.write(f"Loading ratings before {since}...")
+                players = load_players(since)
+        else:
+            # Clear existing ratings
+            self.stdout.write("Clearing existing ratings...")
+            BashoRating.objects.all().delete()
+            RatingSnapshot.objects.all().delete()
+            players = PlayerTable()
+
+        self.stdout.write("Loading bouts...")
+        periods = load_periods(resume or since)
+        if resume:
+            periods = [p for p in periods if p[0] > resume]
         basho_qs = Basho.objects.order_by("year", "month")
-        for basho in basho_qs.iterator():
-            bouts = Bout.objects.filter(basho=basho).order_by("day", "match_no")
-            if not bouts.exists():
-                self.stdout.write(
-                    f"No bouts found for {basho.slug}. Skipping..."
-                )
-                continue
-
-            results: dict[int, list[tuple[float, float, int]]] = {}
-            for bout in bouts.iterator():
-                east = players.setdefault(bout.east_id, Player())
-                west = players.setdefault(bout.west_id, Player())
-                east_out = 1 if bout.winner_id == bout.east_id else 0
-                west_out = 1 if bout.winner_id == bout.west_id else 0
-                results.setdefault(bout.east_id, []).append(
-                    (west.rating, west.rd, east_out)
-                )
-                results.setdefault(bout.west_id, []).append(
-                    (east.rating, east.rd, west_out)
-                )
+        if resume or since:
+            basho_qs = basho_qs.filter(slug__gt=resume or since)
+        rated_slugs = {p[0] for p in periods}
+        for slug in basho_qs.values_list("slug", flat=True):
+            if slug not in rated_slugs and (not since or slug >= since):
+                self.stdout.write(f"No bouts found for {slug}. Skipping...")
+        timings["load"] = time.perf_counter() - started
+
+        self.stdout.write("Calculating Glicko ratings...")
+        for count, period in enumerate(periods, start=1):
+            slug, east_ids, west_ids, east_wins, rikishi_ids = period
+            tick = time.perf_counter()
+            before = players.ratings(rikishi_ids)
+            players.rate(east_ids, west_ids, east_wins, rikishi_ids)
+            after = players.ratings(rikishi_ids)
+            timings["compute"] += time.perf_counter() - tick
 
-            histories = {
-                h.rikishi_id: h
-                for h in BashoHistory.objects.filter(basho=basho).iterator()
-            }
-
-            ratings = []
-            for rikishi_id in histories:
-                player = players.setdefault(rikishi_id, Player())
-                before_rating = player.rating
-                before_rd = player.rd
-                before_vol = player.vol
-                recs = results.get(rikishi_id)
-                if recs:
-                    r_list = [r for r, _, _ in recs]
-                    rd_list = [rd for _, rd, _ in recs]
-                    o_list = [o for _, _, o in recs]
-                    player.update_player(r_list, rd_list, o_list)
-                else:
-                    player.did_not_compete()
-                ratings.append(
+            tick = time.perf_counter()
+            if snapshot_every and count % snapshot_every == 0:
+                save_snapshot(slug, players)
+
+            # Periods replayed from a snapshot before ``since`` are unchanged
+            if not since or slug >= since:
+                ratings = [
                     BashoRating(
                         rikishi_id=rikishi_id,
-                        basho=basho,
-                        previous_rating=before_rating,
-                        previous_rd=before_rd,
-                        previous_vol=before_vol,
-                        rating=player.rating,
-                        rd=player.rd,
-                        vol=player.vol,
+                        basho_id=slug,
+                        previous_rating=float(before[0][i]),
+                        previous_rd=float(before[1][i]),
+                        previous_vol=float(before[2][i]),
+                        rating=float(after[0][i]),
+                        rd=float(after[1][i]),
+                        vol=float(after[2][i]),
                     )
+                    for i, rikishi_id in enumerate(rikishi_ids.tolist())
+                ]
+                bulk_upsert(
+                    BashoRating,
+                    ratings,
+                    unique_fields=["rikishi", "basho"],
+                    update_fields=RATING_FIELDS,
                 )
+            timings["write"] += time.perf_counter() - tick
 
-            if ratings:
-                BashoRating.objects.bulk_create(
-                    ratings, batch_size=500, ignore_conflicts=True
-                )
+        if snapshot_every and periods:
+            tick = time.perf_counter()
+            save_snapshot(periods[-1][0], players)
+            timings["write"] += time.perf_counter() - tick
+
+        self.stdout.write(
+            f"Rated {len(periods)} basho in "
+            f"{time.perf_counter() - started:.2f}s "
+            f"(load {timings['load']:.2f}s, "
+            f"compute {timings['compute']:.2f}s, "
+            f"write {timings['write']:.2f}s)"
+        )
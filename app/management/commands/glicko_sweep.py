@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.management.commands.glicko import load_periods
+from libs.constants import DEFAULT_RD, DEFAULT_VOLATILITY, TAU
+from libs.glicko2_batch import sweep
+
+
+class Command(BaseCommand):
+    """Grid-search Glicko parameters by next-basho predictive log-loss."""
+
+    help = "Tune TAU, default RD and volatility without writing ratings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tau", type=float, nargs="+", default=[TAU], help="TAU values"
+        )
+        parser.add_argument(
+            "--rd",
+            type=float,
+            nargs="+",
+            default=[DEFAULT_RD],
+            help="Initial rating deviations",
+        )
+        parser.add_argument(
+            "--vol",
+            type=float,
+            nargs="+",
+            default=[DEFAULT_VOLATILITY],
+            help="Initial volatilities",
+        )
+        parser.add_argument(
+            "--burn-in",
+            type=int,
+            default=12,
+            help="Number of leading basho used only to warm up ratings",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Process pool size"
+        )
+        parser.add_argument(
+            "--top", type=int, default=0, help="Only show the best N results"
+        )
+
+    def handle(
+        self,
+        *args,
+        tau,
+        rd,
+        vol,
+        burn_in=12,
+        workers=None,
+        top=0,
+        **options,
+    ):
+        self.stdout.write("Loading bouts...")
+        periods = [period[1:] for period in load_periods()]
+        if len(periods) <= burn_in:
+            raise CommandError(
+                f"Need more than {burn_in} basho with bouts, "
+                f"found {len(periods)}"
+            )
+
+        trials = len(tau) * len(rd) * len(vol)
+        self.stdout.write(
+            f"Scoring {trials} combinations over {len(periods)} basho..."
+        )
+        results = sweep(periods, tau, rd, vol, burn_in=burn_in, workers=workers)
+        if top:
+            results = results[:top]
+
+        self.stdout.write(
+            f"{'#':>3} {'tau':>6} {'rd':>7} {'vol':>7} {'log-loss':>9} "
+            f"{'bouts':>8}"
+        )
+        for pos, (params, loss, count) in enumerate(results, start=1):
+            self.stdout.write(
+                f"{pos:>3} {params['tau']:>6.3f} {params['rd']:>7.1f} "
+                f"{params['vol']:>7.4f} {loss:>9.5f} {count:>8}"
+            )
+        best = results[0][0]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Best: tau={best['tau']} rd={best['rd']} vol={best['vol']}"
+            )
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Basho
+from libs.head_to_head import refresh_head_to_head
+
+
+class Command(BaseCommand):
+    help = "Rebuild the cumulative head-to-head records from stored bouts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            metavar="BASHO",
+            help="Only rebuild records from this basho slug onward",
+        )
+
+    def handle(self, *args, since=None, **options):
+        if since and not Basho.objects.filter(slug=since).exists():
+            raise CommandError(f"Unknown basho {since}")
+        count = refresh_head_to_head(since)
+        self.stdout.write(
+            self.style.SUCCESS(f"Saved {count} head-to-head records")
+        )
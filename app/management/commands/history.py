@@ -1,9 +1,12 @@
 # app/management/commands/history.py
 
 import asyncio
+from bisect import bisect_right
 from datetime import datetime
 
 from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Max
 from django.utils.text import slugify
 
 from app.management.commands import AsyncBaseCommand
@@ -12,42 +15,54 @@ from app.models.division import Division
 from app.models.history import BashoHistory
 from app.models.rank import Rank
 from app.models.rikishi import Rikishi
+from libs.ingest import Progress, finish_job, job_name, start_job
 from libs.sumoapi import SumoApiClient
 
+# Concurrent rikishi downloads and payloads buffered for the writer
+FETCHERS = 8
+QUEUE_SIZE = 32
+# Rows collected before a bulk insert
+FLUSH_SIZE = 1000
+# Queued rikishi whose basho and ranks are resolved together
+RESOLVE_BATCH = 50
+# Earliest basho with banzuke data in the API
+FIRST_BASHO = 195803
+PROGRESS_EVERY = 50
 
-def pick_measurements(measure_map, basho_slug):
-    """Return measurements for ``basho_slug`` or fallback to a prior record."""
-    record = measure_map.get(basho_slug)
-    if record and (record.get("height") or record.get("weight")):
-        return record
 
-    keys = [k for k in measure_map if k <= basho_slug]
-    for key in sorted(keys, reverse=True):
-        rec = measure_map[key]
-        if rec.get("height") or rec.get("weight"):
-            return rec
+MEASUREMENT_FIELDS = ("height", "weight")
+SHIKONA_FIELDS = ("shikonaEn", "shikonaJp")
 
-    return {}
 
+class LatestRecords:
+    """Per-rikishi records keyed by basho slug, indexed for fallback lookups.
 
-def pick_shikona(shikona_map, basho_slug):
-    """Return shikona for ``basho_slug`` or fallback to the prior record."""
-    record = shikona_map.get(basho_slug)
-    if record and (record.get("shikonaEn") or record.get("shikonaJp")):
-        return record
+    Only records with at least one of ``fields`` set are kept, sorted by
+    slug once so :meth:`at` can bisect instead of scanning every key.
+    """
 
-    keys = [k for k in shikona_map if k <= basho_slug]
-    for key in sorted(keys, reverse=True):
-        rec = shikona_map[key]
-        if rec.get("shikonaEn") or rec.get("shikonaJp"):
-            return rec
+    def __init__(self, records, fields):
+        items = sorted(
+            (
+                (slug, rec)
+                for slug, rec in records.items()
+                if slug and any(rec.get(field) for field in fields)
+            ),
+            key=lambda item: item[0],
+        )
+        self.slugs = [slug for slug, _ in items]
+        self.records = [rec for _, rec in items]
 
-    return {}
+    def at(self, basho_slug):
+        """Return the latest non-empty record at or before ``basho_slug``."""
+        pos = bisect_right(self.slugs, basho_slug)
+        return self.records[pos - 1] if pos else {}
 
 
 @sync_to_async
 def get_rikishis():
-    return list(Rikishi.objects.only("id", "name"))
+    # Ordered by id so the job cursor can skip finished rikishi
+    return list(Rikishi.objects.only("id", "name").order_by("id"))
 
 
 @sync_to_async
@@ -62,7 +77,19 @@ def get_existing_rank():
 
 @sync_to_async
 def get_existing_keys():
-    return set(BashoHistory.objects.values_list("rikishi_id", "basho__slug"))
+    # ``basho_id`` is the slug, so no join is needed
+    return set(BashoHistory.objects.values_list("rikishi_id", "basho_id"))
+
+
+@sync_to_async
+def get_latest_basho():
+    """Return the latest imported basho slug keyed by rikishi ID."""
+    return dict(
+        BashoHistory.objects.order_by()
+        .values("rikishi_id")
+        .annotate(latest=Max("basho_id"))
+        .values_list("rikishi_id", "latest")
+    )
 
 
 @sync_to_async
@@ -70,175 +97,274 @@ def get_existing_divisions():
     return {d.name: d for d in Division.objects.all()}
 
 
+@sync_to_async
+def save_basho_and_ranks(basho, ranks):
+    """Insert new ``Basho`` and ``Rank`` rows, skipping existing slugs."""
+    with transaction.atomic():
+        Basho.objects.bulk_create(basho, ignore_conflicts=True)
+        Rank.objects.bulk_create(ranks, ignore_conflicts=True)
+
+
+def basho_from_api(basho_data):
+    """Return an unsaved ``Basho`` built from ``/basho/{id}`` data."""
+    slug = basho_data["date"]
+    return Basho(
+        slug=slug,
+        year=int(slug[:4]),
+        month=int(slug[-2:]),
+        start_date=datetime.strptime(
+            basho_data["startDate"], "%Y-%m-%dT%H:%M:%SZ"
+        ),
+        end_date=datetime.strptime(basho_data["endDate"], "%Y-%m-%dT%H:%M:%SZ"),
+    )
+
+
+def rank_from_string(rank_string, division_cache):
+    """Return ``(cache key, unsaved Rank)`` for an API rank string.
+
+    Ranks without a direction, such as ``"Sekiwake 1"``, are stored as
+    West.
+    """
+    slug = slugify(rank_string)
+    parts = rank_string.split(" ")
+    division = division_cache.get(parts[0]) or division_cache.get("Makuuchi")
+    if len(parts) == 3:
+        rank = Rank(
+            slug=slug,
+            title=parts[0],
+            order=parts[1],
+            direction=parts[2],
+            division=division,
+        )
+    elif len(parts) == 2:
+        rank = Rank(
+            slug=slugify(f"{rank_string} West"),
+            title=parts[0],
+            order=parts[1],
+            direction="West",
+            division=division,
+        )
+    else:
+        rank = Rank(slug=slug, title=parts[0], division=division)
+    return slug, rank
+
+
 class Command(AsyncBaseCommand):
     help = "Populate rikishi history (async)"
 
     def log(self, message):
         self.stdout.write(self.style.NOTICE(message))
 
-    async def run(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fetchers",
+            type=int,
+            default=FETCHERS,
+            help="Number of concurrent rikishi downloads",
+        )
+        parser.add_argument(
+            "--new-only",
+            action="store_true",
+            help=(
+                "Only import basho after the latest one stored for each "
+                "rikishi instead of filling gaps"
+            ),
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted run after its last checkpoint",
+        )
+
+    async def run(
+        self,
+        *args,
+        fetchers=FETCHERS,
+        new_only=False,
+        resume=False,
+        **kwargs,
+    ):
         async with SumoApiClient() as api:
             self.log("Prefetching database objects...")
+            job = await sync_to_async(start_job)(
+                job_name("history", new_only=new_only), resume
+            )
             rikishis = await get_rikishis()
-            existing_basho = await get_existing_basho()
-            existing_rank = await get_existing_rank()
-            existing_keys = await get_existing_keys()
-            existing_divisions = await get_existing_divisions()
-            shikona_cache = {}
-            measurement_cache = {}
-
-            BATCH_SIZE = 50
-            ranking_history_to_create = []
-
-            for i in range(0, len(rikishis), BATCH_SIZE):
-                batch = rikishis[i : i + BATCH_SIZE]
-                self.log(
-                    (
-                        f"Processing batch {i // BATCH_SIZE + 1}/"
-                        f"{(len(rikishis) + BATCH_SIZE - 1) // BATCH_SIZE}"
-                    )
-                )
-
-                ranking_histories = await api.get_ranking_history(
-                    [r.id for r in batch]
-                )
-
-                # Fetch measurement and shikona history if not cached
-                shikona_tasks = {
-                    r.id: api.get_shikonas(rikishiId=r.id)
-                    for r in batch
-                    if r.id not in shikona_cache
-                }
-                measurement_tasks = {
-                    r.id: api.get_measurements(rikishiId=r.id)
-                    for r in batch
-                    if r.id not in measurement_cache
-                }
-                if shikona_tasks or measurement_tasks:
-                    responses = await asyncio.gather(
-                        *shikona_tasks.values(), *measurement_tasks.values()
+            if job.last_rikishi_id is not None:
+                self.log(f"Resuming after rikishi {job.last_rikishi_id}")
+                rikishis = [r for r in rikishis if r.id > job.last_rikishi_id]
+            self.progress = Progress(job, [r.id for r in rikishis])
+            self.existing_basho = await get_existing_basho()
+            self.existing_rank = await get_existing_rank()
+            if new_only:
+                # Per-rikishi watermarks replace the full key set
+                self.watermarks = await get_latest_basho()
+                self.existing_keys = set()
+            else:
+                self.watermarks = {}
+                self.existing_keys = await get_existing_keys()
+            self.existing_divisions = await get_existing_divisions()
+            self.missing_basho = set()
+
+            # Fetchers download while the writer builds and saves rows
+            queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+            try:
+                async with asyncio.TaskGroup() as group:
+                    group.create_task(
+                        self.produce(api, rikishis, queue, fetchers)
                     )
-                    resp_iter = iter(responses)
-                    for rikishi_id in shikona_tasks:
-                        data = next(resp_iter)
-                        shikona_cache[rikishi_id] = {
-                            rec.get("bashoId"): rec for rec in data
-                        }
-                    for rikishi_id in measurement_tasks:
-                        data = next(resp_iter)
-                        measurement_cache[rikishi_id] = {
-                            rec.get("bashoId"): rec for rec in data
-                        }
-
-                for rikishi in batch:
-                    history = ranking_histories.get(rikishi.id, [])
-                    for entry in history:
-                        basho_slug = entry.get("bashoId")
-                        rank_str = entry.get("rank")
-                        if (
-                            not basho_slug
-                            or not rank_str
-                            or (rikishi.id, basho_slug) in existing_keys
-                        ):
-                            continue
-
-                        if basho_slug not in existing_basho:
-                            if int(basho_slug) < 195803:
-                                self.log(f"Skipping old basho {basho_slug}")
-                                continue
-                            basho_data = await api.get_basho_by_id(basho_slug)
-                            if not basho_data:
-                                self.log(
-                                    f"Missing basho {basho_slug}, skipping"
-                                )
-                                continue
-                            basho = await self.create_basho_from_api(basho_data)
-                            existing_basho[basho.slug] = basho
-                        else:
-                            basho = existing_basho[basho_slug]
-
-                        rank = await self.get_or_create_rank(
-                            rank_str, existing_rank, existing_divisions
-                        )
-
-                        shikona_data = pick_shikona(
-                            shikona_cache.get(rikishi.id, {}), basho_slug
-                        )
-                        measurement_data = pick_measurements(
-                            measurement_cache.get(rikishi.id, {}), basho_slug
-                        )
-                        ranking_history_to_create.append(
-                            BashoHistory(
-                                rikishi=rikishi,
-                                basho=basho,
-                                rank=rank,
-                                shikona_en=shikona_data.get("shikonaEn", ""),
-                                shikona_jp=shikona_data.get("shikonaJp", ""),
-                                height=measurement_data.get("height"),
-                                weight=measurement_data.get("weight"),
-                            )
-                        )
-
-                        if len(ranking_history_to_create) >= 1000:
-                            await self.bulk_save(ranking_history_to_create)
-                            ranking_history_to_create.clear()
-                            existing_keys = await get_existing_keys()
-
-            if ranking_history_to_create:
-                await self.bulk_save(ranking_history_to_create)
-                self.log(
-                    f"Inserted final {len(ranking_history_to_create)} records."
-                )
+                    group.create_task(self.consume(api, queue, len(rikishis)))
+            except ExceptionGroup as group:
+                # Surface the first failure, e.g. a SumoApiError
+                raise group.exceptions[0] from None
 
+            await sync_to_async(finish_job)(job)
             self.log("✅ Ranking history import completed.")
 
-    async def create_basho_from_api(self, basho_data):
-        slug = basho_data["date"]
-        return await Basho.objects.acreate(
-            slug=slug,
-            year=int(slug[:4]),
-            month=int(slug[-2:]),
-            start_date=datetime.strptime(
-                basho_data["startDate"], "%Y-%m-%dT%H:%M:%SZ"
+    async def fetch_payload(self, api, rikishi):
+        """Return ``(rikishi, ranks, shikona, measurements)``.
+
+        Shikona and measurements are :class:`LatestRecords` indexes.
+        """
+        ranks, shikonas, measurements = await asyncio.gather(
+            api.get_ranking_history([rikishi.id]),
+            api.get_shikonas(rikishiId=rikishi.id),
+            api.get_measurements(rikishiId=rikishi.id),
+        )
+        return (
+            rikishi,
+            ranks.get(rikishi.id, []),
+            LatestRecords(
+                {rec.get("bashoId"): rec for rec in shikonas}, SHIKONA_FIELDS
             ),
-            end_date=datetime.strptime(
-                basho_data["endDate"], "%Y-%m-%dT%H:%M:%SZ"
+            LatestRecords(
+                {rec.get("bashoId"): rec for rec in measurements},
+                MEASUREMENT_FIELDS,
             ),
         )
 
-    async def get_or_create_rank(self, rank_string, rank_cache, division_cache):
-        slug = slugify(rank_string)
-        if slug in rank_cache:
-            return rank_cache[slug]
-
-        parts = rank_string.split(" ")
-        division = division_cache.get(parts[0]) or division_cache.get(
-            "Makuuchi"
+    async def produce(self, api, rikishis, queue, fetchers):
+        """Fetch payloads with ``fetchers`` tasks, then signal the end."""
+        pending = iter(rikishis)
+
+        async def fetch():
+            for rikishi in pending:
+                await queue.put(await self.fetch_payload(api, rikishi))
+
+        await asyncio.gather(*(fetch() for _ in range(max(1, fetchers))))
+        await queue.put(None)
+
+    async def consume(self, api, queue, total):
+        """Build ``BashoHistory`` rows from queued payloads and flush them.
+
+        Payloads already waiting in the queue are taken together, up to
+        :data:`RESOLVE_BATCH`, so their basho and ranks are resolved in
+        one pass. The job cursor advances after each flush.
+        """
+        rows = []
+        built = []
+        done = 0
+        finished = False
+        while not finished:
+            batch = [await queue.get()]
+            while len(batch) < RESOLVE_BATCH and not queue.empty():
+                batch.append(queue.get_nowait())
+            if batch[-1] is None:
+                finished = True
+                batch.pop()
+
+            await self.resolve(api, batch)
+            for payload in batch:
+                rows.extend(self.build_rows(*payload))
+                built.append(payload[0].id)
+                done += 1
+                if done % PROGRESS_EVERY == 0 or done == total:
+                    self.log(f"Processed {done}/{total} rikishi")
+            if len(rows) >= FLUSH_SIZE:
+                await self.bulk_save(rows)
+                await sync_to_async(self.progress.complete)(built)
+                rows, built = [], []
+
+        if rows:
+            await self.bulk_save(rows)
+            self.log(f"Inserted final {len(rows)} records.")
+        await sync_to_async(self.progress.complete)(built)
+
+    def new_entries(self, rikishi, history):
+        """Yield ``(basho slug, rank string)`` of entries not stored yet."""
+        for entry in history:
+            basho_slug = entry.get("bashoId")
+            rank_str = entry.get("rank")
+            if not basho_slug or not rank_str:
+                continue
+            if (rikishi.id, basho_slug) in self.existing_keys:
+                continue
+            if basho_slug <= self.watermarks.get(rikishi.id, ""):
+                continue
+            yield basho_slug, rank_str
+
+    async def resolve(self, api, payloads):
+        """Create the unseen basho and ranks referenced by ``payloads``.
+
+        Missing basho are fetched concurrently and saved together with the
+        new ranks using ``bulk_create(ignore_conflicts=True)``.
+        """
+        slugs = set()
+        ranks = {}
+        for rikishi, history, *_ in payloads:
+            for basho_slug, rank_str in self.new_entries(rikishi, history):
+                if (
+                    basho_slug not in self.existing_basho
+                    and basho_slug not in self.missing_basho
+                    and int(basho_slug) >= FIRST_BASHO
+                ):
+                    slugs.add(basho_slug)
+                slug, rank = rank_from_string(rank_str, self.existing_divisions)
+                if slug not in self.existing_rank:
+                    ranks[slug] = rank
+
+        slugs = sorted(slugs)
+        fetched = await asyncio.gather(
+            *(api.get_basho_by_id(slug) for slug in slugs)
         )
-
-        if len(parts) == 3:
-            rank, _ = await Rank.objects.aget_or_create(
-                slug=slug,
-                title=parts[0],
-                order=parts[1],
-                direction=parts[2],
-                division=division,
-            )
-        elif len(parts) == 2:
-            rank, _ = await Rank.objects.aget_or_create(
-                slug=slugify(f"{rank_string} West"),
-                title=parts[0],
-                order=parts[1],
-                direction="West",
-                division=division,
-            )
-        else:
-            rank, _ = await Rank.objects.aget_or_create(
-                slug=slug, title=parts[0], division=division
+        new_basho = []
+        for slug, data in zip(slugs, fetched, strict=True):
+            if data:
+                new_basho.append(basho_from_api(data))
+            else:
+                self.log(f"Missing basho {slug}, skipping")
+                self.missing_basho.add(slug)
+
+        if new_basho or ranks:
+            await save_basho_and_ranks(new_basho, list(ranks.values()))
+        self.existing_basho.update((b.slug, b) for b in new_basho)
+        self.existing_rank.update(ranks)
+
+    def build_rows(self, rikishi, history, shikonas, measurements):
+        """Return new ``BashoHistory`` rows for one resolved rikishi."""
+        rows = []
+        for basho_slug, rank_str in self.new_entries(rikishi, history):
+            basho = self.existing_basho.get(basho_slug)
+            if basho is None:
+                if int(basho_slug) < FIRST_BASHO:
+                    self.log(f"Skipping old basho {basho_slug}")
+                continue
+
+            shikona_data = shikonas.at(basho_slug)
+            measurement_data = measurements.at(basho_slug)
+            self.existing_keys.add((rikishi.id, basho_slug))
+            rows.append(
+                BashoHistory(
+                    rikishi=rikishi,
+                    basho=basho,
+                    rank=self.existing_rank[slugify(rank_str)],
+                    shikona_en=shikona_data.get("shikonaEn", ""),
+                    shikona_jp=shikona_data.get("shikonaJp", ""),
+                    height=measurement_data.get("height"),
+                    weight=measurement_data.get("weight"),
+                )
             )
-
-        rank_cache[slug] = rank
-        return rank
+        return rows
 
     async def bulk_save(self, objs):
         self.log(f"Inserting {len(objs)} BashoHistory objects...")
@@ -1,10 +1,9 @@
-import random
 from datetime import date
-from itertools import combinations
 
-import pandas as pd
+import numpy as np
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Q
+from sklearn.metrics import log_loss
 from sklearn.model_selection import GridSearchCV
 from sklearn.neural_network import MLPClassifier
 from sklearn.pipeline import Pipeline
@@ -14,10 +13,19 @@ from app.models import (
     Basho,
     BashoHistory,
     BashoRating,
-    Bout,
     Prediction,
     Rikishi,
 )
+from libs.api_utils import invalidate_predictions
+from libs.dataset import rank_values, read_dataset
+from libs.db import bulk_upsert
+from libs.head_to_head import records_before
+from libs.model_registry import ModelRegistry, file_hash
+from libs.tournament import (
+    pair_indices,
+    simulate_basho,
+    simulate_round_robin,
+)
 
 FEATURES = [
     "rating_diff",
@@ -32,27 +40,196 @@ FEATURES = [
 ]
 
 
+def _years(start, dates):
+    return np.array([(start - d).days / 365.25 if d else np.nan for d in dates])
+
+
+def head_to_head_wins(ids, before):
+    """Return ``wins[i, j]``: bouts rikishi ``ids[i]`` won against ``ids[j]``.
+
+    Only bouts from basho before the slug ``before`` are counted. Records
+    are read from :class:`~app.models.HeadToHead` with a single query.
+    """
+    index = {rid: pos for pos, rid in enumerate(ids)}
+    wins = np.zeros((len(ids), len(ids)), dtype=np.int64)
+    for (a, b), (a_wins, b_wins) in records_before(ids, before).items():
+        wins[index[a], index[b]] = a_wins
+        wins[index[b], index[a]] = b_wins
+    return wins
+
+
+def pair_features(rikishi, basho):
+    """Return the :data:`FEATURES` matrix for every ordered rikishi pair.
+
+    ``features[i, j]`` describes ``rikishi[i]`` against ``rikishi[j]`` at
+    the start of ``basho``. Ratings, histories and head-to-head records are
+    each loaded with one query. The second value is a boolean matrix that
+    is ``True`` where both rikishi have a rating and a basho history.
+    """
+    ids = [r.id for r in rikishi]
+    index = {rid: pos for pos, rid in enumerate(ids)}
+    n = len(ids)
+
+    rating = np.full(n, np.nan)
+    rd = np.full(n, np.nan)
+    seen = set()
+    for rid, value, dev in (
+        BashoRating.objects.filter(rikishi_id__in=ids)
+        .order_by("rikishi_id", "-basho_id")
+        .values_list("rikishi_id", "rating", "rd")
+    ):
+        if rid not in seen:
+            seen.add(rid)
+            rating[index[rid]], rd[index[rid]] = value, dev
+
+    rank = np.full(n, np.nan)
+    height = np.array([r.height or 0 for r in rikishi], dtype=float)
+    weight = np.array([r.weight or 0 for r in rikishi], dtype=float)
+    for rid, level, order, direction, hist_h, hist_w in (
+        BashoHistory.objects.filter(rikishi_id__in=ids, basho=basho)
+        .order_by()
+        .values_list(
+            "rikishi_id",
+            "rank__division__level",
+            "rank__order",
+            "rank__direction",
+            "height",
+            "weight",
+        )
+    ):
+        pos = index[rid]
+        rank[pos] = rank_values([level], [order], [direction])[0]
+        height[pos] = hist_h or height[pos]
+        weight[pos] = hist_w or weight[pos]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = np.where(
+            (height > 0) & (weight > 0),
+            np.round(weight / (height / 100) ** 2, 2),
+            0.0,
+        )
+    start = basho.start_date or date(basho.year, basho.month, 1)
+    age = _years(start, [r.birth_date for r in rikishi])
+    experience = _years(start, [r.debut for r in rikishi])
+    wins = head_to_head_wins(ids, basho.slug)
+
+    def diff(values):
+        return values[:, None] - values[None, :]
+
+    def known_diff(values):
+        return np.nan_to_num(diff(values), nan=0.0)
+
+    features = np.stack(
+        [
+            diff(rating),
+            diff(rank),
+            diff(rd),
+            diff(height),
+            diff(weight),
+            diff(bmi),
+            known_diff(age),
+            known_diff(experience),
+            wins - wins.T,
+        ],
+        axis=-1,
+    )
+    valid = ~np.isnan(rating) & ~np.isnan(rank)
+    return features, valid[:, None] & valid[None, :]
+
+
+def pair_probabilities(rikishi, basho, scaler, model):
+    """Return ``prob[i, j]``, the chance ``rikishi[i]`` beats ``rikishi[j]``.
+
+    Pairs lacking ratings or histories get ``0.5``. All other pairs are
+    scored with a single ``predict_proba`` call.
+    """
+    features, valid = pair_features(rikishi, basho)
+    prob = np.full(valid.shape, 0.5)
+    i, j = np.nonzero(np.triu(valid, k=1))
+    if len(i):
+        scaled = scaler.transform(features[i, j])
+        p = model.predict_proba(scaled)[:, 1]
+        prob[i, j] = p
+        prob[j, i] = 1 - p
+    return prob
+
+
 class Command(BaseCommand):
-    help = "Train NN from dataset and predict next basho"
+    help = "Train NN models and predict the next basho"
 
     def add_arguments(self, parser):
-        parser.add_argument("dataset", help="CSV training dataset")
-        parser.add_argument("--iterations", type=int, default=10000)
-        parser.add_argument(
+        actions = parser.add_subparsers(dest="action", required=True)
+
+        train = actions.add_parser(
+            "train", help="Train a model and store it in the registry"
+        )
+        train.add_argument(
+            "dataset", help="Training dataset (CSV, Parquet or Feather)"
+        )
+        train.add_argument(
             "--cv",
             type=int,
             default=0,
             help="Run GridSearchCV with given number of folds",
         )
+        train.add_argument(
+            "--force",
+            action="store_true",
+            help="Retrain even if the dataset was already trained on",
+        )
 
-    def handle(self, dataset, iterations, cv=0, *args, **options):
-        df = pd.read_csv(dataset)
+        predict = actions.add_parser(
+            "predict", help="Simulate the next basho with a stored model"
+        )
+        predict.add_argument(
+            "--model",
+            default=None,
+            help="Registry version to use (defaults to the latest)",
+        )
+        predict.add_argument("--iterations", type=int, default=10000)
+        predict.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Random seed for a reproducible simulation",
+        )
+        predict.add_argument(
+            "--round-robin",
+            action="store_true",
+            help="Play every pair once instead of simulated 15-day schedules",
+        )
+        predict.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Process pool size for the schedule simulation",
+        )
+
+    def handle(self, action, *args, **options):
+        registry = ModelRegistry(settings.MODEL_DIR)
+        if action == "train":
+            self.train(registry, **options)
+        else:
+            self.predict(registry, **options)
+
+    def train(self, registry, dataset, cv=0, force=False, **options):
+        digest = file_hash(dataset)
+        params = {"cv": cv}
+        existing = registry.find(digest, params)
+        if existing and not force:
+            self.stdout.write(
+                f"Model {existing['version']} already trained on {dataset}"
+            )
+            return
+
+        df = read_dataset(dataset)
         required = FEATURES + ["east_win"]
         if not all(col in df.columns for col in required):
             raise CommandError("Dataset missing required columns")
         df = df.dropna(subset=required)
         X = df[FEATURES].astype(float).to_numpy()
         y = df["east_win"].astype(int).to_numpy()
+        metrics = {}
 
         if cv:
             pipe = Pipeline(
@@ -87,6 +264,12 @@ class Command(BaseCommand):
             )
             scaler = grid.best_estimator_.named_steps["scaler"]
             model = grid.best_estimator_.named_steps["clf"]
+            metrics["cv_score"] = float(grid.best_score_)
+            # Results go with the metrics; ``params`` identify the request
+            metrics["best_params"] = {
+                key: list(value) if isinstance(value, tuple) else value
+                for key, value in grid.best_params_.items()
+            }
         else:
             scaler = StandardScaler().fit(X)
             X_scaled = scaler.transform(X)
@@ -95,6 +278,42 @@ class Command(BaseCommand):
             )
             model.fit(X_scaled, y)
 
+        proba = model.predict_proba(scaler.transform(X))[:, 1]
+        metrics["samples"] = len(y)
+        metrics["accuracy"] = float(np.mean((proba >= 0.5) == y))
+        metrics["log_loss"] = float(log_loss(y, proba, labels=[0, 1]))
+        entry = registry.save(model, scaler, FEATURES, digest, params, metrics)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Saved model {entry['version']} "
+                f"(accuracy {metrics['accuracy']:.3f}, "
+                f"log loss {metrics['log_loss']:.3f})"
+            )
+        )
+
+    def predict(
+        self,
+        registry,
+        iterations,
+        model=None,
+        seed=None,
+        round_robin=False,
+        workers=1,
+        **options,
+    ):
+        try:
+            entry, clf, scaler = registry.load(model)
+        except LookupError:
+            raise CommandError(
+                f"Model {model} not found"
+                if model
+                else "No trained model; run `nn_predict train DATASET` first"
+            ) from None
+        if entry["features"] != FEATURES:
+            raise CommandError(
+                f"Model {entry['version']} was trained on different features"
+            )
+
         next_basho = (
             Basho.objects.filter(bouts__isnull=True)
             .order_by("-year", "-month")
@@ -109,128 +328,77 @@ class Command(BaseCommand):
                 intai__isnull=True, rank__division__name="Makuuchi"
             ).select_related("rank", "heya")
         )
+        # Banzuke order drives the simulated torikumi
+        rikishi.sort(key=lambda r: r.rank.value)
         if not rikishi:
             self.stdout.write("No rikishi found")
             return
 
-        ratings = {
-            r.id: BashoRating.objects.filter(rikishi=r)
-            .order_by("-basho__year", "-basho__month")
-            .first()
-            for r in rikishi
-        }
-        histories = {
-            r.id: BashoHistory.objects.filter(
-                rikishi=r, basho=next_basho
-            ).first()
-            for r in rikishi
-        }
-
-        start = next_basho.start_date or date(
-            next_basho.year, next_basho.month, 1
-        )
-
-        probs = {}
-        for r1, r2 in combinations(rikishi, 2):
-            if r1.heya_id and r1.heya_id == r2.heya_id:
-                continue
-            rating1 = ratings.get(r1.id)
-            rating2 = ratings.get(r2.id)
-            history1 = histories.get(r1.id)
-            history2 = histories.get(r2.id)
-            if not rating1 or not rating2 or not history1 or not history2:
-                p = 0.5
-            else:
-                h1 = history1.height or r1.height or 0
-                h2 = history2.height or r2.height or 0
-                w1 = history1.weight or r1.weight or 0
-                w2 = history2.weight or r2.weight or 0
-                bmi1 = round(w1 / ((h1 / 100) ** 2), 2) if h1 and w1 else 0
-                bmi2 = round(w2 / ((h2 / 100) ** 2), 2) if h2 and w2 else 0
-                age1 = (
-                    (start - r1.birth_date).days / 365.25
-                    if r1.birth_date
-                    else None
-                )
-                age2 = (
-                    (start - r2.birth_date).days / 365.25
-                    if r2.birth_date
-                    else None
-                )
-                exp1 = (start - r1.debut).days / 365.25 if r1.debut else None
-                exp2 = (start - r2.debut).days / 365.25 if r2.debut else None
-                bouts = Bout.objects.filter(
-                    Q(east_id=r1.id, west_id=r2.id)
-                    | Q(east_id=r2.id, west_id=r1.id),
-                    Q(basho__year__lt=next_basho.year)
-                    | Q(
-                        basho__year=next_basho.year,
-                        basho__month__lt=next_basho.month,
-                    ),
-                )
-                wins1 = bouts.filter(winner=r1).count()
-                wins2 = bouts.filter(winner=r2).count()
-                rec_diff = wins1 - wins2
-                feat = [
-                    rating1.rating - rating2.rating,
-                    history1.rank.value - history2.rank.value,
-                    rating1.rd - rating2.rd,
-                    h1 - h2,
-                    w1 - w2,
-                    bmi1 - bmi2,
-                    (
-                        age1 - age2
-                        if age1 is not None and age2 is not None
-                        else 0
-                    ),
-                    (
-                        exp1 - exp2
-                        if exp1 is not None and exp2 is not None
-                        else 0
-                    ),
-                    rec_diff,
-                ]
-                feat = scaler.transform([feat])
-                p = float(model.predict_proba(feat)[0, 1])
-            probs.setdefault(r1.id, {})[r2.id] = p
-            probs.setdefault(r2.id, {})[r1.id] = 1 - p
+        prob = pair_probabilities(rikishi, next_basho, scaler, clf)
+        heya = [r.heya_id for r in rikishi]
 
-        records = {r.id: {"wins": 0, "total": 0, "obj": r} for r in rikishi}
+        if round_robin:
+            pairs = pair_indices(heya)
+            wins, bouts = simulate_round_robin(
+                prob, iterations, pairs, seed=seed
+            )
+            results = {
+                "wins": np.divide(
+                    wins * 15, bouts, out=np.zeros(len(wins)), where=bouts > 0
+                ),
+                "yusho": [None] * len(rikishi),
+                "kachi_koshi": [None] * len(rikishi),
+            }
+        else:
+            results = simulate_basho(
+                prob, heya, iterations, seed=seed, workers=workers
+            )
 
-        pairs = [
-            (r1, r2)
-            for r1, r2 in combinations(rikishi, 2)
-            if not (r1.heya_id and r1.heya_id == r2.heya_id)
+        records = [
+            {
+                "obj": r,
+                "pred_wins": float(results["wins"][pos]),
+                "yusho": _optional(results["yusho"][pos]),
+                "kachi_koshi": _optional(results["kachi_koshi"][pos]),
+            }
+            for pos, r in enumerate(rikishi)
         ]
-
-        for _ in range(iterations):
-            for r1, r2 in pairs:
-                p = probs[r1.id][r2.id]
-                winner = r1 if random.random() < p else r2
-                records[winner.id]["wins"] += 1
-                records[r1.id]["total"] += 1
-                records[r2.id]["total"] += 1
-
-        # Compute predicted wins
-        for rec in records.values():
-            total = rec["total"]
-            win_rate = rec["wins"] / total if total else 0
-            rec["pred_wins"] = win_rate * 15
-            Prediction.objects.update_or_create(
-                rikishi=rec["obj"],
-                basho=next_basho,
-                defaults={"wins": rec["pred_wins"]},
-            )
+        bulk_upsert(
+            Prediction,
+            (
+                Prediction(
+                    rikishi=rec["obj"],
+                    basho=next_basho,
+                    wins=rec["pred_wins"],
+                    yusho=rec["yusho"],
+                    kachi_koshi=rec["kachi_koshi"],
+                )
+                for rec in records
+            ),
+            unique_fields=["rikishi", "basho"],
+            update_fields=["wins", "yusho", "kachi_koshi"],
+        )
+        invalidate_predictions(next_basho.slug)
         # Sort by predicted wins descending
         sorted_records = sorted(
-            records.values(), key=lambda r: r["pred_wins"], reverse=True
+            records, key=lambda r: r["pred_wins"], reverse=True
+        )
+        self.stdout.write(
+            f"Predictions for {next_basho} (model {entry['version']}):"
         )
-        self.stdout.write(f"Predictions for {next_basho}:")
         for rec in sorted_records:
-            self.stdout.write(
-                (
-                    f"{rec['obj'].rank.short_name()} "
-                    f"{rec['obj'].name: <12} "
-                    f"{rec['pred_wins']:.2f} wins"
-                )
+            line = (
+                f"{rec['obj'].rank.short_name()} "
+                f"{rec['obj'].name: <12} "
+                f"{rec['pred_wins']:.2f} wins"
             )
+            if rec["yusho"] is not None:
+                line += (
+                    f" yusho {rec['yusho']:.1%}"
+                    f" kachi-koshi {rec['kachi_koshi']:.1%}"
+                )
+            self.stdout.write(line)
+
+
+def _optional(value):
+    return None if value is None else float(value)
@@ -9,6 +9,7 @@ from app.models.division import Division
 from app.models.rank import Rank
 from app.models.rikishi import Heya, Rikishi, Shusshin
 from libs.constants import DIVISION_LEVELS
+from libs.ingest import finish_job, save_checkpoint, start_job
 from libs.sumoapi import SumoApiClient
 
 
@@ -40,142 +41,166 @@ class Command(AsyncBaseCommand):
     def warn(self, msg):
         self.stdout.write(self.style.WARNING(msg))
 
-    async def run(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted run after its last saved page",
+        )
+
+    async def run(self, *args, resume=False, **kwargs):
+        job = await sync_to_async(lambda: start_job("populate", resume))()
+        await self._populate_divisions()
+        await self._load_caches()
+        skipped = []
+
         async with SumoApiClient() as api:
-            await self._populate_divisions()
             self.log("Fetching rikishi from API...")
-            rikishi_data = await api.get_all_rikishi()
-            self.log(f"Fetched {len(rikishi_data)} rikishi.")
+            fetched = 0
+            if job.offset:
+                self.log(f"Resuming after {job.offset} rikishi")
+            # Pages are processed while the remaining ones are downloaded
+            async for page in api.iter_rikishi_pages():
+                fetched += len(page)
+                if fetched <= job.offset:
+                    continue
+                new_rikishi = []
+                updated_rikishi = []
+                for data in page:
+                    rikishi, is_new = await self._build_rikishi(data)
+                    if rikishi is None:
+                        skipped.append(data)
+                    elif is_new:
+                        new_rikishi.append(rikishi)
+                    else:
+                        updated_rikishi.append(rikishi)
+                # Each page is saved before the job offset moves past it
+                await self._bulk_save(new_rikishi, updated_rikishi)
+                await sync_to_async(
+                    lambda offset=fetched: save_checkpoint(job, offset=offset)
+                )()
+            self.log(f"Fetched {fetched} rikishi.")
+
+        if skipped:
+            self.warn(f"Skipped {len(skipped)} rikishi due to missing data.")
+
+        await sync_to_async(lambda: finish_job(job))()
+        self.log("✅ Rikishi import complete.")
 
-        # Prefetch caches
-        existing_rikishi = await sync_to_async(
+    async def _load_caches(self):
+        self.existing_rikishi = await sync_to_async(
             lambda: {r.id: r for r in Rikishi.objects.all()}
         )()
-        existing_ids = set(existing_rikishi.keys())
+        self.existing_ids = set(self.existing_rikishi)
 
-        rank_cache = await sync_to_async(
+        self.rank_cache = await sync_to_async(
             lambda: {
                 tuple([r.title, r.order, r.direction]): r
                 for r in Rank.objects.all()
             }
         )()
-        heya_cache = await sync_to_async(
+        self.heya_cache = await sync_to_async(
             lambda: {h.name: h for h in Heya.objects.all()}
         )()
-        shusshin_cache = await sync_to_async(
+        self.shusshin_cache = await sync_to_async(
             lambda: {
                 (s.name, s.international): s for s in Shusshin.objects.all()
             }
         )()
-        division_cache = await sync_to_async(
+        self.division_cache = await sync_to_async(
             lambda: {d.name: d for d in Division.objects.all()}
         )()
 
-        new_rikishi = []
-        updated_rikishi = []
-        skipped = []
-
-        for data in rikishi_data:
-            rikishi_id = data.get("id")
-            if not rikishi_id or "shikonaEn" not in data:
-                self.warn(f"Skipping rikishi with missing ID or name: {data}")
-                skipped.append(data)
-                continue
-
-            is_new = rikishi_id not in existing_ids
-            rikishi = (
-                Rikishi(id=rikishi_id)
-                if is_new
-                else existing_rikishi[rikishi_id]
-            )
-
-            # Fields
-            rikishi.sumodb_id = data.get("sumodbId")
-            rikishi.nsk_id = data.get("nskId") or None
-            rikishi.name = data.get("shikonaEn")
-            rikishi.name_jp = data.get("shikonaJp") or ""
-            rikishi.height = data.get("height")
-            rikishi.weight = data.get("weight")
-            rikishi.birth_date = parse_date(
-                data.get("birthDate"), "%Y-%m-%dT%H:%M:%SZ"
-            )
-            rikishi.debut = parse_date(data.get("debut"), "%Y%m")
-            rikishi.intai = parse_date(data.get("intai"), "%Y-%m-%dT%H:%M:%SZ")
-
-            # Rank
-            rank_str = data.get("currentRank")
-            if rank_str:
-                parts = rank_str.split(" ")
-                key = tuple(parts)
-                division = division_cache.get(parts[0]) or division_cache.get(
-                    "Makuuchi"
-                )
-                if key not in rank_cache:
-                    if len(parts) == 3:
-                        rank = await Rank.objects.aget_or_create(
-                            slug=slugify(rank_str),
-                            title=parts[0],
-                            order=parts[1],
-                            direction=parts[2],
-                            division=division,
-                        )
+    async def _build_rikishi(self, data):
+        """Return ``(rikishi, is_new)`` for an API record.
+
+        Returns ``(None, False)`` when the record lacks an ID or name.
+        """
+        rikishi_id = data.get("id")
+        if not rikishi_id or "shikonaEn" not in data:
+            self.warn(f"Skipping rikishi with missing ID or name: {data}")
+            return None, False
+
+        is_new = rikishi_id not in self.existing_ids
+        rikishi = (
+            Rikishi(id=rikishi_id)
+            if is_new
+            else self.existing_rikishi[rikishi_id]
+        )
+
+        # Fields
+        rikishi.sumodb_id = data.get("sumodbId")
+        rikishi.nsk_id = data.get("nskId") or None
+        rikishi.name = data.get("shikonaEn")
+        rikishi.name_jp = data.get("shikonaJp") or ""
+        rikishi.height = data.get("height")
+        rikishi.weight = data.get("weight")
+        rikishi.birth_date = parse_date(
+            data.get("birthDate"), "%Y-%m-%dT%H:%M:%SZ"
+        )
+        rikishi.debut = parse_date(data.get("debut"), "%Y%m")
+        rikishi.intai = parse_date(data.get("intai"), "%Y-%m-%dT%H:%M:%SZ")
+
+        # Rank
+        rank_str = data.get("currentRank")
+        if rank_str:
+            parts = rank_str.split(" ")
+            key = tuple(parts)
+            divisions = self.division_cache
+            division = divisions.get(parts[0]) or divisions.get("Makuuchi")
+            if key not in self.rank_cache:
+                if len(parts) == 3:
+                    rank = await Rank.objects.aget_or_create(
+                        slug=slugify(rank_str),
+                        title=parts[0],
+                        order=parts[1],
+                        direction=parts[2],
+                        division=division,
+                    )
+                else:
+                    rank = await Rank.objects.aget_or_create(
+                        slug=slugify(rank_str),
+                        title=parts[0],
+                        division=division,
+                    )
+                self.rank_cache[key] = rank[0]
+            rikishi.rank = self.rank_cache[key]
+
+        # Heya
+        heya_name = data.get("heya")
+        if heya_name and heya_name != "-":
+            if heya_name not in self.heya_cache:
+                (
+                    self.heya_cache[heya_name],
+                    _,
+                ) = await Heya.objects.aget_or_create(name=heya_name)
+            rikishi.heya = self.heya_cache[heya_name]
+
+        # Shusshin
+        shusshin_raw = data.get("shusshin")
+        if shusshin_raw and shusshin_raw != "-":
+            cleaned = clean_shusshin_name(shusshin_raw)
+            try:
+                country = pycountry.countries.search_fuzzy(cleaned)[0]
+                is_japan = country.name == "Japan"
+                key = (cleaned if is_japan else country.name, not is_japan)
+                if key not in self.shusshin_cache:
+                    if is_japan:
+                        (
+                            self.shusshin_cache[key],
+                            _,
+                        ) = await Shusshin.objects.aget_or_create(name=key[0])
                     else:
-                        rank = await Rank.objects.aget_or_create(
-                            slug=slugify(rank_str),
-                            title=parts[0],
-                            division=division,
+                        (
+                            self.shusshin_cache[key],
+                            _,
+                        ) = await Shusshin.objects.aget_or_create(
+                            name=key[0], international=True
                         )
-                    rank_cache[key] = rank[0]
-                rikishi.rank = rank_cache[key]
-
-            # Heya
-            heya_name = data.get("heya")
-            if heya_name and heya_name != "-":
-                if heya_name not in heya_cache:
-                    (
-                        heya_cache[heya_name],
-                        _,
-                    ) = await Heya.objects.aget_or_create(name=heya_name)
-                rikishi.heya = heya_cache[heya_name]
-
-            # Shusshin
-            shusshin_raw = data.get("shusshin")
-            if shusshin_raw and shusshin_raw != "-":
-                cleaned = clean_shusshin_name(shusshin_raw)
-                try:
-                    country = pycountry.countries.search_fuzzy(cleaned)[0]
-                    is_japan = country.name == "Japan"
-                    key = (cleaned if is_japan else country.name, not is_japan)
-                    if key not in shusshin_cache:
-                        if is_japan:
-                            (
-                                shusshin_cache[key],
-                                _,
-                            ) = await Shusshin.objects.aget_or_create(
-                                name=key[0]
-                            )
-                        else:
-                            (
-                                shusshin_cache[key],
-                                _,
-                            ) = await Shusshin.objects.aget_or_create(
-                                name=key[0], international=True
-                            )
-                    rikishi.shusshin = shusshin_cache[key]
-                except LookupError:
-                    self.warn(f"Could not identify country: {cleaned}")
-
-            # Save logic
-            if is_new:
-                new_rikishi.append(rikishi)
-            else:
-                updated_rikishi.append(rikishi)
-
-        if skipped:
-            self.warn(f"Skipped {len(skipped)} rikishi due to missing data.")
-
-        await self._bulk_save(new_rikishi, updated_rikishi)
-        self.log("✅ Rikishi import complete.")
+                rikishi.shusshin = self.shusshin_cache[key]
+            except LookupError:
+                self.warn(f"Could not identify country: {cleaned}")
+        return rikishi, is_new
 
     async def _populate_divisions(self):
         for name, level in DIVISION_LEVELS:
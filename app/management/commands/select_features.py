@@ -9,16 +9,19 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
 from app.management.commands import AsyncBaseCommand
+from libs.dataset import read_dataset, write_dataset
 
 
 class Command(AsyncBaseCommand):
     """Select informative features from a dataset."""
 
-    help = "Run feature selection on CSV dataset"
+    help = "Run feature selection on a dataset"
 
     def add_arguments(self, parser):
-        parser.add_argument("infile", help="CSV file path")
-        parser.add_argument("outfile", nargs="?", help="Reduced CSV path")
+        parser.add_argument(
+            "infile", help="Dataset file (CSV, Parquet or Feather)"
+        )
+        parser.add_argument("outfile", nargs="?", help="Reduced dataset path")
         parser.add_argument(
             "--k", type=int, default=20, help="Number of features to keep"
         )
@@ -35,7 +38,7 @@ class Command(AsyncBaseCommand):
         meta: str | None = None,
         **options,
     ):
-        df = pd.read_csv(infile)
+        df = read_dataset(infile)
         if "east_win" not in df.columns:
             raise CommandError("Dataset must contain 'east_win' column")
 
@@ -45,14 +48,6 @@ class Command(AsyncBaseCommand):
         # remove identifiers that leak match info
         X = X.drop(columns=["east_id", "west_id"], errors="ignore")
 
-        # convert possible numeric strings to numbers without deprecated
-        # errors="ignore" argument
-        for col in X.select_dtypes(include="object").columns:
-            try:
-                X[col] = pd.to_numeric(X[col])
-            except (ValueError, TypeError):
-                continue
-
         # one-hot encode rank and division columns early
         early_cols = [
             c for c in ("east_rank", "west_rank", "division") if c in X.columns
@@ -122,7 +117,7 @@ class Command(AsyncBaseCommand):
             self.stdout.write(f"- {feat}: {score:.2f}")
 
         if outfile:
-            df[selected.tolist() + ["east_win"]].to_csv(outfile, index=False)
+            write_dataset(df[selected.tolist() + ["east_win"]], outfile)
             self.stdout.write(self.style.SUCCESS(f"Saved to {outfile}"))
 
         if meta:
@@ -0,0 +1,24 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_prediction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingSnapshot',
+            fields=[
+                ('basho', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_snapshot', serialize=False, to='app.basho')),
+                ('players', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'verbose_name_plural': 'Rating snapshots',
+                'ordering': ['basho__year', 'basho__month'],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_ratingsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='yusho',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)]),
+        ),
+        migrations.AddField(
+            model_name='prediction',
+            name='kachi_koshi',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)]),
+        ),
+    ]
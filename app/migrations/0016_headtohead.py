@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_prediction_yusho_kachi_koshi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadToHead',
+            fields=[
+                ('pk', models.CompositePrimaryKey('rikishi_a_id', 'rikishi_b_id', 'basho_id', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('a_wins', models.PositiveIntegerField(default=0)),
+                ('b_wins', models.PositiveIntegerField(default=0)),
+                ('basho', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='head_to_head', to='app.basho')),
+                ('rikishi_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='head_to_head_as_a', to='app.rikishi')),
+                ('rikishi_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='head_to_head_as_b', to='app.rikishi')),
+            ],
+            options={
+                'verbose_name_plural': 'Head-to-head records',
+                'ordering': ['basho__year', 'basho__month', 'rikishi_a_id', 'rikishi_b_id'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_headtohead'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('last_rikishi_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('offset', models.PositiveIntegerField(default=0)),
+                ('oldest_basho', models.CharField(blank=True, max_length=6)),
+                ('finished', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Ingest jobs',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -1,8 +1,11 @@
 from .basho import Basho  # noqa: F401
 from .bout import Bout  # noqa: F401
 from .division import Division  # noqa: F401
+from .head_to_head import HeadToHead  # noqa: F401
 from .history import BashoHistory  # noqa: F401
+from .ingest_job import IngestJob  # noqa: F401
 from .prediction import Prediction  # noqa: F401
 from .rank import Rank  # noqa: F401
 from .rating import BashoRating  # noqa: F401
 from .rikishi import Heya, Rikishi, Shusshin  # noqa: F401
+from .snapshot import RatingSnapshot  # noqa: F401
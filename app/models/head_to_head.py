@@ -0,0 +1,47 @@
+from django.db import models
+
+from .basho import Basho
+from .rikishi import Rikishi
+
+
+class HeadToHead(models.Model):
+    """Cumulative record of two rikishi up to and including a ``Basho``.
+
+    ``rikishi_a`` always has the lower id. Rows only exist for basho in
+    which the pair met, so the record before a basho is the latest earlier
+    row.
+    """
+
+    pk = models.CompositePrimaryKey("rikishi_a_id", "rikishi_b_id", "basho_id")
+    rikishi_a = models.ForeignKey(
+        Rikishi,
+        on_delete=models.CASCADE,
+        related_name="head_to_head_as_a",
+    )
+    rikishi_b = models.ForeignKey(
+        Rikishi,
+        on_delete=models.CASCADE,
+        related_name="head_to_head_as_b",
+    )
+    basho = models.ForeignKey(
+        Basho,
+        on_delete=models.CASCADE,
+        related_name="head_to_head",
+    )
+    a_wins = models.PositiveIntegerField(default=0)
+    b_wins = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = [
+            "basho__year",
+            "basho__month",
+            "rikishi_a_id",
+            "rikishi_b_id",
+        ]
+        verbose_name_plural = "Head-to-head records"
+
+    def __str__(self):
+        return (
+            f"{self.rikishi_a_id} vs {self.rikishi_b_id} {self.basho_id}: "
+            f"{self.a_wins}-{self.b_wins}"
+        )
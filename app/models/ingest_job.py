@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class IngestJob(models.Model):
+    """Progress of an import command, used to resume an interrupted run.
+
+    ``name`` identifies the command and the options that scope its work.
+    ``last_rikishi_id`` is the highest rikishi id whose data is saved,
+    ``offset`` the number of paged API records processed and
+    ``oldest_basho`` the oldest basho written so far.
+    """
+
+    name = models.CharField(max_length=64, primary_key=True)
+    last_rikishi_id = models.PositiveIntegerField(blank=True, null=True)
+    offset = models.PositiveIntegerField(default=0)
+    oldest_basho = models.CharField(max_length=6, blank=True)
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name_plural = "Ingest jobs"
+
+    def __str__(self):
+        state = "finished" if self.finished else "in progress"
+        return f"{self.name}: {state}"
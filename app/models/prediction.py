@@ -6,7 +6,7 @@ from .rikishi import Rikishi
 
 
 class Prediction(models.Model):
-    """Predicted wins for a rikishi in a future ``Basho``."""
+    """Predicted results for a rikishi in a future ``Basho``."""
 
     pk = models.CompositePrimaryKey("rikishi_id", "basho_id")
     rikishi = models.ForeignKey(
@@ -22,6 +22,16 @@ class Prediction(models.Model):
     wins = models.FloatField(
         validators=[MinValueValidator(0.0), MaxValueValidator(15.0)]
     )
+    yusho = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+    )
+    kachi_koshi = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+    )
 
     class Meta:
         ordering = ["basho__year", "basho__month", "rikishi_id"]
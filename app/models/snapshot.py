@@ -0,0 +1,23 @@
+from django.db import models
+
+from .basho import Basho
+
+
+class RatingSnapshot(models.Model):
+    """Packed Glicko state of every rikishi after a ``Basho`` was rated."""
+
+    basho = models.OneToOneField(
+        Basho,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="rating_snapshot",
+    )
+    players = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ["basho__year", "basho__month"]
+        verbose_name_plural = "Rating snapshots"
+
+    def __str__(self):
+        return f"{self.basho_id}: {self.players} players"
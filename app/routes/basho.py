@@ -1,12 +1,19 @@
 from typing import List, Optional
 
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import F, FilteredRelation, Q
 from django.shortcuts import get_object_or_404
 from ninja import Router
 
-from app.models import Basho, Bout
-from app.schemas import BashoSchema, BoutSchema
-from libs.api_utils import basho_to_schema, bout_to_schema
+from app.models import Basho, Bout, Prediction
+from app.schemas import BashoSchema, BoutSchema, PredictionSchema
+from libs.api_utils import (
+    basho_to_schema,
+    bout_to_schema,
+    prediction_to_schema,
+    predictions_cache,
+    predictions_cache_key,
+)
 
 router = Router()
 
@@ -52,3 +59,37 @@ def basho_bouts(
             Q(east__id=rikishi_id) | Q(west__id=rikishi_id)
         )
     return [bout_to_schema(b) for b in queryset]
+
+
+@router.get("{slug}/predictions/", response=List[PredictionSchema])
+def basho_predictions(request, slug: str):
+    """Return predicted results for a basho, most expected wins first.
+
+    Ranks come from the banzuke of that basho, falling back to the current
+    rank before it is imported. The table is cached per basho until
+    ``nn_predict`` stores new rows.
+    """
+
+    key = predictions_cache_key(slug)
+    cache = predictions_cache()
+    data = cache.get(key)
+    if data is None:
+        queryset = (
+            Prediction.objects.filter(basho_id=slug)
+            .select_related("rikishi__rank")
+            .annotate(
+                banzuke=FilteredRelation(
+                    "rikishi__ranking_history",
+                    condition=Q(rikishi__ranking_history__basho=F("basho")),
+                ),
+                banzuke_title=F("banzuke__rank__title"),
+                banzuke_order=F("banzuke__rank__order"),
+                banzuke_direction=F("banzuke__rank__direction"),
+            )
+            .order_by("-wins", "rikishi_id")
+        )
+        data = [prediction_to_schema(p).dict() for p in queryset]
+        if not data:
+            get_object_or_404(Basho, slug=slug)
+        cache.set(key, data, settings.PREDICTIONS_CACHE_TIMEOUT)
+    return data
@@ -2,6 +2,7 @@ from .basho import BashoSchema  # noqa: F401
 from .bout import BoutSchema  # noqa: F401
 from .division import DivisionSchema  # noqa: F401
 from .history import BashoHistorySchema  # noqa: F401
+from .prediction import PredictionSchema  # noqa: F401
 from .rating import BashoRatingSchema  # noqa: F401
 from .rikishi import RikishiSchema  # noqa: F401
 
@@ -11,5 +12,6 @@ __all__ = [
     "DivisionSchema",
     "BashoHistorySchema",
     "BashoRatingSchema",
+    "PredictionSchema",
     "RikishiSchema",
 ]
@@ -0,0 +1,14 @@
+from typing import Optional
+
+from ninja import Schema
+
+
+class PredictionSchema(Schema):
+    """Serialized representation of a ``Prediction``."""
+
+    rikishi_id: int
+    shikona: str
+    rank: Optional[str] = None
+    wins: float
+    yusho: Optional[float] = None
+    kachi_koshi: Optional[float] = None
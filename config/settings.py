@@ -93,6 +93,25 @@ DATABASES = {
     }
 }
 
+# Caches. Basho prediction tables live in a file-based cache shared between
+# the web server and management commands, so that ``nn_predict`` can
+# invalidate them.
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "predictions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("PREDICTIONS_CACHE_DIR")
+        or BASE_DIR / ".cache" / "predictions",
+    },
+}
+
+# Seconds a basho's prediction table is served from the cache
+PREDICTIONS_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -140,6 +159,13 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
+# Directory for cached analytics data such as the columnar bout store.
+# Caching is disabled when unset.
+BOUT_CACHE_DIR = os.environ.get("BOUT_CACHE_DIR") or None
+
+# Registry of trained prediction models written by ``nn_predict train``.
+MODEL_DIR = os.environ.get("MODEL_DIR") or BASE_DIR / "models"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,10 +1,22 @@
-from app.models import Basho, BashoHistory, BashoRating, Bout, Division, Rikishi
+from django.core.cache import caches
+
+from app.models import (
+    Basho,
+    BashoHistory,
+    BashoRating,
+    Bout,
+    Division,
+    Prediction,
+    Rank,
+    Rikishi,
+)
 from app.schemas import (
     BashoHistorySchema,
     BashoRatingSchema,
     BashoSchema,
     BoutSchema,
     DivisionSchema,
+    PredictionSchema,
     RikishiSchema,
 )
 
@@ -88,3 +100,45 @@ def rating_to_schema(rating: BashoRating) -> BashoRatingSchema:
         rd=rating.rd,
         vol=rating.vol,
     )
+
+
+def prediction_to_schema(prediction: Prediction) -> PredictionSchema:
+    """Convert a ``Prediction`` instance to ``PredictionSchema``.
+
+    A banzuke rank annotated as ``banzuke_title``, ``banzuke_order`` and
+    ``banzuke_direction`` takes precedence over the rikishi's current rank.
+    """
+
+    rank = prediction.rikishi.rank
+    if getattr(prediction, "banzuke_title", None):
+        rank = Rank(
+            title=prediction.banzuke_title,
+            order=prediction.banzuke_order,
+            direction=prediction.banzuke_direction,
+        )
+    return PredictionSchema(
+        rikishi_id=prediction.rikishi_id,
+        shikona=prediction.rikishi.name,
+        rank=rank.name() if rank else None,
+        wins=prediction.wins,
+        yusho=prediction.yusho,
+        kachi_koshi=prediction.kachi_koshi,
+    )
+
+
+def predictions_cache():
+    """Return the cache shared by the API and ``nn_predict``."""
+
+    return caches["predictions"]
+
+
+def predictions_cache_key(slug: str) -> str:
+    """Return the cache key of the prediction table for basho ``slug``."""
+
+    return f"api:basho:{slug}:predictions"
+
+
+def invalidate_predictions(slug: str) -> None:
+    """Drop the cached prediction table for basho ``slug``."""
+
+    predictions_cache().delete(predictions_cache_key(slug))
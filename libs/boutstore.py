@@ -0,0 +1,170 @@
+"""Columnar in-memory copy of every ``Bout`` for ``glicko`` and ``dataset``.
+
+Loading hundreds of thousands of bouts through model instances is slow.
+:class:`BoutStore` keeps the handful of columns the rating and dataset code
+needs as NumPy arrays, fetched with a single ``values_list`` query and
+optionally cached to an ``.npz`` file keyed by the highest bout id.
+"""
+
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from app.models import Bout
+
+COLUMNS = ("basho", "day", "match_no", "division", "east", "west", "east_win")
+
+
+class BoutStore:
+    """Bouts ordered by basho, day and match number as parallel arrays.
+
+    ``basho`` holds an index into :attr:`basho_slugs`, ``division`` the
+    division level and ``east_win`` is ``1`` when the east rikishi won.
+    """
+
+    def __init__(self, basho_slugs, key=None, **columns):
+        self.basho_slugs = np.asarray(basho_slugs, dtype="U6")
+        self.key = key
+        for name in COLUMNS:
+            setattr(self, name, np.asarray(columns[name]))
+
+    def __len__(self):
+        return len(self.east)
+
+    @staticmethod
+    def current_key():
+        """Return ``(max bout id, bout count)`` identifying the table."""
+        stats = Bout.objects.aggregate(max_id=Max("id"), count=Count("id"))
+        return stats["max_id"] or 0, stats["count"]
+
+    @classmethod
+    def from_db(cls, key=None):
+        """Build a store straight from the database."""
+        rows = (
+            Bout.objects.order_by(
+                "basho__year", "basho__month", "day", "match_no"
+            )
+            .values_list(
+                "basho_id",
+                "day",
+                "match_no",
+                "division__level",
+                "east_id",
+                "west_id",
+                "winner_id",
+            )
+            .iterator(chunk_size=5000)
+        )
+        slugs = []
+        data = []
+        for basho_id, *values in rows:
+            if not slugs or slugs[-1] != basho_id:
+                slugs.append(basho_id)
+            data.append([len(slugs) - 1, *values])
+        arr = np.array(data, dtype=np.int64).reshape(-1, 7)
+        return cls(
+            slugs,
+            key=key,
+            basho=arr[:, 0].astype(np.int32),
+            day=arr[:, 1].astype(np.int16),
+            match_no=arr[:, 2].astype(np.int16),
+            division=arr[:, 3].astype(np.int8),
+            east=arr[:, 4].astype(np.int32),
+            west=arr[:, 5].astype(np.int32),
+            east_win=(arr[:, 6] == arr[:, 4]).astype(np.int8),
+        )
+
+    @classmethod
+    def load(cls, cache_dir=None):
+        """Return the store, reusing the ``.npz`` cache when still current.
+
+        ``cache_dir`` defaults to ``settings.BOUT_CACHE_DIR``; caching is
+        skipped when neither is set.
+        """
+        if cache_dir is None:
+            cache_dir = getattr(settings, "BOUT_CACHE_DIR", None)
+        key = cls.current_key()
+        if not cache_dir:
+            return cls.from_db(key)
+
+        path = Path(cache_dir) / f"bouts-{key[0]}-{key[1]}.npz"
+        if path.exists():
+            return cls.from_file(path)
+        store = cls.from_db(key)
+        store.save(path)
+        return store
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a store previously written with :meth:`save`."""
+        with np.load(path) as arrays:
+            columns = {name: arrays[name] for name in COLUMNS}
+            key = tuple(arrays["key"].tolist())
+            return cls(arrays["basho_slugs"], key=key, **columns)
+
+    def save(self, path):
+        """Write the store to ``path`` and drop older cache files beside it."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for old in path.parent.glob("bouts-*.npz"):
+            if old != path:
+                old.unlink()
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            basho_slugs=self.basho_slugs,
+            key=np.asarray(self.key or (0, 0), dtype=np.int64),
+            **{name: getattr(self, name) for name in COLUMNS},
+        )
+        tmp.replace(path)
+
+    def take(self, idx):
+        """Return a new store restricted to rows ``idx`` (mask or indices)."""
+        return BoutStore(
+            self.basho_slugs,
+            key=self.key,
+            **{name: getattr(self, name)[idx] for name in COLUMNS},
+        )
+
+    def basho_index(self, slug):
+        """Return the position of ``slug`` in :attr:`basho_slugs`."""
+        return int(np.searchsorted(self.basho_slugs, slug))
+
+    def basho_slice(self, slug):
+        """Return the row slice holding bouts of the basho ``slug``."""
+        pos = self.basho_index(slug)
+        if pos == len(self.basho_slugs) or self.basho_slugs[pos] != slug:
+            return slice(0, 0)
+        start, stop = np.searchsorted(self.basho, [pos, pos + 1])
+        return slice(int(start), int(stop))
+
+    def since(self, slug):
+        """Return bouts from the basho ``slug`` onward."""
+        start = np.searchsorted(self.basho, self.basho_index(slug))
+        return self.take(slice(int(start), None))
+
+    def for_basho(self, slug):
+        """Return bouts of a single basho."""
+        return self.take(self.basho_slice(slug))
+
+    def for_rikishi(self, rikishi_id):
+        """Return every bout fought by ``rikishi_id``."""
+        return self.take((self.east == rikishi_id) | (self.west == rikishi_id))
+
+    def for_pair(self, a, b):
+        """Return bouts between ``a`` and ``b`` on either side."""
+        mask = ((self.east == a) & (self.west == b)) | (
+            (self.east == b) & (self.west == a)
+        )
+        return self.take(mask)
+
+    def periods(self):
+        """Yield ``(basho_slug, store)`` for each basho in order."""
+        bounds = np.flatnonzero(np.diff(self.basho)) + 1
+        starts = np.concatenate([[0], bounds]) if len(self) else []
+        stops = np.concatenate([bounds, [len(self)]]) if len(self) else []
+        for start, stop in zip(starts, stops, strict=True):
+            chunk = self.take(slice(int(start), int(stop)))
+            yield str(self.basho_slugs[chunk.basho[0]]), chunk
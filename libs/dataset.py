@@ -0,0 +1,758 @@
+"""Vectorised feature construction for the bout training dataset.
+
+The ``dataset`` management command loads plain tables from the database and
+hands them to :func:`build_features`, which computes every column with
+grouped NumPy/pandas operations instead of a per-bout Python loop. Nothing
+in this module touches the ORM, so it can run in worker processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .constants import RECENT_BOUT_WINDOW
+
+HEADERS = [
+    "year",
+    "month",
+    "division",
+    "day",
+    "match_no",
+    "east_id",
+    "west_id",
+    "east_rank",
+    "west_rank",
+    "east_rating",
+    "west_rating",
+    "east_rd",
+    "west_rd",
+    "east_vol",
+    "west_vol",
+    "east_height",
+    "west_height",
+    "east_weight",
+    "west_weight",
+    "east_bmi",
+    "west_bmi",
+    "east_age",
+    "west_age",
+    "east_experience",
+    "west_experience",
+    "east_record",
+    "west_record",
+    "rating_diff",
+    "height_diff",
+    "weight_diff",
+    "age_diff",
+    "experience_diff",
+    "record_diff",
+    "rank_diff",
+    "rd_diff",
+    "vol_diff",
+    "bmi_diff",
+    "same_heya",
+    "same_shusshin",
+    "east_heya",
+    "west_heya",
+    "east_shusshin",
+    "west_shusshin",
+    "east_win_rate",
+    "west_win_rate",
+    "east_streak",
+    "west_streak",
+    "east_avg_rating_change",
+    "west_avg_rating_change",
+    "east_win",
+]
+
+FORMATS = ("csv", "parquet", "feather")
+SUFFIXES = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+
+# Columns that may be missing; CSV readers get them back as nullable ints
+NULLABLE_COLUMNS = [
+    "east_rank",
+    "west_rank",
+    "rank_diff",
+    "east_heya",
+    "west_heya",
+    "east_shusshin",
+    "west_shusshin",
+]
+# Stored dictionary-encoded in Arrow based formats
+CATEGORY_COLUMNS = ["east_heya", "west_heya", "east_shusshin", "west_shusshin"]
+COMPACT_DTYPES = {
+    "year": "int16",
+    "month": "int8",
+    "division": "int8",
+    "day": "int8",
+    "match_no": "int16",
+    "east_id": "int32",
+    "west_id": "int32",
+    "east_rank": "Int32",
+    "west_rank": "Int32",
+    "rank_diff": "Int32",
+    "east_record": "int16",
+    "west_record": "int16",
+    "record_diff": "int16",
+    "same_heya": "int8",
+    "same_shusshin": "int8",
+    "east_streak": "int16",
+    "west_streak": "int16",
+    "east_win": "int8",
+}
+
+
+def sort_bouts(bouts):
+    """Order bouts by basho, day, descending division level and match."""
+    return bouts.sort_values(
+        ["basho", "day", "division", "match_no"],
+        ascending=[True, True, False, True],
+        kind="stable",
+    ).reset_index(drop=True)
+
+
+def rank_values(level, order, direction):
+    """Vectorised equivalent of :attr:`app.models.Rank.value`."""
+    order = pd.Series(order, dtype="float").fillna(0).to_numpy()
+    west = (pd.Series(direction) == "West").to_numpy()
+    return np.asarray(level) * 10000 + order.astype(np.int64) * 2 + west
+
+
+def _group_starts(keys):
+    """Return the index of the first row of each run of equal ``keys``."""
+    idx = np.arange(len(keys))
+    new = np.ones(len(keys), dtype=bool)
+    new[1:] = keys[1:] != keys[:-1]
+    return np.maximum.accumulate(np.where(new, idx, 0))
+
+
+def _tail(keys, values, width, fill):
+    """Return the last ``width`` values of each run of equal sorted ``keys``.
+
+    Returns ``(unique keys, matrix)`` where each matrix row is right-aligned
+    (most recent value last) and padded on the left with ``fill``.
+    """
+    idx = np.arange(len(keys))
+    last = np.ones(len(keys), dtype=bool)
+    last[:-1] = keys[1:] != keys[:-1]
+    ends = np.flatnonzero(last)
+    group = np.cumsum(np.r_[0, last[:-1]]) if len(keys) else idx
+    back = ends[group] - idx
+    keep = back < width
+    matrix = np.full((len(ends), width), fill, dtype=np.asarray(values).dtype)
+    matrix[group[keep], width - 1 - back[keep]] = values[keep]
+    return keys[ends], matrix
+
+
+def _expand(prior):
+    """Turn a ``(ids, matrix)`` tail into ``(ids, seq, values)`` entries.
+
+    ``seq`` is negative so the entries sort before any real row.
+    """
+    ids, matrix = prior[0], prior[1]
+    valid = matrix >= 0 if matrix.dtype.kind == "i" else ~np.isnan(matrix)
+    rows, cols = np.nonzero(valid)
+    return ids[rows], cols - matrix.shape[1], matrix[rows, cols]
+
+
+def _lookup_ids(ids, values, keys, default):
+    """Return ``values`` for ``keys`` given sorted unique ``ids``."""
+    if not len(ids):
+        return np.full(len(keys), default, dtype=np.asarray(values).dtype)
+    pos = np.minimum(np.searchsorted(ids, keys), len(ids) - 1)
+    return np.where(ids[pos] == keys, values[pos], default)
+
+
+def _form(east, west, east_win, prior):
+    """Return per-rikishi result sequences sorted by rikishi and time.
+
+    Rows from ``prior`` come first within each rikishi. ``after`` is the
+    winning streak including the row itself.
+    """
+    n = len(east)
+    if prior is None:
+        p_ids = p_seq = p_win = np.empty(0, dtype=np.int64)
+        carry = None
+    else:
+        p_ids, p_seq, p_win = _expand(prior)
+        ids, results, streak = prior
+        trailing = _tail_wins(results)
+        carry = (ids, streak - trailing)
+    rikishi = np.concatenate([p_ids, east, west]).astype(np.int64)
+    seq = np.concatenate([p_seq, np.arange(n), np.arange(n)])
+    win = np.concatenate([p_win, east_win, 1 - east_win]).astype(np.int64)
+
+    order = np.lexsort((seq, rikishi))
+    r, w = rikishi[order], win[order]
+    idx = np.arange(len(r))
+    start = _group_starts(r)
+    last_loss = np.maximum.accumulate(np.where(w == 0, idx, -1))
+    after = idx - np.maximum(last_loss, start - 1)
+    base = np.zeros(len(r), dtype=np.int64)
+    if carry is not None:
+        # Streaks longer than the stored window carry over unseen wins
+        base = _lookup_ids(*carry, r, 0)
+        after = after + np.where(last_loss < start, base, 0)
+    return order, r, w, idx, start, after, base, len(p_ids)
+
+
+def _tail_wins(results):
+    """Return the number of trailing wins in each row of ``results``."""
+    cols = np.arange(results.shape[1])
+    last_loss = np.where(results == 0, cols, -1).max(axis=1, initial=-1)
+    valid = (results >= 0).sum(axis=1)
+    return np.where(last_loss >= 0, results.shape[1] - 1 - last_loss, valid)
+
+
+def form_features(east, west, east_win, window=RECENT_BOUT_WINDOW, prior=None):
+    """Return recent win rate and winning streak for both sides of each bout.
+
+    Features only use bouts earlier in the given order. ``prior`` is the
+    ``(ids, results, streak)`` tail returned by :func:`form_state` for the
+    bouts preceding these. Returns four arrays: east rate, west rate, east
+    streak and west streak.
+    """
+    n = len(east)
+    order, r, w, idx, start, after, base, offset = _form(
+        east, west, east_win, prior
+    )
+    pos = idx - start
+
+    before = np.cumsum(w) - w
+    lag = np.maximum(idx - window, start)
+    recent = before - before[lag]
+    count = np.minimum(pos, window)
+    rate = np.zeros(len(r))
+    np.divide(recent, count, out=rate, where=count > 0)
+
+    streak = np.zeros(len(r), dtype=np.int64)
+    streak[1:] = after[:-1]
+    streak[pos == 0] = base[pos == 0]
+
+    rate_out = np.empty(len(r))
+    streak_out = np.empty(len(r), dtype=np.int64)
+    rate_out[order] = rate
+    streak_out[order] = streak
+    rate_out, streak_out = rate_out[offset:], streak_out[offset:]
+    return rate_out[:n], rate_out[n:], streak_out[:n], streak_out[n:]
+
+
+def form_state(east, west, east_win, window=RECENT_BOUT_WINDOW, prior=None):
+    """Return ``(ids, results, streak)`` after the given bouts.
+
+    ``results`` holds each rikishi's last ``window`` outcomes, most recent
+    last and padded with ``-1``; ``streak`` is the current winning streak.
+    """
+    _order, r, w, _idx, _start, after, _base, _offset = _form(
+        east, west, east_win, prior
+    )
+    ids, results = _tail(r, w.astype(np.int8), window, -1)
+    _ids, streak = _tail(r, after, 1, 0)
+    return ids, results, streak[:, 0]
+
+
+def head_to_head(basho, east, west, east_win, prior=None):
+    """Return each side's wins against the other before the bout's basho.
+
+    ``prior`` is a :func:`head_to_head_totals` frame for earlier bouts.
+    """
+    lo = np.minimum(east, west)
+    hi = np.maximum(east, west)
+    winner = np.where(east_win == 1, east, west)
+    frame = pd.DataFrame(
+        {
+            "lo": lo,
+            "hi": hi,
+            "basho": basho,
+            "lo_wins": (winner == lo).astype(np.int64),
+            "hi_wins": (winner == hi).astype(np.int64),
+        }
+    )
+    per_basho = frame.groupby(["lo", "hi", "basho"], sort=True).sum()
+    prior_wins = per_basho.groupby(level=["lo", "hi"]).cumsum() - per_basho
+    if prior is not None:
+        pairs = per_basho.index.droplevel("basho")
+        prior_wins += prior.reindex(pairs).fillna(0).to_numpy(dtype=np.int64)
+    prior_wins = prior_wins.reindex(pd.MultiIndex.from_arrays([lo, hi, basho]))
+    lo_prior = prior_wins["lo_wins"].to_numpy()
+    hi_prior = prior_wins["hi_wins"].to_numpy()
+    east_is_lo = east == lo
+    return (
+        np.where(east_is_lo, lo_prior, hi_prior),
+        np.where(east_is_lo, hi_prior, lo_prior),
+    )
+
+
+def head_to_head_totals(east, west, east_win, prior=None):
+    """Return total wins per pair, indexed by ``(lo, hi)`` rikishi ids."""
+    lo = np.minimum(east, west)
+    hi = np.maximum(east, west)
+    winner = np.where(east_win == 1, east, west)
+    totals = (
+        pd.DataFrame(
+            {
+                "lo": lo,
+                "hi": hi,
+                "lo_wins": (winner == lo).astype(np.int64),
+                "hi_wins": (winner == hi).astype(np.int64),
+            }
+        )
+        .groupby(["lo", "hi"], sort=True)
+        .sum()
+    )
+    if prior is not None:
+        totals = totals.add(prior, fill_value=0).astype(np.int64)
+    return totals
+
+
+def _changes(ratings, prior):
+    """Return rating changes sorted by rikishi and basho after ``prior``."""
+    ratings = ratings.sort_values(["rikishi", "basho"], kind="stable")
+    change = (ratings["rating"] - ratings["previous_rating"]).to_numpy()
+    rikishi = ratings["rikishi"].to_numpy(dtype=np.int64)
+    basho = ratings["basho"].to_numpy()
+    real = np.ones(len(rikishi), dtype=bool)
+    if prior is not None:
+        p_ids, p_seq, p_change = _expand(prior)
+        seq = np.concatenate([p_seq, np.arange(len(rikishi))])
+        rikishi = np.concatenate([p_ids, rikishi])
+        change = np.concatenate([p_change, change])
+        basho = np.concatenate([np.full(len(p_ids), ""), basho])
+        real = np.concatenate([np.zeros(len(p_ids), dtype=bool), real])
+        order = np.lexsort((seq, rikishi))
+        rikishi, change = rikishi[order], change[order]
+        basho, real = basho[order], real[order]
+    return rikishi, basho, change, real
+
+
+def avg_rating_change(ratings, window=3, prior=None):
+    """Return the mean of the previous ``window`` rating changes.
+
+    ``ratings`` has ``rikishi``, ``basho``, ``previous_rating`` and
+    ``rating`` columns. The result is indexed by ``(rikishi, basho)`` and is
+    ``0.0`` for a rikishi's first rated basho. ``prior`` is the
+    :func:`rating_change_state` of earlier basho.
+    """
+    rikishi, basho, change, real = _changes(ratings, prior)
+    start = _group_starts(rikishi)
+    pos = np.arange(len(rikishi)) - start
+
+    total = np.zeros(len(rikishi))
+    for lag in range(window, 0, -1):
+        shifted = np.zeros(len(rikishi))
+        shifted[lag:] = change[:-lag]
+        total = total + np.where(pos >= lag, shifted, 0.0)
+    count = np.minimum(pos, window)
+    avg = np.zeros(len(rikishi))
+    np.divide(total, count, out=avg, where=count > 0)
+    return pd.Series(
+        np.round(avg[real], 2),
+        index=pd.MultiIndex.from_arrays([rikishi[real], basho[real]]),
+    )
+
+
+def rating_change_state(ratings, window=3, prior=None):
+    """Return ``(ids, changes)`` holding each rikishi's last changes."""
+    rikishi, _basho, change, _real = _changes(ratings, prior)
+    return _tail(rikishi, change, window, np.nan)
+
+
+def _lookup(frame, rikishi, basho, column):
+    keys = pd.MultiIndex.from_arrays([rikishi, basho])
+    return frame[column].reindex(keys).to_numpy()
+
+
+def _truthy(values):
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values) | (values == 0), np.nan, values)
+
+
+def _years(start, dates):
+    days = (start - dates).astype("timedelta64[D]").astype(float)
+    return np.where(np.isnat(dates), np.nan, days / 365.25)
+
+
+def _nullable(values, mask):
+    mask = np.asarray(mask, dtype=bool)
+    values = np.where(mask, values, 0).astype(np.int64)
+    return pd.arrays.IntegerArray(values, ~mask)
+
+
+def build_features(bouts, basho, rikishi, history, ratings, state=None):
+    """Return the training dataset as a DataFrame with :data:`HEADERS`.
+
+    ``bouts`` has ``basho`` (slug), ``division`` (level), ``day``,
+    ``match_no``, ``east``, ``west`` and ``east_win`` columns and is
+    processed in the order given (see :func:`sort_bouts`). ``basho`` is
+    indexed by slug with ``year``, ``month`` and ``start`` columns.
+    ``rikishi`` is indexed by id with ``birth_date``, ``debut``, ``height``,
+    ``weight``, ``heya`` and ``shusshin`` (category codes, ``-1`` when
+    unknown). ``history`` and ``ratings`` are indexed by ``(rikishi,
+    basho)``; ``history`` holds ``rank``, ``height`` and ``weight`` while
+    ``ratings`` holds ``previous_rating``, ``previous_rd``,
+    ``previous_vol`` and ``avg_change``. Missing values are left as
+    ``NaN``/``NA``. ``state`` continues rolling features from a previous
+    export (see :class:`FeatureState`).
+    """
+    east = bouts["east"].to_numpy(dtype=np.int64)
+    west = bouts["west"].to_numpy(dtype=np.int64)
+    east_win = bouts["east_win"].to_numpy(dtype=np.int64)
+    slugs = bouts["basho"].to_numpy()
+    codes = np.searchsorted(np.sort(basho.index.to_numpy()), slugs)
+    info = basho.reindex(slugs)
+    start = info["start"].to_numpy(dtype="datetime64[D]")
+
+    out = {
+        "year": info["year"].to_numpy(dtype=np.int64),
+        "month": info["month"].to_numpy(dtype=np.int64),
+        "division": bouts["division"].to_numpy(dtype=np.int64),
+        "day": bouts["day"].to_numpy(dtype=np.int64),
+        "match_no": bouts["match_no"].to_numpy(dtype=np.int64),
+        "east_id": east,
+        "west_id": west,
+    }
+
+    side = {}
+    for name, ids in (("east", east), ("west", west)):
+        rik = rikishi.reindex(ids)
+        rank = _lookup(history, ids, slugs, "rank")
+        has_hist = ~np.isnan(rank)
+        height = _truthy(_lookup(history, ids, slugs, "height"))
+        height = np.where(
+            np.isnan(height), _truthy(rik["height"].to_numpy()), height
+        )
+        weight = _truthy(_lookup(history, ids, slugs, "weight"))
+        weight = np.where(
+            np.isnan(weight), _truthy(rik["weight"].to_numpy()), weight
+        )
+        has_rating = ~np.isnan(_lookup(ratings, ids, slugs, "previous_rd"))
+        change = _lookup(ratings, ids, slugs, "avg_change")
+        side[name] = {
+            "has_hist": has_hist,
+            "rank": rank,
+            "has_rating": has_rating,
+            "rating": _lookup(ratings, ids, slugs, "previous_rating"),
+            "rd": _lookup(ratings, ids, slugs, "previous_rd"),
+            "vol": np.round(_lookup(ratings, ids, slugs, "previous_vol"), 5),
+            "height": height,
+            "weight": weight,
+            "bmi": np.round(weight / ((height / 100) ** 2), 2),
+            "age": _years(
+                start, rik["birth_date"].to_numpy(dtype="datetime64[D]")
+            ),
+            "experience": _years(
+                start, rik["debut"].to_numpy(dtype="datetime64[D]")
+            ),
+            "heya": rik["heya"].fillna(-1).to_numpy(dtype=np.int64),
+            "shusshin": rik["shusshin"].fillna(-1).to_numpy(dtype=np.int64),
+            "change": np.where(np.isnan(change), 0.0, change),
+        }
+
+    e, w = side["east"], side["west"]
+    e_record, w_record = head_to_head(
+        codes, east, west, east_win, prior=state and state.records
+    )
+    e_rate, w_rate, e_streak, w_streak = form_features(
+        east, west, east_win, prior=state and state.form
+    )
+    both_rated = e["has_rating"] & w["has_rating"]
+    both_hist = e["has_hist"] & w["has_hist"]
+
+    for name, values in (("east", e), ("west", w)):
+        out[f"{name}_rank"] = _nullable(values["rank"], values["has_hist"])
+    for column in ("rating", "rd", "vol", "height", "weight", "bmi"):
+        out[f"east_{column}"] = e[column]
+        out[f"west_{column}"] = w[column]
+    for column in ("age", "experience"):
+        out[f"east_{column}"] = np.round(e[column], 2)
+        out[f"west_{column}"] = np.round(w[column], 2)
+    out["east_record"] = e_record
+    out["west_record"] = w_record
+    out["rating_diff"] = np.where(
+        both_rated, np.round(e["rating"] - w["rating"], 2), np.nan
+    )
+    out["height_diff"] = np.round(e["height"] - w["height"], 1)
+    out["weight_diff"] = np.round(e["weight"] - w["weight"], 1)
+    out["age_diff"] = np.round(e["age"] - w["age"], 2)
+    out["experience_diff"] = np.round(e["experience"] - w["experience"], 2)
+    out["record_diff"] = e_record - w_record
+    out["rank_diff"] = _nullable(e["rank"] - w["rank"], both_hist)
+    out["rd_diff"] = np.where(
+        both_rated, np.round(e["rd"] - w["rd"], 2), np.nan
+    )
+    out["vol_diff"] = np.where(
+        both_rated, np.round(e["vol"] - w["vol"], 5), np.nan
+    )
+    out["bmi_diff"] = np.round(_truthy(e["bmi"]) - _truthy(w["bmi"]), 2)
+    out["same_heya"] = ((e["heya"] >= 0) & (e["heya"] == w["heya"])).astype(
+        np.int64
+    )
+    out["same_shusshin"] = (
+        (e["shusshin"] >= 0) & (e["shusshin"] == w["shusshin"])
+    ).astype(np.int64)
+    for column in ("heya", "shusshin"):
+        out[f"east_{column}"] = _nullable(e[column], e[column] >= 0)
+        out[f"west_{column}"] = _nullable(w[column], w[column] >= 0)
+    out["east_win_rate"] = np.round(e_rate, 3)
+    out["west_win_rate"] = np.round(w_rate, 3)
+    out["east_streak"] = e_streak
+    out["west_streak"] = w_streak
+    out["east_avg_rating_change"] = e["change"]
+    out["west_avg_rating_change"] = w["change"]
+    out["east_win"] = east_win
+    return pd.DataFrame(out, columns=HEADERS)
+
+
+class FeatureState:
+    """Trailing feature state after the last exported basho.
+
+    Holds each rikishi's recent results and streak, head-to-head totals and
+    latest rating changes so an export can be extended with newer basho
+    without replaying earlier bouts. ``heya`` and ``shusshin`` record the
+    slug lists the category codes were built from.
+    """
+
+    def __init__(self, basho, bouts, heya, shusshin, form, records, changes):
+        self.basho = basho
+        self.bouts = bouts
+        self.heya = list(heya)
+        self.shusshin = list(shusshin)
+        self.form = form
+        self.records = records
+        self.changes = changes
+
+    @classmethod
+    def build(cls, bouts, ratings=None, heya=(), shusshin=(), prior=None):
+        """Return the state after ``bouts``, continuing from ``prior``.
+
+        ``bouts`` is ordered as for :func:`build_features` and ``ratings``
+        has ``rikishi``, ``basho``, ``previous_rating`` and ``rating``
+        columns; ratings after the last bout's basho are ignored. Without
+        ``ratings`` only the bout based state is computed.
+        """
+        last = bouts["basho"].iloc[-1]
+        east = bouts["east"].to_numpy(dtype=np.int64)
+        west = bouts["west"].to_numpy(dtype=np.int64)
+        east_win = bouts["east_win"].to_numpy(dtype=np.int64)
+        return cls(
+            basho=last,
+            bouts=int((bouts["basho"] == last).sum()),
+            heya=heya,
+            shusshin=shusshin,
+            form=form_state(east, west, east_win, prior=prior and prior.form),
+            records=head_to_head_totals(
+                east, west, east_win, prior=prior and prior.records
+            ),
+            changes=None
+            if ratings is None
+            else rating_change_state(
+                ratings[ratings["basho"] <= last],
+                prior=prior and prior.changes,
+            ),
+        )
+
+    def save(self, path):
+        """Write the state to ``path`` as an ``.npz`` archive."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            basho=np.asarray(self.basho),
+            bouts=np.asarray(self.bouts),
+            heya=np.asarray(self.heya, dtype=str),
+            shusshin=np.asarray(self.shusshin, dtype=str),
+            form_ids=self.form[0],
+            form_results=self.form[1],
+            form_streak=self.form[2],
+            record_pairs=self.records.index.to_frame().to_numpy(),
+            record_wins=self.records.to_numpy(),
+            change_ids=self.changes[0],
+            change_values=self.changes[1],
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a state previously written with :meth:`save`."""
+        with np.load(path) as data:
+            pairs = data["record_pairs"].reshape(-1, 2)
+            records = pd.DataFrame(
+                data["record_wins"].reshape(-1, 2),
+                columns=["lo_wins", "hi_wins"],
+                index=pd.MultiIndex.from_arrays(
+                    [pairs[:, 0], pairs[:, 1]], names=["lo", "hi"]
+                ),
+            )
+            return cls(
+                basho=str(data["basho"]),
+                bouts=int(data["bouts"]),
+                heya=data["heya"].tolist(),
+                shusshin=data["shusshin"].tolist(),
+                form=(
+                    data["form_ids"],
+                    data["form_results"],
+                    data["form_streak"],
+                ),
+                records=records,
+                changes=(data["change_ids"], data["change_values"]),
+            )
+
+
+def shard_bounds(slugs, shards):
+    """Split rows into at most ``shards`` slices of whole basho.
+
+    ``slugs`` is the ordered basho column; cuts are placed at the basho
+    boundary closest after each equal-size split point.
+    """
+    slugs = np.asarray(slugs)
+    if not len(slugs):
+        return []
+    starts = np.flatnonzero(np.r_[True, slugs[1:] != slugs[:-1]])
+    targets = np.arange(1, shards) * len(slugs) / shards
+    pos = np.minimum(np.searchsorted(starts, targets), len(starts) - 1)
+    cuts = [int(c) for c in np.unique(starts[pos]) if c > 0]
+    bounds = [0, *cuts, len(slugs)]
+    return [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:], strict=True)]
+
+
+_SHARD_TABLES = None
+
+
+def _init_shards(tables):
+    global _SHARD_TABLES
+    _SHARD_TABLES = tables
+
+
+def _build_shard(args):
+    bouts, state = args
+    return build_features(bouts, state=state, **_SHARD_TABLES)
+
+
+def build_features_sharded(
+    bouts, basho, rikishi, history, ratings, state=None, workers=None
+):
+    """Parallel version of :func:`build_features` over era shards.
+
+    Bouts are split into ``workers`` runs of whole basho. The rolling state
+    at the start of each shard comes from a serial :meth:`FeatureState.build`
+    pass, which only touches the bout columns, so shards can be computed in
+    a process pool. The concatenated frame equals the serial result.
+    """
+    shards = shard_bounds(bouts["basho"].to_numpy(), workers or 1)
+    if len(shards) <= 1:
+        return build_features(bouts, basho, rikishi, history, ratings, state)
+
+    priors = [state]
+    for shard in shards[:-1]:
+        priors.append(FeatureState.build(bouts.iloc[shard], prior=priors[-1]))
+    tables = {
+        "basho": basho,
+        "rikishi": rikishi,
+        "history": history,
+        "ratings": ratings,
+    }
+    tasks = [
+        (bouts.iloc[shard], prior)
+        for shard, prior in zip(shards, priors, strict=True)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_shards,
+        initargs=(tables,),
+    ) as pool:
+        frames = list(pool.map(_build_shard, tasks))
+    return pd.concat(frames, ignore_index=True)
+
+
+def state_path(path):
+    """Return the sidecar state file used for the dataset at ``path``."""
+    return Path(f"{path}.state.npz")
+
+
+def guess_format(path):
+    """Return the dataset format implied by the suffix of ``path``."""
+    return SUFFIXES.get(Path(path).suffix.lower(), "csv")
+
+
+def compact(frame):
+    """Return ``frame`` with narrow integer types and categorical codes."""
+    frame = frame.astype(
+        {k: v for k, v in COMPACT_DTYPES.items() if k in frame.columns}
+    )
+    for column in CATEGORY_COLUMNS:
+        if column in frame.columns:
+            frame[column] = _dictionary(frame[column])
+    return frame
+
+
+def _dictionary(values):
+    """Return nullable integer ``values`` as an int-keyed ``Categorical``."""
+    mask = values.isna().to_numpy()
+    values = values.to_numpy(dtype=np.int64, na_value=0)
+    categories = np.unique(values[~mask])
+    codes = np.where(mask, -1, np.searchsorted(categories, values))
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def write_dataset(frame, path, fmt=None):
+    """Write ``frame`` to ``path`` as CSV, Parquet or Feather (Arrow IPC).
+
+    ``fmt`` defaults to :func:`guess_format`. The binary formats keep
+    column types, store missing values as nulls and dictionary-encode the
+    heya and shusshin codes; they require ``pyarrow``.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt == "csv":
+        frame.to_csv(path, index=False, lineterminator="\r\n")
+    elif fmt == "parquet":
+        compact(frame).to_parquet(path, index=False)
+    elif fmt == "feather":
+        compact(frame).to_feather(path)
+    else:
+        raise ValueError(f"Unknown dataset format {fmt!r}")
+
+
+def append_dataset(frame, path, fmt=None):
+    """Append ``frame`` to a dataset previously written to ``path``.
+
+    CSV files are extended in place; the binary formats are rewritten.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt == "csv":
+        frame.to_csv(
+            path, mode="a", header=False, index=False, lineterminator="\r\n"
+        )
+        return
+    existing = read_dataset(path, fmt)
+    write_dataset(pd.concat([existing, frame], ignore_index=True), path, fmt)
+
+
+def read_dataset(path, fmt=None):
+    """Load a dataset written by :func:`write_dataset`.
+
+    Every format yields numeric columns, with nullable ``Int`` dtypes for
+    :data:`NULLABLE_COLUMNS`, so callers need no type coercion.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt == "csv":
+        frame = pd.read_csv(path)
+        dtypes = {c: "Int64" for c in NULLABLE_COLUMNS if c in frame.columns}
+        return frame.astype(dtypes)
+    if fmt == "parquet":
+        frame = pd.read_parquet(path)
+    elif fmt == "feather":
+        frame = pd.read_feather(path)
+    else:
+        raise ValueError(f"Unknown dataset format {fmt!r}")
+    for column in CATEGORY_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].astype("Int64")
+    return frame
@@ -0,0 +1,23 @@
+"""Database helpers shared by the management commands."""
+
+from django.db import transaction
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=500):
+    """Insert ``objs`` or update ``update_fields`` of existing rows.
+
+    Rows are matched on ``unique_fields``, which must be covered by a
+    unique constraint, and written with ``bulk_create`` in one transaction
+    so readers never see a partial result set. Returns the created objects.
+    """
+    objs = list(objs)
+    if not objs:
+        return []
+    with transaction.atomic():
+        return model.objects.bulk_create(
+            objs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
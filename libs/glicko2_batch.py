@@ -0,0 +1,343 @@
+"""Vectorised Glicko-2 updates for whole rating periods.
+
+:class:`libs.glicko2.Player` updates one player at a time in pure Python.
+The helpers in this module apply the same algorithm to every player of a
+rating period at once using NumPy arrays. Values are kept on the internal
+Glicko-2 scale (``mu``, ``phi``, ``sigma``) and converted with
+:func:`to_internal` / :func:`to_display` at the edges.
+"""
+
+import io
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .constants import (
+    CONVERGENCE_TOLERANCE,
+    DEFAULT_RATING,
+    DEFAULT_RD,
+    DEFAULT_VOLATILITY,
+    GLICKO2_SCALER,
+    TAU,
+)
+
+
+def to_internal(rating, rd):
+    """Convert display ``rating``/``rd`` to the internal Glicko-2 scale."""
+    rating = np.asarray(rating, dtype=float)
+    rd = np.asarray(rd, dtype=float)
+    return (rating - DEFAULT_RATING) / GLICKO2_SCALER, rd / GLICKO2_SCALER
+
+
+def to_display(mu, phi):
+    """Convert internal ``mu``/``phi`` back to display rating and RD."""
+    mu = np.asarray(mu, dtype=float)
+    phi = np.asarray(phi, dtype=float)
+    return mu * GLICKO2_SCALER + DEFAULT_RATING, phi * GLICKO2_SCALER
+
+
+def _g(phi):
+    return 1 / np.sqrt(1 + 3 * phi**2 / math.pi**2)
+
+
+def _f(x, delta, v, a, mu, tau):
+    # Mirrors ``Player._f`` exactly so both engines agree numerically.
+    ex = np.exp(x)
+    num1 = ex * (delta**2 - mu**2 - v - ex)
+    denom1 = 2 * ((mu**2 + v + ex) ** 2)
+    return (num1 / denom1) - ((x - a) / (tau**2))
+
+
+def _new_vol(mu, phi, sigma, delta, v, tau):
+    """Solve step 5 of Glicko-2 for every player with the Illinois method."""
+    a = np.log(sigma**2)
+    big = delta**2 > phi**2 + v
+    b = np.empty_like(a)
+    b[big] = np.log(delta[big] ** 2 - phi[big] ** 2 - v[big])
+
+    step = math.sqrt(tau**2)
+    need = ~big
+    k = 1
+    while need.any():
+        x = a[need] - k * step
+        below = _f(x, delta[need], v[need], a[need], mu[need], tau) < 0
+        idx = np.flatnonzero(need)
+        b[idx[~below]] = x[~below]
+        need[idx[~below]] = False
+        k += 1
+
+    lo = a.copy()
+    f_lo = _f(lo, delta, v, a, mu, tau)
+    f_hi = _f(b, delta, v, a, mu, tau)
+    live = np.abs(b - lo) > CONVERGENCE_TOLERANCE
+    while live.any():
+        idx = np.flatnonzero(live)
+        la, lb = lo[idx], b[idx]
+        fa, fb = f_lo[idx], f_hi[idx]
+        c = la + ((la - lb) * fa) / (fb - fa)
+        fc = _f(c, delta[idx], v[idx], a[idx], mu[idx], tau)
+        swap = fc * fb <= 0
+        lo[idx] = np.where(swap, lb, la)
+        f_lo[idx] = np.where(swap, fb, fa / 2.0)
+        b[idx] = c
+        f_hi[idx] = fc
+        live[idx] = np.abs(c - lo[idx]) > CONVERGENCE_TOLERANCE
+
+    return np.exp(lo / 2)
+
+
+def rate_period(
+    mu,
+    phi,
+    sigma,
+    players,
+    opponents,
+    outcomes,
+    active=None,
+    tau=TAU,
+):
+    """Return updated ``(mu, phi, sigma)`` after one rating period.
+
+    ``mu``, ``phi`` and ``sigma`` hold the state of every known player on
+    the internal scale. Each element of ``players``/``opponents``/``outcomes``
+    describes one game from the point of view of ``players[i]``; a bout
+    therefore appears twice, once per side. Opponent strength is always taken
+    from the state at the start of the period.
+
+    ``active`` is an optional boolean mask selecting the players to update.
+    Active players without games only have their RD inflated (step 6). By
+    default every player with at least one game is updated. The input arrays
+    are left untouched.
+    """
+    mu = np.asarray(mu, dtype=float)
+    phi = np.asarray(phi, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    players = np.asarray(players, dtype=np.intp)
+    opponents = np.asarray(opponents, dtype=np.intp)
+    outcomes = np.asarray(outcomes, dtype=float)
+    n = len(mu)
+
+    counts = np.bincount(players, minlength=n)
+    played = counts > 0
+    if active is None:
+        active = played
+    else:
+        active = np.asarray(active, dtype=bool)
+
+    g = _g(phi[opponents])
+    e = 1 / (1 + np.exp(-1 * g * (mu[players] - mu[opponents])))
+    v_sum = np.bincount(players, weights=g**2 * e * (1 - e), minlength=n)
+    score = np.bincount(players, weights=g * (outcomes - e), minlength=n)
+
+    new_mu = mu.copy()
+    new_phi = phi.copy()
+    new_sigma = sigma.copy()
+
+    rated = active & played
+    if rated.any():
+        v = 1 / np.maximum(v_sum[rated], 0.00001)
+        delta = v * score[rated]
+        vol = _new_vol(mu[rated], phi[rated], sigma[rated], delta, v, tau)
+        pre = np.sqrt(phi[rated] ** 2 + vol**2)
+        post = 1 / np.sqrt((1 / pre**2) + (1 / v))
+        new_sigma[rated] = vol
+        new_phi[rated] = post
+        new_mu[rated] = mu[rated] + post**2 * score[rated]
+
+    idle = active & ~played
+    new_phi[idle] = np.sqrt(phi[idle] ** 2 + sigma[idle] ** 2)
+    return new_mu, new_phi, new_sigma
+
+
+class PlayerTable:
+    """Growable Glicko-2 state for players identified by arbitrary ids."""
+
+    def __init__(
+        self,
+        rating=DEFAULT_RATING,
+        rd=DEFAULT_RD,
+        vol=DEFAULT_VOLATILITY,
+        tau=TAU,
+    ):
+        self.default_mu, self.default_phi = (
+            float(x) for x in to_internal(rating, rd)
+        )
+        self.default_sigma = float(vol)
+        self.tau = tau
+        self.ids: list[int] = []
+        self.index: dict[int, int] = {}
+        self.mu = np.empty(0)
+        self.phi = np.empty(0)
+        self.sigma = np.empty(0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, player_id):
+        return player_id in self.index
+
+    def lookup(self, ids):
+        """Return array positions for ``ids``, adding unknown players."""
+        ids = np.asarray(ids).tolist()
+        index = self.index
+        new = []
+        for player_id in ids:
+            if player_id not in index:
+                index[player_id] = len(self.ids) + len(new)
+                new.append(player_id)
+        if new:
+            self.ids.extend(new)
+            count = len(new)
+            self.mu = np.concatenate([self.mu, np.full(count, self.default_mu)])
+            self.phi = np.concatenate(
+                [self.phi, np.full(count, self.default_phi)]
+            )
+            self.sigma = np.concatenate(
+                [self.sigma, np.full(count, self.default_sigma)]
+            )
+        return np.fromiter(
+            (index[i] for i in ids), dtype=np.intp, count=len(ids)
+        )
+
+    def rate(self, east_ids, west_ids, east_wins, active_ids=None):
+        """Apply one rating period given bouts between two sides.
+
+        ``east_wins`` holds ``1`` when the east rikishi won. ``active_ids``
+        lists the players to update; by default everyone who fought.
+        """
+        east = self.lookup(east_ids)
+        west = self.lookup(west_ids)
+        east_out = np.asarray(east_wins, dtype=float)
+        # Interleave both sides bout by bout so per-player sums accumulate
+        # in the same order as the sequential implementation.
+        players = np.column_stack([east, west]).ravel()
+        opponents = np.column_stack([west, east]).ravel()
+        outcomes = np.column_stack([east_out, 1 - east_out]).ravel()
+        active = None
+        if active_ids is not None:
+            chosen = self.lookup(active_ids)
+            active = np.zeros(len(self.ids), dtype=bool)
+            active[chosen] = True
+        self.mu, self.phi, self.sigma = rate_period(
+            self.mu,
+            self.phi,
+            self.sigma,
+            players,
+            opponents,
+            outcomes,
+            active=active,
+            tau=self.tau,
+        )
+
+    def expected(self, east_ids, west_ids):
+        """Return the probability that each east rikishi beats the west.
+
+        Both players' rating deviations widen the prediction through
+        ``g(sqrt(phi_east**2 + phi_west**2))``.
+        """
+        east = self.lookup(east_ids)
+        west = self.lookup(west_ids)
+        g = _g(np.sqrt(self.phi[east] ** 2 + self.phi[west] ** 2))
+        return 1 / (1 + np.exp(-g * (self.mu[east] - self.mu[west])))
+
+    def ratings(self, ids):
+        """Return display ``(rating, rd, vol)`` arrays for ``ids``."""
+        idx = self.lookup(ids)
+        rating, rd = to_display(self.mu[idx], self.phi[idx])
+        return rating, rd, self.sigma[idx].copy()
+
+    def load(self, ids, rating, rd, vol):
+        """Overwrite the state of ``ids`` with display-scale values."""
+        idx = self.lookup(ids)
+        self.mu[idx], self.phi[idx] = to_internal(rating, rd)
+        self.sigma[idx] = np.asarray(vol, dtype=float)
+
+    def to_bytes(self):
+        """Pack ids and internal state into a compact ``.npz`` payload."""
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            ids=np.asarray(self.ids, dtype=np.int64),
+            mu=self.mu,
+            phi=self.phi,
+            sigma=self.sigma,
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data, **kwargs):
+        """Rebuild a table from :meth:`to_bytes` output.
+
+        ``kwargs`` are forwarded to the constructor so a snapshot can be
+        resumed with different defaults or ``tau``.
+        """
+        table = cls(**kwargs)
+        with np.load(io.BytesIO(bytes(data))) as arrays:
+            table.ids = arrays["ids"].tolist()
+            table.mu = arrays["mu"].copy()
+            table.phi = arrays["phi"].copy()
+            table.sigma = arrays["sigma"].copy()
+        table.index = {pid: i for i, pid in enumerate(table.ids)}
+        return table
+
+
+def log_loss(
+    periods,
+    rd=DEFAULT_RD,
+    vol=DEFAULT_VOLATILITY,
+    tau=TAU,
+    burn_in=0,
+):
+    """Replay ``periods`` and return ``(mean log-loss, bouts scored)``.
+
+    ``periods`` is a chronological sequence of ``(east_ids, west_ids,
+    east_wins, active_ids)`` tuples. Each period's bouts are predicted from
+    the ratings produced by the periods before it; the first ``burn_in``
+    periods only warm up the ratings and are not scored.
+    """
+    table = PlayerTable(rd=rd, vol=vol, tau=tau)
+    total = 0.0
+    count = 0
+    for i, (east, west, east_wins, active) in enumerate(periods):
+        if i >= burn_in and len(east):
+            p = np.clip(table.expected(east, west), 1e-15, 1 - 1e-15)
+            y = np.asarray(east_wins, dtype=float)
+            total += float(-(y * np.log(p) + (1 - y) * np.log(1 - p)).sum())
+            count += len(y)
+        table.rate(east, west, east_wins, active)
+    return (total / count if count else math.nan), count
+
+
+_SWEEP_PERIODS = None
+
+
+def _init_sweep(periods):
+    global _SWEEP_PERIODS
+    _SWEEP_PERIODS = periods
+
+
+def _sweep_trial(args):
+    params, burn_in = args
+    loss, count = log_loss(_SWEEP_PERIODS, burn_in=burn_in, **params)
+    return params, loss, count
+
+
+def sweep(periods, taus, rds, vols, burn_in=0, workers=None):
+    """Score every ``(tau, rd, vol)`` combination on ``periods``.
+
+    Trials run in a process pool; ``periods`` is shipped to each worker once.
+    Returns ``(params, loss, bouts)`` tuples sorted from best to worst.
+    """
+    grid = [
+        ({"tau": tau, "rd": rd, "vol": vol}, burn_in)
+        for tau, rd, vol in itertools.product(taus, rds, vols)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_sweep,
+        initargs=(periods,),
+    ) as pool:
+        results = list(pool.map(_sweep_trial, grid))
+    return sorted(results, key=lambda r: (math.isnan(r[1]), r[1]))
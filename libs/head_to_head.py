@@ -0,0 +1,103 @@
+"""Maintenance and lookup of the denormalised :class:`HeadToHead` table.
+
+:func:`refresh_head_to_head` rebuilds the cumulative records from a basho
+onwards after new bouts were imported. :func:`record_before` and
+:func:`records_before` read the record of one or many pairs going into a
+basho with index lookups instead of counting bouts.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from app.models import Bout, HeadToHead
+
+
+def _pair(first, second):
+    return (first, second) if first < second else (second, first)
+
+
+def refresh_head_to_head(since=None, batch_size=1000):
+    """Recompute :class:`HeadToHead` rows for basho from ``since`` onwards.
+
+    ``since`` is a basho slug; all rows are rebuilt when it is ``None``.
+    Totals carried into ``since`` come from the latest earlier row of each
+    pair. Returns the number of rows written.
+    """
+    bouts = Bout.objects.all()
+    if since is not None:
+        bouts = bouts.filter(basho_id__gte=since)
+    rows = (
+        bouts.order_by()
+        .values_list("basho_id", "east_id", "west_id", "winner_id")
+        .annotate(count=Count("*"))
+    )
+    per_basho = defaultdict(lambda: [0, 0])
+    for basho_id, east_id, west_id, winner_id, count in rows:
+        a, b = _pair(east_id, west_id)
+        per_basho[(basho_id, a, b)][winner_id != a] += count
+
+    with transaction.atomic():
+        stale = HeadToHead.objects.all()
+        if since is not None:
+            stale = stale.filter(basho_id__gte=since)
+        stale.delete()
+
+        totals = {}
+        if since is not None and per_basho:
+            pairs = {(a, b) for _, a, b in per_basho}
+            totals = records_before(
+                {rid for pair in pairs for rid in pair}, since
+            )
+        records = []
+        for basho_id, a, b in sorted(per_basho):
+            wins = per_basho[(basho_id, a, b)]
+            prev = totals.get((a, b), (0, 0))
+            totals[(a, b)] = (prev[0] + wins[0], prev[1] + wins[1])
+            records.append(
+                HeadToHead(
+                    rikishi_a_id=a,
+                    rikishi_b_id=b,
+                    basho_id=basho_id,
+                    a_wins=totals[(a, b)][0],
+                    b_wins=totals[(a, b)][1],
+                )
+            )
+        HeadToHead.objects.bulk_create(records, batch_size=batch_size)
+    return len(records)
+
+
+def record_before(first, second, before):
+    """Return ``(first wins, second wins)`` in basho before slug ``before``."""
+    a, b = _pair(first, second)
+    row = (
+        HeadToHead.objects.filter(
+            rikishi_a_id=a, rikishi_b_id=b, basho_id__lt=before
+        )
+        .order_by("-basho_id")
+        .values_list("a_wins", "b_wins")
+        .first()
+    )
+    if row is None:
+        return 0, 0
+    return row if a == first else row[::-1]
+
+
+def records_before(ids, before):
+    """Return ``{(a, b): (a wins, b wins)}`` for pairs among ``ids``.
+
+    Keys have ``a < b`` and only pairs that met before the basho slug
+    ``before`` are included. Uses a single query.
+    """
+    totals = {}
+    ids = list(ids)
+    for a, b, a_wins, b_wins in (
+        HeadToHead.objects.filter(
+            rikishi_a_id__in=ids, rikishi_b_id__in=ids, basho_id__lt=before
+        )
+        .order_by("rikishi_a_id", "rikishi_b_id", "-basho_id")
+        .values_list("rikishi_a_id", "rikishi_b_id", "a_wins", "b_wins")
+    ):
+        totals.setdefault((a, b), (a_wins, b_wins))
+    return totals
@@ -0,0 +1,148 @@
+"""Persistent cache of Sumo API responses.
+
+:class:`ResponseCache` stores successful ``GET`` responses as JSON files
+keyed by endpoint and query parameters. How long an entry stays fresh is
+decided by :func:`cache_ttl`: data about finished basho and retired rikishi
+never changes and never expires, data about the running basho is
+revalidated on every request and everything else is kept for a day. Stale
+entries with an ``ETag`` or ``Last-Modified`` header are revalidated with a
+conditional request and reused when the server answers ``304``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import date
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+
+DAY = 24 * 60 * 60
+# Endpoints that may change between basho
+DEFAULT_TTL = DAY
+# Endpoints of the running basho, whose results change during the day
+LIVE_TTL = 0
+
+BASHO_ENDPOINT = re.compile(r"^/basho/(\d{6})(/|$)")
+
+
+def current_basho(today=None):
+    """Return the ``YYYYMM`` slug of the current month."""
+    today = today or date.today()
+    return f"{today.year}{today.month:02d}"
+
+
+def cache_key(endpoint, params=None):
+    """Return a canonical ``endpoint?query`` string with sorted parameters."""
+    path, _, query = endpoint.partition("?")
+    items = parse_qsl(query) + [
+        (key, str(value)) for key, value in (params or {}).items()
+    ]
+    return f"{path}?{urlencode(sorted(items))}" if items else path
+
+
+def cache_ttl(key, data, today=None):
+    """Return seconds ``data`` fetched for ``key`` stays fresh.
+
+    ``None`` means the entry never expires: basho before the current month
+    and matches filtered to such a basho are final, as are the profiles of
+    retired rikishi. Endpoints of the current basho and unfiltered match
+    lists get :data:`LIVE_TTL` so they are revalidated on every request.
+    """
+    split = urlsplit(key)
+    current = current_basho(today)
+    match = BASHO_ENDPOINT.match(split.path)
+    if match:
+        return None if match.group(1) < current else LIVE_TTL
+    query = dict(parse_qsl(split.query))
+    basho_id = query.get("bashoId")
+    if split.path.endswith("/matches"):
+        return None if basho_id and basho_id < current else LIVE_TTL
+    if (
+        re.fullmatch(r"/rikishi/\d+", split.path)
+        and isinstance(data, dict)
+        and data.get("intai")
+    ):
+        return None
+    return DEFAULT_TTL
+
+
+class ResponseCache:
+    """Directory of cached responses, one JSON file per request."""
+
+    def __init__(self, root, ttl=cache_ttl, clock=time.time):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.clock = clock
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def get(self, key):
+        """Return the stored entry for ``key`` or ``None``."""
+        try:
+            with open(self._path(key)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        expires = entry.get("expires")
+        return expires is None or self.clock() < expires
+
+    def validators(self, entry):
+        """Return conditional request headers for a stale ``entry``."""
+        headers = {}
+        if entry["headers"].get("etag"):
+            headers["If-None-Match"] = entry["headers"]["etag"]
+        if entry["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+        return headers
+
+    def store(self, key, response):
+        """Save a successful ``response`` under ``key``."""
+        body = response.text
+        try:
+            ttl = self.ttl(key, json.loads(body))
+        except ValueError:
+            ttl = DEFAULT_TTL
+        headers = {
+            name: response.headers[name]
+            for name in ("content-type", "etag", "last-modified")
+            if name in response.headers
+        }
+        self._write(key, response.status_code, headers, body, ttl)
+
+    def refresh(self, key, entry):
+        """Extend the lifetime of ``entry`` after a ``304`` response."""
+        ttl = self.ttl(key, json.loads(entry["body"]))
+        self._write(key, entry["status"], entry["headers"], entry["body"], ttl)
+
+    def _write(self, key, status, headers, body, ttl):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "key": key,
+            "status": status,
+            "headers": headers,
+            "body": body,
+            "expires": None if ttl is None else self.clock() + ttl,
+        }
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(entry, fh)
+        tmp.replace(path)
+
+    @staticmethod
+    def response(entry, endpoint):
+        """Rebuild an :class:`httpx.Response` from a cached ``entry``."""
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=entry["body"].encode(),
+            request=httpx.Request("GET", endpoint),
+        )
@@ -0,0 +1,80 @@
+"""Durable progress checkpoints for the import commands.
+
+Each command records its progress in an :class:`~app.models.IngestJob`
+row while it runs. Started with ``--resume``, a command continues after
+the saved cursors of an unfinished job instead of starting over; any
+other run resets the job. Writes are idempotent, so work repeated after
+the last checkpoint is harmless.
+"""
+
+from app.models import IngestJob
+
+CURSOR_DEFAULTS = {"last_rikishi_id": None, "offset": 0, "oldest_basho": ""}
+
+
+def job_name(command, **options):
+    """Return the job name of ``command`` scoped by non-empty ``options``."""
+    scope = " ".join(
+        f"{key}={value}" for key, value in sorted(options.items()) if value
+    )
+    return f"{command} {scope}" if scope else command
+
+
+def start_job(name, resume=False):
+    """Return the :class:`IngestJob` for ``name``.
+
+    The job's cursors are kept when resuming an unfinished run and reset
+    otherwise.
+    """
+    job, _ = IngestJob.objects.get_or_create(name=name)
+    if not resume or job.finished:
+        for field, value in CURSOR_DEFAULTS.items():
+            setattr(job, field, value)
+        job.finished = False
+        job.save()
+    return job
+
+
+def save_checkpoint(job, **cursors):
+    """Update and save the given cursor fields of ``job``."""
+    for field, value in cursors.items():
+        setattr(job, field, value)
+    job.save(update_fields=[*cursors, "updated_at"])
+
+
+def finish_job(job):
+    """Mark ``job`` as finished so the next ``--resume`` starts over."""
+    job.finished = True
+    job.save(update_fields=["finished", "updated_at"])
+
+
+class Progress:
+    """Checkpoint the last of ``keys`` before which all work is done.
+
+    Work may complete out of order, e.g. with concurrent fetchers. The
+    cursor only advances past a key once it and every earlier key are
+    done, so a resumed run never skips unfinished work.
+    """
+
+    def __init__(self, job, keys, field="last_rikishi_id"):
+        self.job = job
+        self.keys = list(keys)
+        self.field = field
+        self.index = 0
+        self.done = set()
+
+    @property
+    def cursor(self):
+        return self.keys[self.index - 1] if self.index else None
+
+    def complete(self, keys):
+        """Mark ``keys`` as done and save the cursor if it advanced."""
+        self.done.update(keys)
+        start = self.index
+        while (
+            self.index < len(self.keys) and self.keys[self.index] in self.done
+        ):
+            self.done.discard(self.keys[self.index])
+            self.index += 1
+        if self.index > start:
+            save_checkpoint(self.job, **{self.field: self.cursor})
@@ -0,0 +1,97 @@
+"""Versioned storage for trained prediction models.
+
+Each trained model and its scaler are dumped with :mod:`joblib` to
+``<root>/<version>.joblib``. ``<root>/index.json`` lists every version with
+the features it expects, the scaler parameters, a hash of the training
+dataset, the training parameters and evaluation metrics.
+"""
+
+import hashlib
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+import joblib
+
+INDEX_NAME = "index.json"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Directory of model artifacts with a JSON metadata index."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @property
+    def index_path(self):
+        return self.root / INDEX_NAME
+
+    def entries(self):
+        """Return metadata for every stored version, oldest first."""
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path) as fh:
+            return json.load(fh)
+
+    def get(self, version=None):
+        """Return metadata for ``version`` or the latest one, else ``None``."""
+        entries = self.entries()
+        if version is None:
+            return entries[-1] if entries else None
+        return next((e for e in entries if e["version"] == version), None)
+
+    def find(self, dataset_hash, params):
+        """Return the newest version trained on the same data and params."""
+        for entry in reversed(self.entries()):
+            if entry["dataset_hash"] == dataset_hash and (
+                entry["params"] == params
+            ):
+                return entry
+        return None
+
+    def save(self, model, scaler, features, dataset_hash, params, metrics):
+        """Store a new version and return its metadata."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries = self.entries()
+        version = f"v{len(entries) + 1}"
+        artifact = f"{version}.joblib"
+        joblib.dump({"model": model, "scaler": scaler}, self.root / artifact)
+        entry = {
+            "version": version,
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+            "artifact": artifact,
+            "features": list(features),
+            "scaler": {
+                "mean": scaler.mean_.tolist(),
+                "scale": scaler.scale_.tolist(),
+            },
+            "dataset_hash": dataset_hash,
+            "params": params,
+            "metrics": metrics,
+        }
+        entries.append(entry)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(entries, fh, indent=2)
+        tmp.replace(self.index_path)
+        return entry
+
+    def load(self, version=None):
+        """Return ``(metadata, model, scaler)`` for ``version`` or latest.
+
+        Raises :class:`LookupError` when the version does not exist.
+        """
+        entry = self.get(version)
+        if entry is None:
+            raise LookupError(version or "latest")
+        artifact = joblib.load(self.root / entry["artifact"])
+        return entry, artifact["model"], artifact["scaler"]
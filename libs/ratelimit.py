@@ -0,0 +1,126 @@
+"""Client-side request throttling for the Sumo API.
+
+:class:`AdaptiveLimiter` combines a token bucket, which caps the request
+rate, with an AIMD window, which caps the requests in flight. The window
+grows by one request per window's worth of successes and halves when the
+server answers ``429`` or ``5xx``; a ``Retry-After`` header pauses all
+requests for the given time.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+
+def retry_after(value, now=None):
+    """Return seconds to wait for a ``Retry-After`` header value.
+
+    Both delta-seconds and HTTP dates are accepted. Returns ``None`` for
+    missing or unparsable values.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = now or datetime.now(when.tzinfo)
+    return max(0.0, (when - now).total_seconds())
+
+
+class AdaptiveLimiter:
+    """Token-bucket rate limit with an AIMD concurrency window.
+
+    Parameters
+    ----------
+    rate : float
+        Requests per second refilled into the bucket.
+    burst : int, optional
+        Bucket size; defaults to ``rate`` (at least one).
+    window : int
+        Initial number of requests allowed in flight.
+    min_window, max_window : int
+        Bounds of the concurrency window.
+    cooldown : float
+        Seconds after a back-off during which further throttled responses,
+        usually from requests already in flight, do not shrink the window.
+    """
+
+    def __init__(
+        self,
+        rate=10.0,
+        burst=None,
+        window=8,
+        min_window=1,
+        max_window=64,
+        cooldown=1.0,
+        clock=time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.window = float(window)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.cooldown = cooldown
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.backed_off = None
+        self.in_flight = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def limit(self):
+        """Return the current number of requests allowed in flight."""
+        return max(self.min_window, int(self.window))
+
+    async def _take_token(self):
+        while True:
+            now = self.clock()
+            wait = self.paused_until - now
+            if wait <= 0:
+                elapsed = now - self.updated
+                self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for a free window slot and a token, then hold the slot."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            await self._take_token()
+            yield
+        finally:
+            async with self._changed:
+                self.in_flight -= 1
+                self._changed.notify_all()
+
+    def success(self):
+        """Grow the window additively after a successful response."""
+        self.window = min(self.max_window, self.window + 1 / self.limit)
+
+    def throttle(self, delay=None):
+        """Halve the window and pause for ``delay`` seconds if given."""
+        now = self.clock()
+        if delay:
+            self.paused_until = max(self.paused_until, now + delay)
+        if self.backed_off is not None and now - self.backed_off < (
+            self.cooldown
+        ):
+            return
+        self.backed_off = now
+        self.window = max(self.min_window, self.window / 2)
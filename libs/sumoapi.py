@@ -5,6 +5,9 @@ import os
 
 import httpx
 
+from libs.httpcache import ResponseCache, cache_key
+from libs.ratelimit import AdaptiveLimiter, retry_after
+
 
 class SumoApiError(Exception):
     """Raised when the Sumo API request fails."""
@@ -14,16 +17,37 @@ class SumoApiError(Exception):
 
 BASE_URL = "https://sumo-api.com/api"
 ENV_BASE_URL = "SUMO_API_URL"
+ENV_RATE = "SUMO_API_RATE"
+ENV_CACHE_DIR = "SUMO_API_CACHE_DIR"
+# Requests per second allowed by the default limiter
+DEFAULT_RATE = 10.0
+# Status codes that make the limiter back off
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+# Attempts per request when the API throttles or times out
+MAX_ATTEMPTS = 4
+# Seconds paused before retrying when the server gives no Retry-After
+RETRY_BACKOFF = 0.5
+# Rikishi returned per ``/rikishis`` page and pages requested at once
+PAGE_SIZE = 1000
+PAGE_CONCURRENCY = 5
 
 
 class SumoApiClient:
     """Async client for the public Sumo API."""
 
-    def __init__(self, **client_kwargs):
+    def __init__(self, limiter=None, cache=None, **client_kwargs):
         """Create a new :class:`SumoApiClient`.
 
         Parameters
         ----------
+        limiter : AdaptiveLimiter, optional
+            Throttle shared by every request of this client. Defaults to an
+            :class:`~libs.ratelimit.AdaptiveLimiter` allowing
+            ``SUMO_API_RATE`` (default 10) requests per second.
+        cache : ResponseCache, optional
+            Persistent response cache. Defaults to a
+            :class:`~libs.httpcache.ResponseCache` in ``SUMO_API_CACHE_DIR``
+            when that variable is set; caching is disabled otherwise.
         **client_kwargs : dict
             Optional arguments forwarded to ``httpx.AsyncClient``. ``base_url``
             and ``timeout`` are preconfigured but can be overridden.
@@ -33,6 +57,10 @@ class SumoApiClient:
         default_kwargs = {"base_url": base_url, "timeout": 30.0}
         default_kwargs.update(client_kwargs)
         self.client = httpx.AsyncClient(**default_kwargs)
+        rate = float(os.getenv(ENV_RATE) or DEFAULT_RATE)
+        self.limiter = limiter or AdaptiveLimiter(rate=rate)
+        cache_dir = os.getenv(ENV_CACHE_DIR)
+        self.cache = cache or (ResponseCache(cache_dir) if cache_dir else None)
 
     async def __aenter__(self):
         """Enter the async context manager."""
@@ -43,36 +71,125 @@ class SumoApiClient:
         await self.aclose()
 
     async def _get(self, endpoint, **kwargs):
-        try:
-            response = await self.client.get(endpoint, **kwargs)
-            response.raise_for_status()
-            return response
-        except httpx.HTTPError as exc:
-            msg = f"HTTP error while requesting {endpoint}: {exc}"
-            raise SumoApiError(msg) from exc
-
-    async def _get_with_retries(self, endpoint, retries=3, **kwargs):
-        for attempt in range(retries):
+        if self.cache is None:
+            return await self._fetch(endpoint, **kwargs)
+
+        key = cache_key(endpoint, kwargs.get("params"))
+        entry = self.cache.get(key)
+        if entry and self.cache.is_fresh(entry):
+            return self.cache.response(entry, key)
+        if entry:
+            kwargs["headers"] = {
+                **kwargs.get("headers", {}),
+                **self.cache.validators(entry),
+            }
+        response = await self._fetch(endpoint, **kwargs)
+        if entry and response.status_code == 304:
+            self.cache.refresh(key, entry)
+            return self.cache.response(entry, key)
+        if response.status_code == 200:
+            self.cache.store(key, response)
+        return response
+
+    async def _fetch(self, endpoint, **kwargs):
+        """Request ``endpoint`` through the limiter.
+
+        Throttled responses and transport errors such as timeouts shrink
+        the limiter's window and pause it, then the request is retried, up
+        to :data:`MAX_ATTEMPTS` times in total. This is the only retry loop
+        of the client.
+        """
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            last = attempt == MAX_ATTEMPTS
             try:
-                return await self._get(endpoint, **kwargs)
-            except SumoApiError:
-                if attempt == retries - 1:
-                    raise
-                await asyncio.sleep(0.5 * (attempt + 1))
-
-    async def get_all_rikishi(self):
-        """Retrieve all rikishi by paging through the API."""
-        all_rikishi = []
-        skip = 0
+                async with self.limiter.slot():
+                    try:
+                        response = await self.client.get(endpoint, **kwargs)
+                    except httpx.TransportError:
+                        self.limiter.throttle(RETRY_BACKOFF * attempt)
+                        if last:
+                            raise
+                        continue
+                    if response.status_code in THROTTLE_STATUSES:
+                        delay = retry_after(response.headers.get("Retry-After"))
+                        if delay is None:
+                            delay = RETRY_BACKOFF * attempt
+                        self.limiter.throttle(delay)
+                        if not last:
+                            continue
+                    else:
+                        self.limiter.success()
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return response
+            except httpx.HTTPError as exc:
+                msg = f"HTTP error while requesting {endpoint}: {exc}"
+                raise SumoApiError(msg) from exc
+
+    async def _get_rikishi_page(self, skip, page_size):
+        endpoint = f"/rikishis?intai=true&limit={page_size}&skip={skip}"
+        response = await self._get(endpoint)
+        return response.json()
+
+    async def iter_rikishi_pages(
+        self, page_size=PAGE_SIZE, concurrency=PAGE_CONCURRENCY
+    ):
+        """Yield lists of rikishi records one page at a time.
+
+        The first page reports the ``total`` number of rikishi; the remaining
+        pages are then requested concurrently, at most ``concurrency`` at a
+        time, and yielded in order as soon as each is available. Without a
+        total, or when the last expected page is full, pages are walked
+        sequentially until an empty one is returned.
+        """
+        data = await self._get_rikishi_page(0, page_size)
+        records = data.get("records") or []
+        if not records:
+            return
+        yield records
+        skip = page_size
+        total = data.get("total")
+
+        if total:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch(offset):
+                async with semaphore:
+                    return await self._get_rikishi_page(offset, page_size)
+
+            tasks = [
+                asyncio.create_task(fetch(offset))
+                for offset in range(skip, total, page_size)
+            ]
+            try:
+                for task in tasks:
+                    records = (await task).get("records") or []
+                    if not records:
+                        return
+                    yield records
+                    skip += page_size
+            finally:
+                for task in tasks:
+                    task.cancel()
+            if len(records) < page_size:
+                return
+
         while True:
-            endpoint = f"/rikishis?intai=true&limit=1000&skip={skip * 1000}"
-            response = await self._get_with_retries(endpoint)
-            data = response.json()
-            records = data.get("records", [])
+            data = await self._get_rikishi_page(skip, page_size)
+            records = data.get("records") or []
             if not records:
-                break
+                return
+            yield records
+            skip += page_size
+
+    async def get_all_rikishi(self, **kwargs):
+        """Retrieve all rikishi, fetching pages concurrently.
+
+        Keyword arguments are forwarded to :meth:`iter_rikishi_pages`.
+        """
+        all_rikishi = []
+        async for records in self.iter_rikishi_pages(**kwargs):
             all_rikishi.extend(records)
-            skip += 1
         return all_rikishi
 
     async def get_rikishis(self, limit=100, skip=0, intai=True):
@@ -103,12 +220,13 @@ class SumoApiClient:
         return response.json()
 
     async def get_ranking_history(self, rikishi_ids):
-        """Fetch ranking history for multiple rikishi concurrently."""
+        """Fetch ranking history for multiple rikishi concurrently.
+
+        Requests are throttled by the client's limiter.
+        """
         tasks = []
         for rikishi_id in rikishi_ids:
-            tasks.append(
-                self._get_with_retries(f"/ranks?rikishiId={rikishi_id}")
-            )
+            tasks.append(self._get(f"/ranks?rikishiId={rikishi_id}"))
         responses = await asyncio.gather(*tasks)
         return {
             rikishi_ids[i]: responses[i].json()
@@ -125,9 +243,7 @@ class SumoApiClient:
         """Retrieve measurement history for multiple rikishi."""
         tasks = []
         for rikishi_id in rikishi_ids:
-            tasks.append(
-                self._get_with_retries(f"/measurements?rikishiId={rikishi_id}")
-            )
+            tasks.append(self._get(f"/measurements?rikishiId={rikishi_id}"))
         responses = await asyncio.gather(*tasks)
         return {
             rikishi_ids[i]: responses[i].json()
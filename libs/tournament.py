@@ -0,0 +1,193 @@
+"""Monte Carlo simulation of basho outcomes.
+
+Win probabilities are passed as a square matrix where ``prob[i, j]`` is the
+chance that rikishi ``i`` beats rikishi ``j``. Simulations draw every bout of
+many iterations at once with a NumPy :class:`~numpy.random.Generator`.
+:func:`simulate_round_robin` plays every pair while :func:`simulate_basho`
+plays realistic 15-day schedules built by :func:`make_schedule`.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CHUNK_SIZE = 10_000
+DAYS = 15
+# Iterations simulated on each generated schedule
+SCHEDULE_BATCH = 100
+
+
+def pair_indices(heya):
+    """Return index arrays ``(i, j)`` of every pair not from the same heya.
+
+    ``heya`` holds one value per rikishi; empty values never match.
+    """
+    heya = np.asarray(heya, dtype=object)
+    i, j = np.triu_indices(len(heya), k=1)
+    known = np.array([bool(h) for h in heya], dtype=bool)
+    same = known[i] & (heya[i] == heya[j])
+    return i[~same], j[~same]
+
+
+def simulate_round_robin(
+    prob, iterations, pairs=None, seed=None, chunk_size=CHUNK_SIZE
+):
+    """Play every pair once per iteration and count the results.
+
+    ``pairs`` defaults to all pairs; ``seed`` is passed to
+    :func:`numpy.random.default_rng`. Returns ``(wins, bouts)`` arrays with
+    one total per rikishi across all iterations.
+    """
+    prob = np.asarray(prob, dtype=np.float64)
+    n = len(prob)
+    if pairs is None:
+        pairs = np.triu_indices(n, k=1)
+    i, j = pairs
+    rng = np.random.default_rng(seed)
+    p = prob[i, j].astype(np.float32)
+
+    pair_wins = np.zeros(len(p), dtype=np.int64)
+    for start in range(0, iterations, chunk_size):
+        size = min(chunk_size, iterations - start)
+        draws = rng.random((size, len(p)), dtype=np.float32) < p
+        pair_wins += draws.sum(axis=0)
+
+    wins = np.bincount(i, weights=pair_wins, minlength=n)
+    wins += np.bincount(j, weights=iterations - pair_wins, minlength=n)
+    bouts = iterations * (
+        np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+    )
+    return wins.astype(np.int64), bouts
+
+
+def _pair_day(met, banned, window, rng):
+    """Pair one day; return ``(pairs, rematches)``.
+
+    The rikishi with the fewest fresh opponents left is paired first, with
+    ties going to the higher rank, against one of the ``window``
+    closest-ranked fresh opponents.
+    """
+    free = np.ones(len(met), dtype=bool)
+    pairs = []
+    rematches = 0
+    while free.sum() > 1:
+        fresh = ~met & free[None, :] & free[:, None]
+        counts = np.where(free, fresh.sum(axis=1), len(met) + 1)
+        a = int(np.argmin(counts))
+        free[a] = False
+        options = np.flatnonzero(fresh[a])
+        if not len(options):
+            options = np.flatnonzero(free & ~banned[a])
+            if not len(options):
+                continue
+            rematches += 1
+            # Fall back to the closest-ranked allowed opponent
+            order = np.argsort(np.abs(options - a), kind="stable")
+            options = options[order[:1]]
+        options = options[np.argsort(np.abs(options - a), kind="stable")]
+        b = int(options[rng.integers(min(window, len(options)))])
+        free[b] = False
+        pairs.append((min(a, b), max(a, b)))
+    return sorted(pairs), rematches
+
+
+def make_schedule(heya, days=DAYS, window=3, attempts=20, rng=None):
+    """Return a ``days``-day torikumi as ``(i, j)`` index arrays.
+
+    Rikishi are given in banzuke order. Each day every rikishi meets one of
+    the ``window`` closest-ranked opponents not faced yet, never from the
+    same heya. When no fresh opponent is left the closest allowed one is
+    used and the day is re-drawn, up to ``attempts`` times, keeping the
+    draw with the fewest rematches. A rikishi without any allowed opponent
+    sits the day out.
+    """
+    rng = np.random.default_rng(rng)
+    heya = np.asarray(heya, dtype=object)
+    known = np.array([bool(h) for h in heya], dtype=bool)
+    banned = known[:, None] & known[None, :] & (heya[:, None] == heya)
+    # Rikishi without a heya must still never face themselves
+    np.fill_diagonal(banned, True)
+    met = banned.copy()
+    east, west = [], []
+    for _day in range(days):
+        best = None
+        for _attempt in range(attempts):
+            pairs, rematches = _pair_day(met, banned, window, rng)
+            if best is None or rematches < best[1]:
+                best = pairs, rematches
+            if not rematches:
+                break
+        for a, b in best[0]:
+            met[a, b] = met[b, a] = True
+            east.append(a)
+            west.append(b)
+    return np.array(east, dtype=np.intp), np.array(west, dtype=np.intp)
+
+
+def simulate_schedule(prob, schedule, iterations, rng=None):
+    """Return an ``(iterations, n)`` array of wins over one schedule."""
+    rng = np.random.default_rng(rng)
+    prob = np.asarray(prob, dtype=np.float64)
+    n = len(prob)
+    i, j = schedule
+    east = np.zeros((len(i), n), dtype=np.float32)
+    east[np.arange(len(i)), i] = 1
+    west = np.zeros((len(j), n), dtype=np.float32)
+    west[np.arange(len(j)), j] = 1
+    draws = rng.random((iterations, len(i))) < prob[i, j]
+    wins = draws.astype(np.float32) @ east + (~draws).astype(np.float32) @ west
+    return wins.astype(np.int64)
+
+
+def _simulate_batch(args):
+    prob, heya, iterations, seed = args
+    rng = np.random.default_rng(seed)
+    schedule = make_schedule(heya, rng=rng)
+    n = len(prob)
+    bouts = np.bincount(schedule[0], minlength=n) + np.bincount(
+        schedule[1], minlength=n
+    )
+    wins = simulate_schedule(prob, schedule, iterations, rng)
+    leaders = wins == wins.max(axis=1, keepdims=True)
+    yusho = (leaders / leaders.sum(axis=1, keepdims=True)).sum(axis=0)
+    kachi_koshi = (wins * 2 > bouts).sum(axis=0)
+    scaled = np.divide(
+        wins * DAYS, bouts, out=np.zeros(wins.shape), where=bouts > 0
+    )
+    return scaled.sum(axis=0), yusho, kachi_koshi
+
+
+def simulate_basho(
+    prob, heya, iterations, seed=None, workers=1, batch=SCHEDULE_BATCH
+):
+    """Simulate ``iterations`` tournaments on generated 15-day schedules.
+
+    A fresh schedule from :func:`make_schedule` is drawn for every
+    ``batch`` iterations. Batches get independent seeds spawned from
+    ``seed`` and run in a process pool when ``workers`` is not ``1``, so
+    results do not depend on the number of workers. Returns a dict of
+    per-rikishi arrays: expected ``wins`` (scaled to 15 bouts) and the
+    ``yusho`` and ``kachi_koshi`` probabilities. Tied leaders share the
+    yusho.
+    """
+    prob = np.asarray(prob, dtype=np.float64)
+    sizes = [batch] * (iterations // batch)
+    if iterations % batch:
+        sizes.append(iterations % batch)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (prob, heya, size, task_seed)
+        for size, task_seed in zip(sizes, seeds, strict=True)
+    ]
+    if workers == 1:
+        results = list(map(_simulate_batch, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_batch, tasks, chunksize=4))
+
+    totals = [np.sum(parts, axis=0) for parts in zip(*results, strict=True)]
+    return {
+        "wins": totals[0] / iterations,
+        "yusho": totals[1] / iterations,
+        "kachi_koshi": totals[2] / iterations,
+    }
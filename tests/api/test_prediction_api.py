@@ -0,0 +1,113 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.models import (
+    Basho,
+    BashoHistory,
+    Division,
+    Prediction,
+    Rank,
+    Rikishi,
+)
+from libs.api_utils import invalidate_predictions, predictions_cache
+from libs.constants import Direction, RankName
+
+LOCMEM = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "predictions")
+}
+
+
+@override_settings(CACHES=LOCMEM)
+class PredictionApiTests(TestCase):
+    """Verify the cached basho prediction endpoint."""
+
+    def setUp(self):
+        predictions_cache().clear()
+        division, _ = Division.objects.get_or_create(
+            name="Makuuchi", defaults={"name_short": "M", "level": 1}
+        )
+        rank = Rank.objects.create(
+            slug="m1e",
+            division=division,
+            title=RankName.MAEGASHIRA,
+            order=1,
+            direction=Direction.EAST,
+        )
+        self.basho = Basho.objects.create(year=2025, month=5)
+        self.r1 = Rikishi.objects.create(
+            id=1, name="Hoshoryu", name_jp="H", rank=rank
+        )
+        self.r2 = Rikishi.objects.create(id=2, name="Onosato", name_jp="O")
+        self.r3 = Rikishi.objects.create(
+            id=3, name="Kotozakura", name_jp="K", rank=rank
+        )
+        self.banzuke = Rank.objects.create(
+            slug="k1w",
+            division=division,
+            title=RankName.KOMUSUBI,
+            order=1,
+            direction=Direction.WEST,
+        )
+        BashoHistory.objects.create(
+            rikishi=self.r3, basho=self.basho, rank=self.banzuke
+        )
+        # a banzuke row of another basho must not be used
+        BashoHistory.objects.create(
+            rikishi=self.r1,
+            basho=Basho.objects.create(year=2025, month=3),
+            rank=self.banzuke,
+        )
+        Prediction.objects.create(rikishi=self.r3, basho=self.basho, wins=7.0)
+        Prediction.objects.create(
+            rikishi=self.r1, basho=self.basho, wins=8.5, yusho=0.2
+        )
+        Prediction.objects.create(
+            rikishi=self.r2, basho=self.basho, wins=10.0, yusho=0.4
+        )
+        self.url = f"/api/basho/{self.basho.slug}/predictions/"
+
+    def get_json(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_predictions_ordered_with_rank_and_shikona(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.get_json(self.url)
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(
+            [p["shikona"] for p in data],
+            ["Onosato", "Hoshoryu", "Kotozakura"],
+        )
+        self.assertIsNone(data[0]["rank"])
+        self.assertEqual(data[1]["rank"], self.r1.rank.name())
+        self.assertEqual(data[1]["wins"], 8.5)
+        self.assertEqual(data[1]["yusho"], 0.2)
+        self.assertIsNone(data[1]["kachi_koshi"])
+
+    def test_responses_cached_until_invalidated(self):
+        self.get_json(self.url)
+        Prediction.objects.filter(rikishi=self.r2).update(wins=5.0)
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.get_json(self.url)
+        self.assertEqual(len(ctx), 0)
+        self.assertEqual(data[0]["wins"], 10.0)
+
+        invalidate_predictions(self.basho.slug)
+        data = self.get_json(self.url)
+        self.assertEqual(data[0]["shikona"], "Hoshoryu")
+
+    def test_rank_taken_from_basho_banzuke(self):
+        data = self.get_json(self.url)
+        self.assertEqual(data[2]["rank"], self.banzuke.name())
+        self.assertNotEqual(data[2]["rank"], self.r3.rank.name())
+
+    def test_unknown_basho(self):
+        response = self.client.get("/api/basho/209901/predictions/")
+        self.assertEqual(response.status_code, 404)
+        basho = Basho.objects.create(year=2025, month=7)
+        self.assertEqual(
+            self.get_json(f"/api/basho/{basho.slug}/predictions/"), []
+        )
@@ -2,20 +2,39 @@ import asyncio
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 
 from app.management.commands.bouts import (
     Command,
     get_division_map,
+    get_existing_bout_keys,
     get_rikishi_map,
 )
-from app.models import Basho, Division, Rikishi
+from app.models import Basho, Bout, Division, Rikishi
 from libs.sumoapi import SumoApiError
 
+CMD_PREFIX = "app.management.commands.bouts"
+
 
 class BoutsCommandTests(SimpleTestCase):
     """Tests for the ``bouts`` management command."""
 
+    def setUp(self):
+        self.job = SimpleNamespace(last_rikishi_id=None, oldest_basho="")
+        self.start_job = self.enterContext(
+            patch(f"{CMD_PREFIX}.start_job", return_value=self.job)
+        )
+        self.checkpoint = self.enterContext(
+            patch(f"{CMD_PREFIX}.save_checkpoint")
+        )
+        self.enterContext(patch(f"{CMD_PREFIX}.finish_job"))
+        self.existing = self.enterContext(
+            patch(
+                f"{CMD_PREFIX}.get_existing_bout_keys",
+                new=AsyncMock(return_value=set()),
+            )
+        )
+
     def run_async(self, coro):
         """Synchronously run an async coroutine."""
         return asyncio.get_event_loop().run_until_complete(coro)
@@ -57,6 +76,7 @@ class BoutsCommandTests(SimpleTestCase):
                 "app.management.commands.bouts.Bout.objects.abulk_create",
                 new=AsyncMock(),
             ),
+            patch("app.management.commands.bouts.refresh_head_to_head"),
         )
         return patches
 
@@ -70,6 +90,7 @@ class BoutsCommandTests(SimpleTestCase):
             patches[2],
             patches[3],
             patches[4] as create_mock,
+            patches[5] as refresh_mock,
         ):
             api = AsyncMock()
             client_cls.return_value.__aenter__.return_value = api
@@ -84,6 +105,7 @@ class BoutsCommandTests(SimpleTestCase):
             self.assertEqual(bout.kimarite, "yorikiri")
             self.assertEqual(bout.day, 1)
             self.assertEqual(bout.match_no, 1)
+            refresh_mock.assert_called_once_with("202501")
 
     def test_basho_option_passed_to_api(self):
         """Passing ``--basho`` should filter API requests."""
@@ -95,6 +117,7 @@ class BoutsCommandTests(SimpleTestCase):
             patches[2],
             patches[3],
             patches[4],
+            patches[5],
         ):
             api = AsyncMock()
             client_cls.return_value.__aenter__.return_value = api
@@ -175,6 +198,71 @@ class BoutsCommandTests(SimpleTestCase):
         self.assertTrue(run_mock.called)
         self.assertIn("fail", output[-1])
 
+    def test_known_bouts_do_not_refresh_head_to_head(self):
+        """Bouts already stored are skipped and trigger no rebuild."""
+        self.existing.return_value = {("202501", 1, 1, 10, 11)}
+        patches = self.setup_patches()
+        with (
+            patches[0] as client_cls,
+            patches[1],
+            patches[2],
+            patches[3],
+            patches[4] as create_mock,
+            patches[5] as refresh_mock,
+        ):
+            api = AsyncMock()
+            client_cls.return_value.__aenter__.return_value = api
+            client_cls.return_value.__aexit__.return_value = None
+            api.get_rikishi_matches.return_value = {
+                "records": [self.get_record()]
+            }
+            output = []
+            cmd = Command()
+            cmd.stdout = SimpleNamespace(write=lambda msg: output.append(msg))
+            cmd.style = SimpleNamespace(SUCCESS=lambda m: m)
+            self.run_async(cmd.run(10, None))
+        self.existing.assert_awaited_once_with([10], None)
+        create_mock.assert_not_awaited()
+        refresh_mock.assert_not_called()
+        self.assertIn("Imported 0 bouts", output[-1])
+
+    def test_resume_skips_checkpointed_rikishi(self):
+        """``--resume`` continues after the saved rikishi cursor."""
+        self.job.last_rikishi_id = 10
+        self.job.oldest_basho = "202401"
+        patches = self.setup_patches()
+        with (
+            patches[0] as client_cls,
+            patches[1],
+            patches[2],
+            patches[3],
+            patches[4],
+            patches[5] as refresh_mock,
+        ):
+            api = AsyncMock()
+            client_cls.return_value.__aenter__.return_value = api
+            client_cls.return_value.__aexit__.return_value = None
+            api.get_rikishi_matches.return_value = {
+                "records": [self.get_record()]
+            }
+            cmd = Command()
+            cmd.stdout = SimpleNamespace(write=lambda msg: None)
+            cmd.style = SimpleNamespace(SUCCESS=lambda m: m)
+
+            async def ids(rikishi_id=None):
+                for rid in (10, 11, 12):
+                    yield rid
+
+            cmd.rikishi_id_iter = ids
+            self.run_async(cmd.run(resume=True))
+        self.start_job.assert_called_once_with("bouts", True)
+        fetched = [c.args[0] for c in api.get_rikishi_matches.call_args_list]
+        self.assertEqual(fetched, [11, 12])
+        self.checkpoint.assert_called_once_with(
+            self.job, last_rikishi_id=12, oldest_basho="202401"
+        )
+        refresh_mock.assert_called_once_with("202401")
+
     def test_parser_arguments(self):
         """Argument parser should accept rikishi and basho options."""
         cmd = Command()
@@ -207,3 +295,30 @@ class BoutsHelperTests(SimpleTestCase):
                 self.run_async(get_division_map()),
                 {"Juryo": division},
             )
+
+
+class ExistingBoutKeysTests(TestCase):
+    def test_keys_of_stored_bouts(self):
+        division, _ = Division.objects.get_or_create(
+            name="Makuuchi", defaults={"name_short": "M", "level": 1}
+        )
+        basho = Basho.objects.create(year=2025, month=1)
+        east, west, other = (
+            Rikishi.objects.create(id=i, name=str(i), name_jp=str(i))
+            for i in (1, 2, 3)
+        )
+        Bout.objects.create(
+            basho=basho,
+            division=division,
+            day=1,
+            match_no=1,
+            east=east,
+            west=west,
+            winner=east,
+        )
+        # call the wrapped query directly to stay in the test transaction
+        self.assertEqual(
+            get_existing_bout_keys.func([2]), {("202501", 1, 1, 1, 2)}
+        )
+        self.assertEqual(get_existing_bout_keys.func([3]), set())
+        self.assertEqual(get_existing_bout_keys.func([1], "202503"), set())
@@ -1,9 +1,12 @@
 import asyncio
 import csv
+import io
 import tempfile
 from datetime import date
 
+import pandas as pd
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db import connection
 from django.test import TransactionTestCase
 from django.test.utils import CaptureQueriesContext
@@ -20,6 +23,7 @@ from app.models import (
     Shusshin,
 )
 from libs.constants import Direction, RankName
+from libs.dataset import read_dataset
 
 
 class DatasetCommandTests(TransactionTestCase):
@@ -435,3 +439,144 @@ class DatasetCommandTests(TransactionTestCase):
         self.assertEqual(target[headers.index("west_rd")], "")
         self.assertEqual(target[headers.index("east_vol")], "")
         self.assertEqual(target[headers.index("west_vol")], "")
+
+    def test_parquet_and_feather_output(self):
+        """Binary formats keep types and round-trip through read_dataset."""
+        r3 = Rikishi.objects.create(id=3, name="C", name_jp="C")
+        division = Division.objects.get(name="Makuuchi")
+        Bout.objects.create(
+            basho=self.basho,
+            division=division,
+            day=2,
+            match_no=1,
+            east=r3,
+            west=self.r1,
+            east_shikona="C",
+            west_shikona="A",
+            kimarite="oshidashi",
+            winner=r3,
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                call_command("dataset", f"{tmpdir}/data.csv")
+                call_command("dataset", f"{tmpdir}/data.parquet")
+                call_command(
+                    "dataset", f"{tmpdir}/data.bin", "--format", "feather"
+                )
+            finally:
+                asyncio.set_event_loop(asyncio.new_event_loop())
+                loop.close()
+
+            raw = pd.read_parquet(f"{tmpdir}/data.parquet")
+            self.assertEqual(str(raw["east_rank"].dtype), "Int32")
+            self.assertEqual(str(raw["day"].dtype), "int8")
+            raw = pd.read_feather(f"{tmpdir}/data.bin")
+            self.assertIsInstance(raw["east_heya"].dtype, pd.CategoricalDtype)
+            self.assertTrue(pd.isna(raw.loc[1, "east_heya"]))
+
+            expected = read_dataset(f"{tmpdir}/data.csv")
+            for df in (
+                read_dataset(f"{tmpdir}/data.parquet"),
+                read_dataset(f"{tmpdir}/data.bin", "feather"),
+            ):
+                self.assertEqual(list(df.columns), list(expected.columns))
+                self.assertEqual(str(df["east_heya"].dtype), "Int64")
+                pd.testing.assert_frame_equal(
+                    df, expected, check_dtype=False, check_exact=False
+                )
+
+    def _call(self, *args):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            call_command("dataset", *args)
+        finally:
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            loop.close()
+
+    def test_append_matches_full_export(self):
+        division = Division.objects.get(name="Makuuchi")
+        later = Basho.objects.create(
+            year=2025, month=3, start_date=date(2025, 3, 9)
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for suffix in ("csv", "parquet"):
+                self._call(f"{tmpdir}/append.{suffix}")
+
+            for rikishi, rating in ((self.r1, 1510.0), (self.r2, 1480.0)):
+                BashoHistory.objects.create(
+                    rikishi=rikishi, basho=later, rank=self.rank
+                )
+                BashoRating.objects.create(
+                    rikishi=rikishi,
+                    basho=later,
+                    previous_rating=1500.0,
+                    rating=rating,
+                    rd=200.0,
+                    vol=0.06,
+                )
+            for day, (east, west) in enumerate(
+                ((self.r2, self.r1), (self.r1, self.r2)), start=1
+            ):
+                Bout.objects.create(
+                    basho=later,
+                    division=division,
+                    day=day,
+                    match_no=1,
+                    east=east,
+                    west=west,
+                    east_shikona=east.name,
+                    west_shikona=west.name,
+                    kimarite="yorikiri",
+                    winner=self.r1,
+                )
+
+            for suffix in ("csv", "parquet"):
+                self._call(f"{tmpdir}/append.{suffix}", "--append")
+                self._call(f"{tmpdir}/full.{suffix}")
+            with open(f"{tmpdir}/append.csv", "rb") as fh:
+                appended = fh.read()
+            with open(f"{tmpdir}/full.csv", "rb") as fh:
+                self.assertEqual(appended, fh.read())
+            pd.testing.assert_frame_equal(
+                read_dataset(f"{tmpdir}/append.parquet"),
+                read_dataset(f"{tmpdir}/full.parquet"),
+            )
+
+            out = io.StringIO()
+            call_command(
+                "dataset", f"{tmpdir}/append.csv", "--append", stdout=out
+            )
+            self.assertIn("already up to date", out.getvalue())
+
+    def test_append_requires_previous_export(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertRaises(CommandError):
+                self._call(f"{tmpdir}/missing.csv", "--append")
+
+    def test_workers_output_matches_serial(self):
+        division = Division.objects.get(name="Makuuchi")
+        for month in (3, 5):
+            basho = Basho.objects.create(year=2025, month=month)
+            for day in (1, 2):
+                Bout.objects.create(
+                    basho=basho,
+                    division=division,
+                    day=day,
+                    match_no=1,
+                    east=self.r1,
+                    west=self.r2,
+                    east_shikona="A",
+                    west_shikona="B",
+                    kimarite="yorikiri",
+                    winner=self.r1 if day == 1 else self.r2,
+                )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self._call(f"{tmpdir}/serial.csv")
+            self._call(f"{tmpdir}/sharded.csv", "--workers", "3")
+            with open(f"{tmpdir}/serial.csv", "rb") as fh:
+                serial = fh.read()
+            with open(f"{tmpdir}/sharded.csv", "rb") as fh:
+                self.assertEqual(fh.read(), serial)
@@ -1,5 +1,9 @@
-from django.core.management import call_command
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from app.models import (
     Basho,
@@ -8,6 +12,7 @@ from app.models import (
     Bout,
     Division,
     Rank,
+    RatingSnapshot,
     Rikishi,
 )
 
@@ -71,3 +76,106 @@ class GlickoCommandTests(TestCase):
         self.assertEqual(r2_b1.previous_rating, 1500.0)
         self.assertEqual(r2_b1.previous_rd, 350.0)
         self.assertEqual(r2_b1.previous_vol, 0.11)
+
+    def test_since_matches_full_run(self):
+        """Recomputing from a basho should reuse the stored prior ratings."""
+        Bout.objects.create(
+            basho=self.b2,
+            division=self.division,
+            day=1,
+            match_no=1,
+            east=self.r2,
+            west=self.r1,
+            east_shikona="B",
+            west_shikona="A",
+            kimarite="oshidashi",
+            winner=self.r2,
+        )
+        call_command("glicko", snapshot_every=0)
+        full = {
+            r.rikishi_id: (r.rating, r.rd, r.vol)
+            for r in BashoRating.objects.filter(basho=self.b2)
+        }
+        BashoRating.objects.filter(basho=self.b2).update(rating=0)
+        b1_rating = BashoRating.objects.get(rikishi=self.r1, basho=self.b1)
+
+        call_command("glicko", since=self.b2.slug)
+
+        self.assertEqual(
+            BashoRating.objects.get(rikishi=self.r1, basho=self.b1).rating,
+            b1_rating.rating,
+        )
+        for rating in BashoRating.objects.filter(basho=self.b2):
+            expected = full[rating.rikishi_id]
+            self.assertAlmostEqual(rating.rating, expected[0])
+            self.assertAlmostEqual(rating.rd, expected[1])
+            self.assertAlmostEqual(rating.vol, expected[2])
+            self.assertEqual(
+                rating.previous_rating,
+                BashoRating.objects.get(
+                    rikishi_id=rating.rikishi_id, basho=self.b1
+                ).rating,
+            )
+
+    def test_since_unknown_basho(self):
+        with self.assertRaises(CommandError):
+            call_command("glicko", since="199901")
+
+    def test_snapshots_written_and_resumed(self):
+        """A later recompute should start from the stored snapshot."""
+        Bout.objects.create(
+            basho=self.b2,
+            division=self.division,
+            day=1,
+            match_no=1,
+            east=self.r1,
+            west=self.r2,
+            east_shikona="A",
+            west_shikona="B",
+            kimarite="yorikiri",
+            winner=self.r1,
+        )
+        call_command("glicko", snapshot_every=1)
+        self.assertEqual(
+            list(RatingSnapshot.objects.values_list("basho_id", flat=True)),
+            [self.b1.slug, self.b2.slug],
+        )
+        snapshot = RatingSnapshot.objects.get(basho=self.b1)
+        self.assertEqual(snapshot.players, 2)
+        expected = BashoRating.objects.get(rikishi=self.r1, basho=self.b2).rd
+
+        BashoRating.objects.filter(basho=self.b2).delete()
+        out = StringIO()
+        call_command("glicko", since=self.b2.slug, stdout=out)
+
+        self.assertIn(f"Resuming from snapshot {self.b1.slug}", out.getvalue())
+        self.assertAlmostEqual(
+            BashoRating.objects.get(rikishi=self.r1, basho=self.b2).rd,
+            expected,
+        )
+
+    def test_bulk_loading_query_count(self):
+        """Bouts and histories should be loaded once, not per basho."""
+        Bout.objects.create(
+            basho=self.b2,
+            division=self.division,
+            day=1,
+            match_no=1,
+            east=self.r2,
+            west=self.r1,
+            east_shikona="B",
+            west_shikona="A",
+            kimarite="oshidashi",
+            winner=self.r2,
+        )
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("glicko", snapshot_every=0, stdout=out)
+        # 2 deletes, 4 loads and one bulk write per rated basho; each write
+        # runs in its own transaction, a savepoint inside the test case
+        queries = [
+            q for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]
+        ]
+        self.assertEqual(len(queries), 8)
+        self.assertIn("load", out.getvalue())
+        self.assertIn("write", out.getvalue())
@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from app.management.commands.glicko import load_periods
+from app.models import (
+    Basho,
+    BashoHistory,
+    BashoRating,
+    Bout,
+    Division,
+    Rank,
+    Rikishi,
+)
+
+
+class GlickoSweepCommandTests(TestCase):
+    def setUp(self):
+        self.division = Division.objects.get(name="Makuuchi")
+        rank = Rank.objects.create(
+            slug="m1e",
+            title="Maegashira",
+            level=5,
+            order=1,
+            direction="East",
+            division=self.division,
+        )
+        self.r1 = Rikishi.objects.create(id=1, name="A", name_jp="A")
+        self.r2 = Rikishi.objects.create(id=2, name="B", name_jp="B")
+        for month in (1, 3, 5):
+            basho = Basho.objects.create(year=2025, month=month)
+            for rikishi in (self.r1, self.r2):
+                BashoHistory.objects.create(
+                    rikishi=rikishi, basho=basho, rank=rank
+                )
+            for day in (1, 2):
+                Bout.objects.create(
+                    basho=basho,
+                    division=self.division,
+                    day=day,
+                    match_no=1,
+                    east=self.r1,
+                    west=self.r2,
+                    east_shikona="A",
+                    west_shikona="B",
+                    kimarite="yorikiri",
+                    winner=self.r1,
+                )
+
+    def test_load_periods_groups_bouts(self):
+        periods = load_periods()
+        self.assertEqual(
+            [p[0] for p in periods], ["202501", "202503", "202505"]
+        )
+        slug, east, west, east_wins, active = periods[0]
+        self.assertEqual(east.tolist(), [1, 1])
+        self.assertEqual(west.tolist(), [2, 2])
+        self.assertEqual(east_wins.tolist(), [1, 1])
+        self.assertEqual(active.tolist(), [1, 2])
+        self.assertEqual(len(load_periods(since="202503")), 2)
+
+    def test_sweep_ranks_parameters(self):
+        out = StringIO()
+        call_command(
+            "glicko_sweep",
+            "--tau",
+            "0.3",
+            "0.9",
+            "--rd",
+            "200",
+            "--burn-in",
+            "1",
+            "--workers",
+            "1",
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn("Scoring 2 combinations over 3 basho", output)
+        self.assertIn("Best: tau=", output)
+        self.assertEqual(output.count(" 200.0 "), 2)
+        self.assertFalse(BashoRating.objects.exists())
+
+    def test_not_enough_basho(self):
+        with self.assertRaises(CommandError):
+            call_command("glicko_sweep", "--burn-in", "3")
@@ -1,19 +1,26 @@
 import asyncio
+import random
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 
 from app.management.commands.history import (
+    MEASUREMENT_FIELDS,
+    SHIKONA_FIELDS,
     Command,
+    LatestRecords,
+    basho_from_api,
     get_existing_basho,
     get_existing_keys,
     get_existing_rank,
+    get_latest_basho,
     get_rikishis,
-    pick_measurements,
-    pick_shikona,
+    rank_from_string,
 )
 from app.models.basho import Basho
+from app.models.division import Division
+from app.models.history import BashoHistory
 from app.models.rank import Rank
 from app.models.rikishi import Rikishi
 from libs.sumoapi import SumoApiError
@@ -21,9 +28,20 @@ from libs.sumoapi import SumoApiError
 CMD_PREFIX = "app.management.commands.history"
 
 
+def patch_job(test, last_rikishi_id=None):
+    """Replace the ingest job bookkeeping with mocks for ``test``."""
+    job = SimpleNamespace(last_rikishi_id=last_rikishi_id)
+    test.enterContext(patch(f"{CMD_PREFIX}.start_job", return_value=job))
+    test.enterContext(patch(f"{CMD_PREFIX}.finish_job"))
+    return test.enterContext(patch("libs.ingest.save_checkpoint"))
+
+
 class HistoryCommandTests(SimpleTestCase):
     """Tests for the ``history`` management command helpers."""
 
+    def setUp(self):
+        patch_job(self)
+
     def run_async(self, coro):
         """Synchronously run an async coroutine for convenience."""
         return asyncio.get_event_loop().run_until_complete(coro)
@@ -36,7 +54,7 @@ class HistoryCommandTests(SimpleTestCase):
             patch(f"{CMD_PREFIX}.Rank.objects") as rao,
             patch(f"{CMD_PREFIX}.BashoHistory.objects") as ho,
         ):
-            ro.only.return_value = [1]
+            ro.only.return_value.order_by.return_value = [1]
             bo.all.return_value = [SimpleNamespace(slug="x")]
             rao.all.return_value = [SimpleNamespace(slug="y")]
             ho.values_list.return_value = [(1, "x")]
@@ -51,33 +69,54 @@ class HistoryCommandTests(SimpleTestCase):
                 {"y": rao.all.return_value[0]},
             )
             self.assertEqual(self.run_async(get_existing_keys()), {(1, "x")})
+            ho.values_list.assert_called_with("rikishi_id", "basho_id")
 
-    def test_pick_shikona(self):
+    def test_shikona_fallback(self):
         """Select the nearest available shikona data."""
         data = {
             "202401": {"shikonaEn": "Old", "shikonaJp": "旧"},
             "202403": {"shikonaEn": "New", "shikonaJp": "新"},
         }
-        self.assertEqual(pick_shikona(data, "202402")["shikonaEn"], "Old")
-        self.assertEqual(pick_shikona(data, "202404")["shikonaJp"], "新")
-        self.assertEqual(pick_shikona(data, "202312"), {})
+        index = LatestRecords(data, SHIKONA_FIELDS)
+        self.assertEqual(index.at("202402")["shikonaEn"], "Old")
+        self.assertEqual(index.at("202404")["shikonaJp"], "新")
+        self.assertEqual(index.at("202312"), {})
+
+    def test_latest_records_match_linear_scan(self):
+        """The bisect index agrees with scanning every earlier key."""
+
+        def scan(records, slug):
+            for key in sorted((k for k in records if k <= slug), reverse=True):
+                if records[key].get("height") or records[key].get("weight"):
+                    return records[key]
+            return {}
+
+        rng = random.Random(0)
+        slugs = [f"{y}{m:02d}" for y in range(2000, 2010) for m in (1, 5, 9)]
+        records = {
+            slug: {"height": rng.choice([None, 180]), "weight": None}
+            for slug in rng.sample(slugs, 20)
+        }
+        index = LatestRecords(records, ("height", "weight"))
+        for slug in slugs:
+            self.assertIs(index.at(slug) or None, scan(records, slug) or None)
 
-    def test_pick_measurements(self):
+    def test_measurement_fallback(self):
         """Select the nearest measurement data."""
         data = {
             "202401": {"height": 180, "weight": 100},
             "202403": {"height": 181, "weight": 101},
         }
-        self.assertEqual(pick_measurements(data, "202402")["height"], 180)
-        self.assertEqual(pick_measurements(data, "202404")["weight"], 101)
-        self.assertEqual(pick_measurements(data, "202312"), {})
+        index = LatestRecords(data, MEASUREMENT_FIELDS)
+        self.assertEqual(index.at("202402")["height"], 180)
+        self.assertEqual(index.at("202404")["weight"], 101)
+        self.assertEqual(index.at("202312"), {})
 
     def test_shikona_fields_populated(self):
         """Command should populate shikona fields when available."""
         rikishi = Rikishi(id=1, name="R", name_jp="R")
         basho = Basho(year=2025, month=1)
         basho.slug = "202501"
-        rank = Rank(title="Y", level=1)
 
         async_mock = AsyncMock
         with (
@@ -102,8 +141,8 @@ class HistoryCommandTests(SimpleTestCase):
                 new=async_mock(return_value={}),
             ),
             patch(
-                "app.management.commands.history.Rank.objects.aget_or_create",
-                new=async_mock(return_value=(rank, True)),
+                f"{CMD_PREFIX}.save_basho_and_ranks",
+                new=async_mock(),
             ),
             patch(
                 "app.management.commands.history.BashoHistory.objects.abulk_create",
@@ -141,7 +180,6 @@ class HistoryCommandTests(SimpleTestCase):
         rikishi = Rikishi(id=1, name="R", name_jp="R")
         basho = Basho(year=2025, month=4)
         basho.slug = "202504"
-        rank = Rank(title="Y", level=1)
 
         async_mock = AsyncMock
         with (
@@ -166,8 +204,8 @@ class HistoryCommandTests(SimpleTestCase):
                 new=async_mock(return_value={}),
             ),
             patch(
-                "app.management.commands.history.Rank.objects.aget_or_create",
-                new=async_mock(return_value=(rank, True)),
+                f"{CMD_PREFIX}.save_basho_and_ranks",
+                new=async_mock(),
             ),
             patch(
                 "app.management.commands.history.BashoHistory.objects.abulk_create",
@@ -201,7 +239,6 @@ class HistoryCommandTests(SimpleTestCase):
         rikishi = Rikishi(id=1, name="R", name_jp="R")
         basho = Basho(year=2025, month=1)
         basho.slug = "202501"
-        rank = Rank(title="Y", level=1)
 
         async_mock = AsyncMock
         with (
@@ -226,8 +263,8 @@ class HistoryCommandTests(SimpleTestCase):
                 new=async_mock(return_value={}),
             ),
             patch(
-                "app.management.commands.history.Rank.objects.aget_or_create",
-                new=async_mock(return_value=(rank, True)),
+                f"{CMD_PREFIX}.save_basho_and_ranks",
+                new=async_mock(),
             ),
             patch(
                 "app.management.commands.history.BashoHistory.objects.abulk_create",
@@ -261,7 +298,6 @@ class HistoryCommandTests(SimpleTestCase):
         rikishi = Rikishi(id=1, name="R", name_jp="R")
         basho = Basho(year=2025, month=1)
         basho.slug = "202501"
-        rank = Rank(title="Y", level=1)
 
         async_mock = AsyncMock
         with (
@@ -286,8 +322,8 @@ class HistoryCommandTests(SimpleTestCase):
                 new=async_mock(return_value={}),
             ),
             patch(
-                "app.management.commands.history.Rank.objects.aget_or_create",
-                new=async_mock(return_value=(rank, True)),
+                f"{CMD_PREFIX}.save_basho_and_ranks",
+                new=async_mock(),
             ),
             patch(
                 "app.management.commands.history.BashoHistory.objects.abulk_create",
@@ -322,7 +358,6 @@ class HistoryCommandTests(SimpleTestCase):
         rikishi = Rikishi(id=1, name="R", name_jp="R")
         basho = Basho(year=2025, month=2)
         basho.slug = "202502"
-        rank = Rank(title="Y", level=1)
 
         async_mock = AsyncMock
         with (
@@ -347,8 +382,8 @@ class HistoryCommandTests(SimpleTestCase):
                 new=async_mock(return_value={}),
             ),
             patch(
-                "app.management.commands.history.Rank.objects.aget_or_create",
-                new=async_mock(return_value=(rank, True)),
+                f"{CMD_PREFIX}.save_basho_and_ranks",
+                new=async_mock(),
             ),
             patch(
                 "app.management.commands.history.BashoHistory.objects.abulk_create",
@@ -383,7 +418,6 @@ class HistoryCommandTests(SimpleTestCase):
         rikishi = Rikishi(id=1, name="R", name_jp="R")
         basho = Basho(year=2025, month=1)
         basho.slug = "202501"
-        rank = Rank(title="Y", level=1)
 
         async_mock = AsyncMock
         with (
@@ -408,8 +442,8 @@ class HistoryCommandTests(SimpleTestCase):
                 new=async_mock(return_value={}),
             ),
             patch(
-                "app.management.commands.history.Rank.objects.aget_or_create",
-                new=async_mock(return_value=(rank, True)),
+                f"{CMD_PREFIX}.save_basho_and_ranks",
+                new=async_mock(),
             ),
             patch(
                 "app.management.commands.history.BashoHistory.objects.abulk_create",
@@ -484,44 +518,34 @@ class HistoryCommandTests(SimpleTestCase):
         self.assertTrue(run_mock.called)
         self.assertIn("oops", output[-1])
 
-    def test_get_or_create_rank_variations(self):
-        """Rank caching should prevent duplicate queries."""
-        cmd = Command()
-        cache = {}
-        div_cache = {"Makuuchi": SimpleNamespace(name="Makuuchi")}
-        rank_obj = SimpleNamespace()
-        with patch(
-            "app.management.commands.history.Rank.objects.aget_or_create",
-            new=AsyncMock(return_value=(rank_obj, True)),
-        ) as create_mock:
-            self.run_async(
-                cmd.get_or_create_rank("Yokozuna 1 East", cache, div_cache)
-            )
-            self.run_async(
-                cmd.get_or_create_rank("Yokozuna 1 East", cache, div_cache)
-            )
-            self.run_async(
-                cmd.get_or_create_rank("Sekiwake 1", cache, div_cache)
-            )
-            self.run_async(
-                cmd.get_or_create_rank("Jonokuchi", cache, div_cache)
-            )
-        self.assertEqual(create_mock.call_count, 3)
-
-    def test_create_basho_from_api(self):
-        """Creating a ``Basho`` from API data should hit the ORM once."""
-        cmd = Command()
-        basho_data = {
-            "date": "202501",
-            "startDate": "2025-01-10T00:00:00Z",
-            "endDate": "2025-01-24T00:00:00Z",
-        }
-        with patch(
-            "app.management.commands.history.Basho.objects.acreate",
-            new=AsyncMock(),
-        ) as create_mock:
-            self.run_async(cmd.create_basho_from_api(basho_data))
-        create_mock.assert_awaited_once()
+    def test_rank_from_string_variations(self):
+        """Rank strings map to slugs, directions and divisions."""
+        makuuchi = Division(name="Makuuchi")
+        cache = {"Makuuchi": makuuchi}
+        key, rank = rank_from_string("Yokozuna 1 East", cache)
+        self.assertEqual((key, rank.slug), ("yokozuna-1-east",) * 2)
+        self.assertEqual(rank.direction, "East")
+        self.assertIs(rank.division, makuuchi)
+        key, rank = rank_from_string("Sekiwake 1", cache)
+        self.assertEqual(key, "sekiwake-1")
+        self.assertEqual(rank.slug, "sekiwake-1-west")
+        self.assertEqual(rank.direction, "West")
+        key, rank = rank_from_string("Jonokuchi", cache)
+        self.assertEqual((key, rank.title), ("jonokuchi", "Jonokuchi"))
+
+    def test_basho_from_api(self):
+        """API basho data builds an unsaved ``Basho``."""
+        basho = basho_from_api(
+            {
+                "date": "202501",
+                "startDate": "2025-01-10T00:00:00Z",
+                "endDate": "2025-01-24T00:00:00Z",
+            }
+        )
+        self.assertEqual(
+            (basho.slug, basho.year, basho.month), ("202501", 2025, 1)
+        )
+        self.assertEqual(basho.end_date.day, 24)
 
     def test_handle_skip_old_and_new_basho_paths(self):
         """Command should fetch missing basho and bulk save history."""
@@ -565,9 +589,9 @@ class HistoryCommandTests(SimpleTestCase):
                 new=async_mock(),
             ) as bulk_mock,
             patch(
-                "app.management.commands.history.Rank.objects.aget_or_create",
-                new=async_mock(return_value=(Rank(title="Y"), True)),
-            ),
+                f"{CMD_PREFIX}.save_basho_and_ranks",
+                new=async_mock(),
+            ) as save_mock,
         ):
             api = AsyncMock()
             client_cls.return_value.__aenter__.return_value = api
@@ -584,11 +608,161 @@ class HistoryCommandTests(SimpleTestCase):
             ]
             cmd = Command()
             cmd.log = lambda *a, **k: None
-            cmd.create_basho_from_api = AsyncMock(
-                return_value=Basho(year=2025, month=2)
-            )
             cmd.bulk_save = AsyncMock(wraps=cmd.bulk_save)
             self.run_async(cmd.run())
-            cmd.create_basho_from_api.assert_awaited()
+            self.assertEqual(api.get_basho_by_id.await_count, 2)
+            basho, ranks = save_mock.await_args.args
+            self.assertEqual([b.slug for b in basho], ["202502"])
+            self.assertEqual([r.slug for r in ranks], ["y1e"])
             self.assertTrue(bulk_mock.await_count)
             cmd.bulk_save.assert_awaited()
+
+
+class HistoryPipelineTests(SimpleTestCase):
+    """The fetchers and the writer run concurrently through a queue."""
+
+    def setUp(self):
+        self.checkpoint = patch_job(self)
+
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def make_command(self):
+        basho = Basho(year=2025, month=1)
+        basho.slug = "202501"
+        cmd = Command()
+        cmd.log = lambda *a, **k: None
+        cmd.existing_basho = {"202501": basho}
+        cmd.existing_keys = set()
+        cmd.existing_divisions = {}
+        cmd.watermarks = {}
+        cmd.missing_basho = set()
+        cmd.existing_rank = {"y1e": Rank(slug="y1e", title="Y")}
+        cmd.progress = MagicMock()
+        return cmd
+
+    def make_api(self, active):
+        api = AsyncMock()
+
+        async def ranking_history(ids):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return {ids[0]: [{"bashoId": "202501", "rank": "Y1E"}]}
+
+        api.get_ranking_history.side_effect = ranking_history
+        api.get_shikonas.return_value = []
+        api.get_measurements.return_value = []
+        return api
+
+    def test_rows_written_for_every_rikishi(self):
+        cmd = self.make_command()
+        cmd.bulk_save = AsyncMock()
+        active = {"now": 0, "peak": 0}
+        api = self.make_api(active)
+        rikishis = [Rikishi(id=i, name="R", name_jp="R") for i in range(10)]
+
+        async def main():
+            queue = asyncio.Queue(maxsize=2)
+            await asyncio.gather(
+                cmd.produce(api, rikishis, queue, fetchers=4),
+                cmd.consume(api, queue, len(rikishis)),
+            )
+
+        self.run_async(main())
+        self.assertEqual(active["peak"], 4)
+        rows = cmd.bulk_save.call_args.args[0]
+        self.assertEqual(sorted(r.rikishi.id for r in rows), list(range(10)))
+
+    def test_fetch_error_propagates(self):
+        with (
+            patch(
+                f"{CMD_PREFIX}.get_rikishis",
+                new=AsyncMock(
+                    return_value=[Rikishi(id=1, name="R", name_jp="R")]
+                ),
+            ),
+            patch(f"{CMD_PREFIX}.get_existing_basho", new=AsyncMock()),
+            patch(f"{CMD_PREFIX}.get_existing_rank", new=AsyncMock()),
+            patch(f"{CMD_PREFIX}.get_existing_keys", new=AsyncMock()),
+            patch(f"{CMD_PREFIX}.get_existing_divisions", new=AsyncMock()),
+            patch(f"{CMD_PREFIX}.SumoApiClient") as client_cls,
+        ):
+            api = AsyncMock()
+            api.get_ranking_history.side_effect = SumoApiError("down")
+            client_cls.return_value.__aenter__.return_value = api
+            client_cls.return_value.__aexit__.return_value = None
+            cmd = self.make_command()
+            with self.assertRaisesMessage(SumoApiError, "down"):
+                self.run_async(cmd.run(fetchers=2))
+
+    def test_resume_skips_checkpointed_rikishi(self):
+        cmd = self.make_command()
+        job = SimpleNamespace(last_rikishi_id=1)
+        rikishis = [Rikishi(id=i, name="R", name_jp="R") for i in (1, 2, 3)]
+        with (
+            patch(f"{CMD_PREFIX}.start_job", return_value=job) as start,
+            patch(
+                f"{CMD_PREFIX}.get_rikishis",
+                new=AsyncMock(return_value=rikishis),
+            ),
+            patch(
+                f"{CMD_PREFIX}.get_existing_basho",
+                new=AsyncMock(return_value=cmd.existing_basho),
+            ),
+            patch(
+                f"{CMD_PREFIX}.get_existing_rank",
+                new=AsyncMock(return_value=cmd.existing_rank),
+            ),
+            patch(
+                f"{CMD_PREFIX}.get_existing_keys",
+                new=AsyncMock(return_value=set()),
+            ),
+            patch(
+                f"{CMD_PREFIX}.get_existing_divisions",
+                new=AsyncMock(return_value={}),
+            ),
+            patch(f"{CMD_PREFIX}.SumoApiClient") as client_cls,
+        ):
+            api = self.make_api({"now": 0, "peak": 0})
+            client_cls.return_value.__aenter__.return_value = api
+            client_cls.return_value.__aexit__.return_value = None
+            cmd.bulk_save = AsyncMock()
+            self.run_async(cmd.run(fetchers=2, resume=True))
+        start.assert_called_once_with("history", True)
+        fetched = [c.args[0] for c in api.get_ranking_history.call_args_list]
+        self.assertEqual(sorted(fetched), [[2], [3]])
+        self.checkpoint.assert_called_once_with(job, last_rikishi_id=3)
+
+
+class HistoryWatermarkTests(TestCase):
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def test_latest_basho_per_rikishi(self):
+        division, _ = Division.objects.get_or_create(
+            name="Juryo", defaults={"name_short": "J", "level": 2}
+        )
+        rank = Rank.objects.create(slug="j1e", title="Juryo", division=division)
+        rikishi = Rikishi.objects.create(id=1, name="R", name_jp="R")
+        for month in (1, 3):
+            basho = Basho.objects.create(year=2025, month=month)
+            BashoHistory.objects.create(rikishi=rikishi, basho=basho, rank=rank)
+        # call the wrapped query directly to stay in the test transaction
+        self.assertEqual(get_latest_basho.func(), {1: "202503"})
+
+    def test_watermark_skips_older_entries(self):
+        cmd = HistoryPipelineTests.make_command(self)
+        cmd.existing_basho.update(
+            {slug: Basho(slug=slug) for slug in ("202503", "202505")}
+        )
+        cmd.watermarks = {1: "202503"}
+        rikishi = Rikishi(id=1, name="R", name_jp="R")
+        entries = [
+            {"bashoId": slug, "rank": "Y1E"}
+            for slug in ("202501", "202503", "202505")
+        ]
+        empty = LatestRecords({}, SHIKONA_FIELDS)
+        rows = cmd.build_rows(rikishi, entries, empty, empty)
+        self.assertEqual([r.basho.slug for r in rows], ["202505"])
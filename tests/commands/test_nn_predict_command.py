@@ -2,25 +2,56 @@ import csv
 import os
 import tempfile
 from io import StringIO
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from django.core.management import call_command
-from django.test import TestCase
+import numpy as np
 
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.management.commands.nn_predict import (
+    FEATURES,
+    pair_features,
+    pair_probabilities,
+)
 from app.models import (
     Basho,
     BashoHistory,
     BashoRating,
+    Bout,
     Division,
     Prediction,
     Rank,
     Rikishi,
 )
 from libs.constants import Direction, RankName
+from libs.head_to_head import refresh_head_to_head
+from libs.model_registry import ModelRegistry
+
+LOCMEM = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for alias in ("default", "predictions")
+}
+
 
+class DummyClf:
+    def fit(self, X, y):
+        return self
 
+    def predict_proba(self, X):
+        return np.array([[0.4, 0.6] for _ in range(len(X))])
+
+
+@override_settings(CACHES=LOCMEM)
 class NNPredictCommandTests(TestCase):
     def setUp(self):
+        self.model_dir = tempfile.TemporaryDirectory()
+        settings = override_settings(MODEL_DIR=self.model_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.model_dir.cleanup)
         self.division, _ = Division.objects.get_or_create(
             name="Makuuchi", defaults={"name_short": "M", "level": 1}
         )
@@ -91,8 +122,21 @@ class NNPredictCommandTests(TestCase):
         except OSError:
             pass
 
+    def _train(self, *args):
+        out = StringIO()
+        call_command(
+            "nn_predict", "train", self.dataset.name, *args, stdout=out
+        )
+        return out.getvalue()
+
+    def _predict(self, *args):
+        out = StringIO()
+        call_command("nn_predict", "predict", *args, stdout=out)
+        return out.getvalue()
+
     def test_predictions_saved(self):
-        call_command("nn_predict", self.dataset.name, "--iterations", "10")
+        self._train()
+        self._predict("--iterations", "10")
         preds = Prediction.objects.filter(basho=self.b2)
         self.assertEqual(preds.count(), 2)
         for p in preds:
@@ -100,17 +144,6 @@ class NNPredictCommandTests(TestCase):
             self.assertLessEqual(p.wins, 15)
 
     def test_cv_option_uses_grid_search(self):
-        out = StringIO()
-
-        class DummyClf:
-            def fit(self, X, y):
-                return self
-
-            def predict_proba(self, X):
-                import numpy as np
-
-                return np.array([[0.4, 0.6] for _ in range(len(X))])
-
         class DummyGS:
             def __init__(self, estimator, *args, **kwargs):
                 self.best_estimator_ = estimator
@@ -131,16 +164,101 @@ class NNPredictCommandTests(TestCase):
                 DummyGS,
             ),
         ):
-            call_command(
-                "nn_predict",
-                self.dataset.name,
-                "--iterations",
-                "1",
-                "--cv",
-                "2",
-                stdout=out,
-            )
+            out = self._train("--cv", "2")
+            again = self._train("--cv", "2")
 
-        self.assertIn("Best params", out.getvalue())
+        self.assertIn("Best params", out)
+        self.assertIn("already trained", again)
+        entry = ModelRegistry(self.model_dir.name).get()
+        self.assertEqual(entry["params"], {"cv": 2})
+        self.assertEqual(entry["metrics"]["best_params"], {"foo": 1})
+        self.assertEqual(entry["metrics"]["cv_score"], 0.5)
+        self._predict("--iterations", "1")
         preds = Prediction.objects.filter(basho=self.b2)
         self.assertEqual(preds.count(), 2)
+
+    def test_predict_invalidates_cached_table(self):
+        self._train()
+        with patch(
+            "app.management.commands.nn_predict.invalidate_predictions"
+        ) as invalidate:
+            self._predict("--iterations", "5")
+        invalidate.assert_called_once_with(self.b2.slug)
+
+    def test_seed_makes_predictions_reproducible(self):
+        self._train()
+        self._predict("--iterations", "50", "--seed", "7")
+        first = list(Prediction.objects.order_by("rikishi_id").values("wins"))
+        self._predict("--iterations", "50", "--seed", "7")
+        second = list(Prediction.objects.order_by("rikishi_id").values("wins"))
+        self.assertEqual(first, second)
+
+    def test_schedule_simulation_stores_probabilities(self):
+        self._train()
+        self._predict("--iterations", "20")
+        preds = Prediction.objects.filter(basho=self.b2)
+        self.assertAlmostEqual(sum(p.yusho for p in preds), 1.0)
+        for p in preds:
+            self.assertGreaterEqual(p.kachi_koshi, 0)
+
+        self._predict("--iterations", "20", "--round-robin")
+        for p in Prediction.objects.filter(basho=self.b2):
+            self.assertIsNone(p.yusho)
+            self.assertLessEqual(p.wins, 15)
+
+    def test_train_registers_versioned_model(self):
+        out = self._train()
+        self.assertIn("Saved model v1", out)
+        entry = ModelRegistry(self.model_dir.name).get()
+        self.assertEqual(entry["features"], FEATURES)
+        self.assertEqual(entry["metrics"]["samples"], 2)
+        self.assertEqual(len(entry["scaler"]["mean"]), len(FEATURES))
+
+        self.assertIn("already trained", self._train())
+        self.assertIn("Saved model v2", self._train("--force"))
+        out = self._predict("--iterations", "5", "--model", "v1")
+        self.assertIn("(model v1)", out)
+
+    def test_predict_without_model_raises(self):
+        with self.assertRaisesMessage(CommandError, "No trained model"):
+            self._predict("--iterations", "1")
+        self._train()
+        with self.assertRaisesMessage(CommandError, "Model v9 not found"):
+            self._predict("--model", "v9")
+
+    def test_pair_features_use_three_queries(self):
+        for winner in (self.r1, self.r1, self.r2):
+            Bout.objects.create(
+                basho=self.b1,
+                division=self.division,
+                day=Bout.objects.count() + 1,
+                match_no=1,
+                east=self.r1,
+                west=self.r2,
+                east_shikona="A",
+                west_shikona="B",
+                kimarite="yorikiri",
+                winner=winner,
+            )
+        refresh_head_to_head()
+        self.r1.height, self.r1.weight = 180.0, 150.0
+        self.r2.height, self.r2.weight = 190.0, 160.0
+        with CaptureQueriesContext(connection) as ctx:
+            features, valid = pair_features([self.r1, self.r2], self.b2)
+        self.assertEqual(len(ctx), 3)
+        self.assertTrue(valid[0, 1])
+        row = dict(zip(FEATURES, features[0, 1], strict=True))
+        self.assertEqual(row["rating_diff"], 10.0)
+        self.assertEqual(row["height_diff"], -10.0)
+        self.assertEqual(row["record_diff"], 1)
+        self.assertEqual(features[1, 0][FEATURES.index("record_diff")], -1)
+
+    def test_pair_probabilities_single_predict_call(self):
+        model = MagicMock()
+        model.predict_proba.return_value = np.array([[0.3, 0.7]])
+        scaler = MagicMock()
+        scaler.transform.side_effect = lambda X: X
+        prob = pair_probabilities([self.r1, self.r2], self.b2, scaler, model)
+        model.predict_proba.assert_called_once()
+        self.assertAlmostEqual(prob[0, 1], 0.7)
+        self.assertAlmostEqual(prob[1, 0], 0.3)
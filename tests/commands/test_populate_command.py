@@ -1,6 +1,6 @@
 import asyncio
 from types import SimpleNamespace
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from django.core.management import call_command
 from django.test import SimpleTestCase
@@ -10,10 +10,27 @@ from app.models.rank import Rank
 from app.models.rikishi import Heya, Shusshin
 from libs.sumoapi import SumoApiError
 
+CMD_PREFIX = "app.management.commands.populate"
+
+
+async def pages(data):
+    for page in data:
+        yield page
+
 
 class PopulateCommandTests(SimpleTestCase):
     """End-to-end tests for the ``populate`` management command."""
 
+    def setUp(self):
+        self.job = SimpleNamespace(offset=0)
+        self.checkpoint = self.enterContext(
+            patch(f"{CMD_PREFIX}.save_checkpoint")
+        )
+        self.enterContext(
+            patch(f"{CMD_PREFIX}.start_job", return_value=self.job)
+        )
+        self.enterContext(patch(f"{CMD_PREFIX}.finish_job"))
+
     def test_run_manage_py_populate(self):
         """Running ``manage.py populate`` should process API data."""
         rikishi_data = [
@@ -85,7 +102,9 @@ class PopulateCommandTests(SimpleTestCase):
             mock_api = AsyncMock()
             client_cls.return_value.__aenter__.return_value = mock_api
             client_cls.return_value.__aexit__.return_value = None
-            mock_api.get_all_rikishi.return_value = rikishi_data
+            mock_api.iter_rikishi_pages = MagicMock(
+                return_value=pages([rikishi_data])
+            )
 
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
@@ -95,7 +114,7 @@ class PopulateCommandTests(SimpleTestCase):
                 asyncio.set_event_loop(asyncio.new_event_loop())
                 loop.close()
 
-            mock_api.get_all_rikishi.assert_awaited_once()
+            mock_api.iter_rikishi_pages.assert_called_once_with()
             ro.abulk_create.assert_awaited_once()
             ro.abulk_update.assert_not_called()
 
@@ -156,7 +175,9 @@ class PopulateCommandTests(SimpleTestCase):
             mock_api = AsyncMock()
             client_cls.return_value.__aenter__.return_value = mock_api
             client_cls.return_value.__aexit__.return_value = None
-            mock_api.get_all_rikishi.return_value = rikishi_data
+            mock_api.iter_rikishi_pages = MagicMock(
+                return_value=pages([rikishi_data])
+            )
 
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
@@ -241,7 +262,9 @@ class PopulateCommandTests(SimpleTestCase):
             mock_api = AsyncMock()
             client_cls.return_value.__aenter__.return_value = mock_api
             client_cls.return_value.__aexit__.return_value = None
-            mock_api.get_all_rikishi.return_value = rikishi_data
+            mock_api.iter_rikishi_pages = MagicMock(
+                return_value=pages([rikishi_data])
+            )
 
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
@@ -257,6 +280,47 @@ class PopulateCommandTests(SimpleTestCase):
                 name="Mongolia", international=True
             )
 
+    def test_resume_skips_saved_pages(self):
+        """``--resume`` skips pages before the saved offset."""
+        self.job.offset = 1
+        api_pages = [
+            [{"id": 1, "shikonaEn": "First"}],
+            [{"id": 2, "shikonaEn": "Second"}],
+        ]
+
+        def passthrough(func):
+            async def inner(*args, **kwargs):
+                return func()
+
+            return inner
+
+        with (
+            patch(f"{CMD_PREFIX}.SumoApiClient") as client_cls,
+            patch(f"{CMD_PREFIX}.sync_to_async", side_effect=passthrough),
+            patch(f"{CMD_PREFIX}.Division.objects") as do,
+            patch(f"{CMD_PREFIX}.Rikishi.objects") as ro,
+            patch(f"{CMD_PREFIX}.Rank.objects") as rao,
+            patch(f"{CMD_PREFIX}.Heya.objects") as ho,
+            patch(f"{CMD_PREFIX}.Shusshin.objects") as so,
+        ):
+            do.aget_or_create = AsyncMock()
+            for objects in (do, ro, rao, ho, so):
+                objects.all.return_value = []
+            ro.abulk_create = AsyncMock()
+            mock_api = AsyncMock()
+            client_cls.return_value.__aenter__.return_value = mock_api
+            client_cls.return_value.__aexit__.return_value = None
+            mock_api.iter_rikishi_pages = MagicMock(
+                return_value=pages(api_pages)
+            )
+            cmd = Command()
+            cmd.log = lambda msg: None
+            asyncio.get_event_loop().run_until_complete(cmd.run(resume=True))
+
+        created = ro.abulk_create.call_args.args[0]
+        self.assertEqual([r.id for r in created], [2])
+        self.checkpoint.assert_called_once_with(self.job, offset=2)
+
     def test_warn_helper(self):
         """The warn helper should format and write messages."""
         cmd = Command()
@@ -16,6 +16,7 @@ from app.models import (
     Rikishi,
 )
 from libs.constants import Direction, RankName
+from libs.dataset import read_dataset
 
 
 class SelectFeaturesCommandTests(TransactionTestCase):
@@ -108,3 +109,28 @@ class SelectFeaturesCommandTests(TransactionTestCase):
             headers = next(reader)
         self.assertLessEqual(len(headers), 6)
         self.assertIn("Selected features with scores", out.getvalue())
+
+    def test_parquet_dataset(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            dataset_path = f"{tmpdir}/data.parquet"
+            out_path = f"{tmpdir}/reduced.parquet"
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                call_command("dataset", dataset_path)
+                call_command(
+                    "select_features",
+                    dataset_path,
+                    out_path,
+                    "--k",
+                    "5",
+                    stdout=out,
+                )
+            finally:
+                asyncio.set_event_loop(asyncio.new_event_loop())
+                loop.close()
+            reduced = read_dataset(out_path)
+        self.assertLessEqual(len(reduced.columns), 6)
+        self.assertIn("east_win", reduced.columns)
+        self.assertEqual(len(reduced), 2)
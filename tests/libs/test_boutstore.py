@@ -0,0 +1,86 @@
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from app.models import Basho, Bout, Division, Rikishi
+from libs.boutstore import BoutStore
+
+
+class BoutStoreTests(TestCase):
+    """Tests for the columnar :class:`BoutStore`."""
+
+    def setUp(self):
+        self.makuuchi = Division.objects.get(name="Makuuchi")
+        self.juryo = Division.objects.get(name="Juryo")
+        self.b1 = Basho.objects.create(year=2025, month=1)
+        self.b2 = Basho.objects.create(year=2025, month=3)
+        self.r = [
+            Rikishi.objects.create(id=i, name=str(i), name_jp=str(i))
+            for i in range(1, 4)
+        ]
+        self.add_bout(self.b2, 1, 1, 0, 1, 0)
+        self.add_bout(self.b1, 2, 1, 1, 2, 2)
+        self.add_bout(self.b1, 1, 2, 0, 2, 0, self.juryo)
+        self.add_bout(self.b1, 1, 1, 0, 1, 1)
+
+    def add_bout(self, basho, day, match_no, east, west, winner, div=None):
+        Bout.objects.create(
+            basho=basho,
+            division=div or self.makuuchi,
+            day=day,
+            match_no=match_no,
+            east=self.r[east],
+            west=self.r[west],
+            east_shikona="E",
+            west_shikona="W",
+            kimarite="yorikiri",
+            winner=self.r[winner],
+        )
+
+    def test_columns_in_chronological_order(self):
+        store = BoutStore.load()
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.basho_slugs.tolist(), ["202501", "202503"])
+        self.assertEqual(store.basho.tolist(), [0, 0, 0, 1])
+        self.assertEqual(store.day.tolist(), [1, 1, 2, 1])
+        self.assertEqual(store.match_no.tolist(), [1, 2, 1, 1])
+        self.assertEqual(store.division.tolist(), [1, 2, 1, 1])
+        self.assertEqual(store.east.tolist(), [1, 1, 2, 1])
+        self.assertEqual(store.west.tolist(), [2, 3, 3, 2])
+        self.assertEqual(store.east_win.tolist(), [0, 1, 0, 1])
+
+    def test_filters(self):
+        store = BoutStore.load()
+        self.assertEqual(len(store.for_basho("202501")), 3)
+        self.assertEqual(len(store.for_basho("202411")), 0)
+        self.assertEqual(len(store.since("202503")), 1)
+        self.assertEqual(len(store.for_rikishi(3)), 2)
+        self.assertEqual(store.for_pair(2, 1).day.tolist(), [1, 1])
+        self.assertEqual(
+            [(slug, len(s)) for slug, s in store.periods()],
+            [("202501", 3), ("202503", 1)],
+        )
+
+    def test_cache_reused_until_bouts_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with override_settings(BOUT_CACHE_DIR=tmp):
+                first = BoutStore.load()
+                files = list(Path(tmp).glob("*.npz"))
+                self.assertEqual(len(files), 1)
+
+                with self.assertNumQueries(1):
+                    cached = BoutStore.load()
+                self.assertEqual(cached.key, first.key)
+                self.assertEqual(cached.east.tolist(), first.east.tolist())
+
+                self.add_bout(self.b2, 2, 1, 2, 1, 2)
+                fresh = BoutStore.load()
+            self.assertEqual(len(fresh), 5)
+            self.assertEqual(len(list(Path(tmp).glob("*.npz"))), 1)
+
+    def test_empty_table(self):
+        Bout.objects.all().delete()
+        store = BoutStore.load()
+        self.assertEqual(len(store), 0)
+        self.assertEqual(list(store.periods()), [])
@@ -0,0 +1,151 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from libs.dataset import (
+    avg_rating_change,
+    form_features,
+    form_state,
+    head_to_head,
+    head_to_head_totals,
+    rating_change_state,
+    shard_bounds,
+)
+
+
+def sequential_form(east, west, east_win, window):
+    """Reference implementation mirroring the old per-bout loop."""
+    recent = {}
+    streaks = {}
+    rows = []
+    for e, w, win in zip(east, west, east_win, strict=True):
+        row = []
+        for rid in (e, w):
+            results = recent.setdefault(rid, deque(maxlen=window))
+            row.append(sum(results) / len(results) if results else 0.0)
+        row += [streaks.get(e, 0), streaks.get(w, 0)]
+        rows.append(row)
+        recent[e].append(win)
+        recent[w].append(1 - win)
+        streaks[e] = streaks.get(e, 0) + 1 if win else 0
+        streaks[w] = 0 if win else streaks.get(w, 0) + 1
+    return np.array(rows)
+
+
+class FormFeaturesTests(SimpleTestCase):
+    def test_matches_sequential_loop(self):
+        rng = np.random.default_rng(0)
+        east = rng.integers(0, 8, 400)
+        west = (east + rng.integers(1, 8, 400)) % 8
+        east_win = rng.integers(0, 2, 400)
+        expected = sequential_form(east, west, east_win, window=5)
+        result = np.column_stack(form_features(east, west, east_win, window=5))
+        np.testing.assert_allclose(result, expected)
+
+
+class HeadToHeadTests(SimpleTestCase):
+    def test_counts_only_previous_basho(self):
+        basho = np.array([0, 0, 1, 1, 2])
+        east = np.array([1, 2, 1, 2, 2])
+        west = np.array([2, 1, 2, 1, 1])
+        east_win = np.array([1, 1, 0, 1, 1])
+        east_prior, west_prior = head_to_head(basho, east, west, east_win)
+        self.assertEqual(east_prior.tolist(), [0, 0, 1, 1, 3])
+        self.assertEqual(west_prior.tolist(), [0, 0, 1, 1, 1])
+
+
+class AvgRatingChangeTests(SimpleTestCase):
+    def test_rolling_mean_of_previous_changes(self):
+        ratings = pd.DataFrame(
+            {
+                "rikishi": [1, 1, 1, 1, 1, 2],
+                "basho": ["202501", "202503", "202505", "202507", "202509"]
+                + ["202501"],
+                "previous_rating": [1500.0, 1510.0, 1530.0, 1560.0, 1600.0]
+                + [1500.0],
+                "rating": [1510.0, 1530.0, 1560.0, 1600.0, 1590.0, 1490.0],
+            }
+        )
+        result = avg_rating_change(ratings)
+        self.assertEqual(result.loc[1].tolist(), [0.0, 10.0, 15.0, 20.0, 30.0])
+        self.assertEqual(result.loc[(2, "202501")], 0.0)
+
+
+class PriorStateTests(SimpleTestCase):
+    """Features computed in two parts must match a single pass."""
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.basho = np.repeat(np.arange(6), 60)
+        self.east = rng.integers(0, 10, len(self.basho))
+        self.west = (self.east + rng.integers(1, 10, len(self.basho))) % 10
+        # long winning streaks for rikishi 0 exceed the stored window
+        self.east_win = np.where(self.east == 0, 1, rng.integers(0, 2, 360))
+        self.east_win = np.where(self.west == 0, 0, self.east_win)
+        self.split = 180
+
+    def test_form_features(self):
+        full = form_features(self.east, self.west, self.east_win, window=5)
+        head = slice(None, self.split)
+        tail = slice(self.split, None)
+        prior = form_state(
+            self.east[head], self.west[head], self.east_win[head], window=5
+        )
+        part = form_features(
+            self.east[tail],
+            self.west[tail],
+            self.east_win[tail],
+            window=5,
+            prior=prior,
+        )
+        for whole, piece in zip(full, part, strict=True):
+            np.testing.assert_allclose(whole[tail], piece)
+
+    def test_head_to_head(self):
+        full = head_to_head(self.basho, self.east, self.west, self.east_win)
+        head = slice(None, self.split)
+        tail = slice(self.split, None)
+        prior = head_to_head_totals(
+            self.east[head], self.west[head], self.east_win[head]
+        )
+        part = head_to_head(
+            self.basho[tail],
+            self.east[tail],
+            self.west[tail],
+            self.east_win[tail],
+            prior=prior,
+        )
+        for whole, piece in zip(full, part, strict=True):
+            np.testing.assert_array_equal(whole[tail], piece)
+
+    def test_avg_rating_change(self):
+        rng = np.random.default_rng(2)
+        ratings = pd.DataFrame(
+            {
+                "rikishi": np.tile(np.arange(5), 8),
+                "basho": np.repeat([f"2020{m:02d}" for m in range(1, 9)], 5),
+                "previous_rating": rng.normal(1500, 50, 40),
+                "rating": rng.normal(1500, 50, 40),
+            }
+        ).sample(frac=0.8, random_state=3)
+        full = avg_rating_change(ratings)
+        early = ratings[ratings["basho"] <= "202504"]
+        late = ratings[ratings["basho"] > "202504"]
+        part = avg_rating_change(late, prior=rating_change_state(early))
+        pd.testing.assert_series_equal(
+            full.reindex(part.index), part, check_names=False
+        )
+
+
+class ShardBoundsTests(SimpleTestCase):
+    def test_cuts_at_basho_boundaries(self):
+        slugs = np.array(["a"] * 5 + ["b"] * 3 + ["c"] * 4 + ["d"] * 4)
+        shards = shard_bounds(slugs, 3)
+        self.assertEqual(shards, [slice(0, 8), slice(8, 12), slice(12, 16)])
+
+    def test_fewer_basho_than_shards(self):
+        slugs = np.array(["a"] * 4 + ["b"] * 2)
+        self.assertEqual(shard_bounds(slugs, 8), [slice(0, 4), slice(4, 6)])
+        self.assertEqual(shard_bounds(np.array([]), 4), [])
@@ -0,0 +1,47 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Basho, Prediction, Rikishi
+from libs.db import bulk_upsert
+
+
+class BulkUpsertTests(TestCase):
+    def setUp(self):
+        self.basho = Basho.objects.create(year=2025, month=5)
+        self.rikishi = [
+            Rikishi.objects.create(id=i, name=str(i), name_jp=str(i))
+            for i in (1, 2)
+        ]
+
+    def upsert(self, wins):
+        return bulk_upsert(
+            Prediction,
+            [
+                Prediction(rikishi=r, basho=self.basho, wins=w)
+                for r, w in zip(self.rikishi, wins, strict=True)
+            ],
+            unique_fields=["rikishi", "basho"],
+            update_fields=["wins"],
+        )
+
+    def test_inserts_then_updates(self):
+        self.upsert([5.0, 6.0])
+        Prediction.objects.filter(rikishi_id=2).delete()
+        with CaptureQueriesContext(connection) as ctx:
+            self.upsert([7.0, 8.0])
+        inserts = [q for q in ctx if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            list(
+                Prediction.objects.order_by("rikishi_id").values_list(
+                    "wins", flat=True
+                )
+            ),
+            [7.0, 8.0],
+        )
+
+    def test_empty_is_noop(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(bulk_upsert(Prediction, [], ["pk"], ["wins"]), [])
+        self.assertEqual(len(ctx), 0)
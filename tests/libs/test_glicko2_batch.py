@@ -0,0 +1,122 @@
+import math
+import random
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from libs.glicko2 import Player
+from libs.glicko2_batch import (
+    PlayerTable,
+    log_loss,
+    rate_period,
+    sweep,
+    to_display,
+    to_internal,
+)
+
+
+class RatePeriodTests(SimpleTestCase):
+    """Compare the vectorised engine with :class:`Player`."""
+
+    def test_matches_official_example(self):
+        """A single player update should reproduce the Glicko-2 paper."""
+        mu, phi = to_internal([1500, 1400, 1550, 1700], [200, 30, 100, 300])
+        sigma = np.full(4, 0.06)
+        mu, phi, sigma = rate_period(
+            mu,
+            phi,
+            sigma,
+            players=[0, 0, 0],
+            opponents=[1, 2, 3],
+            outcomes=[1, 0, 0],
+            active=np.array([True, False, False, False]),
+            tau=0.5,
+        )
+        rating, rd = to_display(mu, phi)
+        self.assertAlmostEqual(rating[0], 1464.05, places=2)
+        self.assertAlmostEqual(rd[0], 151.52, places=2)
+        self.assertAlmostEqual(sigma[0], 0.05999, places=5)
+        self.assertEqual(rating[1], 1400)
+
+    def test_matches_player_over_many_periods(self):
+        """Random tournaments should give the same results as ``Player``."""
+        rng = random.Random(1)
+        ids = list(range(40))
+        table = PlayerTable()
+        reference = {i: Player() for i in ids}
+        for _ in range(12):
+            active = rng.sample(ids, 30)
+            bouts = []
+            for _ in range(80):
+                east, west = rng.sample(active[:25], 2)
+                bouts.append((east, west, rng.randint(0, 1)))
+
+            results = {}
+            for east, west, east_win in bouts:
+                e, w = reference[east], reference[west]
+                results.setdefault(east, []).append((w.rating, w.rd, east_win))
+                results.setdefault(west, []).append(
+                    (e.rating, e.rd, 1 - east_win)
+                )
+            for rid in active:
+                recs = results.get(rid)
+                if recs:
+                    reference[rid].update_player(*zip(*recs, strict=True))
+                else:
+                    reference[rid].did_not_compete()
+
+            table.rate(*zip(*bouts, strict=True), active_ids=active)
+
+        rating, rd, vol = table.ratings(ids)
+        for i, rid in enumerate(ids):
+            self.assertAlmostEqual(rating[i], reference[rid].rating, places=6)
+            self.assertAlmostEqual(rd[i], reference[rid].rd, places=6)
+            self.assertAlmostEqual(vol[i], reference[rid].vol, places=9)
+
+    def test_inactive_players_unchanged(self):
+        """Players outside the active set should keep their state."""
+        table = PlayerTable()
+        table.rate([1], [2], [1], active_ids=[1, 3])
+        rating, rd, vol = table.ratings([1, 2, 3])
+        self.assertGreater(rating[0], 1500)
+        self.assertEqual(rating[1], 1500)
+        self.assertEqual(rd[1], 350)
+        self.assertGreater(rd[2], 350)
+        self.assertEqual(len(table), 3)
+        self.assertIn(3, table)
+
+    def test_bytes_roundtrip(self):
+        """Packed snapshots should restore the exact state."""
+        table = PlayerTable()
+        table.rate([1, 2], [3, 1], [1, 0])
+        restored = PlayerTable.from_bytes(table.to_bytes(), tau=0.5)
+        self.assertEqual(restored.ids, table.ids)
+        self.assertEqual(restored.tau, 0.5)
+        np.testing.assert_array_equal(restored.mu, table.mu)
+        np.testing.assert_array_equal(restored.phi, table.phi)
+        np.testing.assert_array_equal(restored.sigma, table.sigma)
+        self.assertEqual(restored.lookup([3]).tolist(), [2])
+
+
+class LogLossTests(SimpleTestCase):
+    """Tests for the parameter sweep helpers."""
+
+    def setUp(self):
+        self.periods = [([1, 1], [2, 2], [1, 1], [1, 2])] * 4
+
+    def test_log_loss_improves_with_history(self):
+        """A consistent winner should be predicted better than a coin flip."""
+        loss, count = log_loss(self.periods, burn_in=1)
+        self.assertEqual(count, 6)
+        self.assertLess(loss, math.log(2))
+
+    def test_log_loss_without_scored_bouts(self):
+        loss, count = log_loss(self.periods, burn_in=4)
+        self.assertEqual(count, 0)
+        self.assertTrue(math.isnan(loss))
+
+    def test_sweep_sorted_by_loss(self):
+        results = sweep(self.periods, [0.3, 0.9], [350], [0.06], workers=1)
+        self.assertEqual(len(results), 2)
+        self.assertLessEqual(results[0][1], results[1][1])
+        self.assertEqual(set(results[0][0]), {"tau", "rd", "vol"})
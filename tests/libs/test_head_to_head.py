@@ -0,0 +1,94 @@
+from io import StringIO
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from app.models import Basho, Bout, Division, HeadToHead, Rikishi
+from libs.head_to_head import (
+    record_before,
+    records_before,
+    refresh_head_to_head,
+)
+
+
+class HeadToHeadTests(TestCase):
+    def setUp(self):
+        self.division, _ = Division.objects.get_or_create(
+            name="Makuuchi", defaults={"name_short": "M", "level": 1}
+        )
+        self.rikishi = [
+            Rikishi.objects.create(id=i, name=str(i), name_jp=str(i))
+            for i in range(1, 5)
+        ]
+        self.basho = [
+            Basho.objects.create(year=2025, month=m) for m in (1, 3, 5, 7)
+        ]
+        rng = np.random.default_rng(0)
+        self.bouts = []
+        for basho in self.basho:
+            for day in range(1, 8):
+                east, west = rng.choice(4, 2, replace=False) + 1
+                winner = east if rng.random() < 0.5 else west
+                self.bouts.append((basho.slug, east, west, winner))
+                Bout.objects.create(
+                    basho=basho,
+                    division=self.division,
+                    day=day,
+                    match_no=1,
+                    east_id=east,
+                    west_id=west,
+                    east_shikona="E",
+                    west_shikona="W",
+                    kimarite="yorikiri",
+                    winner_id=winner,
+                )
+
+    def count_wins(self, first, second, before):
+        return sum(
+            1
+            for slug, east, west, winner in self.bouts
+            if slug < before
+            and {east, west} == {first, second}
+            and winner == first
+        )
+
+    def assert_matches_bouts(self):
+        for basho in self.basho:
+            totals = records_before(range(1, 5), basho.slug)
+            for first in range(1, 5):
+                for second in range(first + 1, 5):
+                    expected = (
+                        self.count_wins(first, second, basho.slug),
+                        self.count_wins(second, first, basho.slug),
+                    )
+                    self.assertEqual(
+                        record_before(first, second, basho.slug), expected
+                    )
+                    self.assertEqual(
+                        record_before(second, first, basho.slug),
+                        expected[::-1],
+                    )
+                    self.assertEqual(
+                        totals.get((first, second), (0, 0)), expected
+                    )
+
+    def test_full_rebuild(self):
+        refresh_head_to_head()
+        self.assert_matches_bouts()
+
+    def test_incremental_refresh_matches_rebuild(self):
+        refresh_head_to_head()
+        full = list(HeadToHead.objects.values_list())
+        HeadToHead.objects.filter(basho_id__gte="202505").delete()
+        refresh_head_to_head("202505")
+        self.assertCountEqual(HeadToHead.objects.values_list(), full)
+        self.assert_matches_bouts()
+
+    def test_command(self):
+        out = StringIO()
+        call_command("head_to_head", stdout=out)
+        self.assertIn("head-to-head records", out.getvalue())
+        self.assert_matches_bouts()
+        with self.assertRaises(CommandError):
+            call_command("head_to_head", "--since", "199901")
@@ -0,0 +1,115 @@
+import asyncio
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+import httpx
+from django.test import SimpleTestCase
+
+from libs.httpcache import (
+    DAY,
+    LIVE_TTL,
+    ResponseCache,
+    cache_key,
+    cache_ttl,
+)
+from libs.sumoapi import SumoApiClient
+
+
+class CachePolicyTests(SimpleTestCase):
+    today = date(2025, 3, 10)
+
+    def ttl(self, key, data=None):
+        return cache_ttl(key, data or {}, today=self.today)
+
+    def test_cache_key_sorts_parameters(self):
+        self.assertEqual(
+            cache_key("/ranks?rikishiId=1", {"b": 2, "a": 1}),
+            "/ranks?a=1&b=2&rikishiId=1",
+        )
+        self.assertEqual(cache_key("/kimarite"), "/kimarite")
+
+    def test_finished_basho_never_expire(self):
+        self.assertIsNone(self.ttl("/basho/202501/banzuke/Makuuchi"))
+        self.assertIsNone(self.ttl("/rikishi/1/matches?bashoId=202411"))
+
+    def test_running_basho_always_revalidated(self):
+        self.assertEqual(self.ttl("/basho/202503"), LIVE_TTL)
+        self.assertEqual(self.ttl("/basho/202503/torikumi/Makuuchi/5"), 0)
+        self.assertEqual(self.ttl("/rikishi/1/matches?bashoId=202503"), 0)
+        self.assertEqual(self.ttl("/rikishi/1/matches"), LIVE_TTL)
+        self.assertEqual(self.ttl("/ranks?rikishiId=1"), DAY)
+
+    def test_retired_rikishi_never_expire(self):
+        self.assertIsNone(self.ttl("/rikishi/1", {"intai": "2020-01-01"}))
+        self.assertEqual(self.ttl("/rikishi/1", {"intai": None}), DAY)
+        self.assertEqual(self.ttl("/rikishis?intai=true", []), DAY)
+
+
+class CountingClient:
+    """Serve a JSON body with an ETag and answer conditional requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def get(self, endpoint, headers=None, **kwargs):
+        self.requests.append((endpoint, headers or {}))
+        request = httpx.Request("GET", endpoint)
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            return httpx.Response(304, request=request)
+        return httpx.Response(
+            200, json={"ranks": [1]}, headers={"ETag": '"v1"'}, request=request
+        )
+
+    async def aclose(self):
+        pass
+
+
+class ClientCacheTests(SimpleTestCase):
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.now = [1000.0]
+        self.cache = ResponseCache(self.tmp.name, clock=lambda: self.now[0])
+        self.client = CountingClient()
+        with patch("libs.sumoapi.httpx.AsyncClient", return_value=self.client):
+            self.api = SumoApiClient(cache=self.cache)
+
+    def test_fresh_entries_served_from_disk(self):
+        for _ in range(3):
+            data = self.run_async(self.api.get_ranks(rikishiId=1))
+        self.assertEqual(data, {"ranks": [1]})
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_stale_entries_revalidated(self):
+        self.run_async(self.api.get_ranks(rikishiId=1))
+        self.now[0] += DAY + 1
+        data = self.run_async(self.api.get_ranks(rikishiId=1))
+        self.assertEqual(data, {"ranks": [1]})
+        self.assertEqual(self.client.requests[1][1]["If-None-Match"], '"v1"')
+        # the 304 renewed the entry
+        self.run_async(self.api.get_ranks(rikishiId=1))
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_running_basho_revalidated(self):
+        with patch("libs.httpcache.current_basho", return_value="202503"):
+            for _ in range(2):
+                self.run_async(self.api.get_basho_banzuke("202503", "Makuuchi"))
+        self.assertEqual(len(self.client.requests), 2)
+        self.assertEqual(self.client.requests[1][1]["If-None-Match"], '"v1"')
+
+    def test_historical_basho_never_refetched(self):
+        self.run_async(self.api.get_basho_banzuke("199001", "Makuuchi"))
+        self.now[0] += 365 * DAY
+        self.run_async(self.api.get_basho_banzuke("199001", "Makuuchi"))
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_cache_dir_from_environment(self):
+        with (
+            patch.dict("os.environ", {"SUMO_API_CACHE_DIR": self.tmp.name}),
+            patch("libs.sumoapi.httpx.AsyncClient"),
+        ):
+            self.assertEqual(str(SumoApiClient().cache.root), self.tmp.name)
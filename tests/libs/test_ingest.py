@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from app.models import IngestJob
+from libs.ingest import (
+    Progress,
+    finish_job,
+    job_name,
+    save_checkpoint,
+    start_job,
+)
+
+
+class IngestJobTests(TestCase):
+    def test_job_name_includes_options(self):
+        self.assertEqual(job_name("bouts"), "bouts")
+        self.assertEqual(
+            job_name("bouts", rikishi=None, basho="202501", all=True),
+            "bouts all=True basho=202501",
+        )
+
+    def test_resume_keeps_cursors_of_unfinished_job(self):
+        job = start_job("history")
+        save_checkpoint(job, last_rikishi_id=5, oldest_basho="202401")
+        job = start_job("history", resume=True)
+        self.assertEqual((job.last_rikishi_id, job.oldest_basho), (5, "202401"))
+        # a fresh run starts over
+        job = start_job("history")
+        self.assertIsNone(IngestJob.objects.get().last_rikishi_id)
+        self.assertEqual(job.oldest_basho, "")
+
+    def test_finished_job_starts_over(self):
+        job = start_job("populate")
+        save_checkpoint(job, offset=1000)
+        finish_job(job)
+        job = start_job("populate", resume=True)
+        self.assertEqual(job.offset, 0)
+        self.assertFalse(IngestJob.objects.get(name="populate").finished)
+
+    def test_progress_waits_for_earlier_keys(self):
+        job = start_job("history")
+        progress = Progress(job, [1, 2, 3, 4])
+        progress.complete([2, 3])
+        job.refresh_from_db()
+        self.assertIsNone(job.last_rikishi_id)
+        progress.complete([1])
+        job.refresh_from_db()
+        self.assertEqual(job.last_rikishi_id, 3)
+        progress.complete([4])
+        self.assertEqual(progress.cursor, 4)
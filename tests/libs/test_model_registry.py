@@ -0,0 +1,53 @@
+import json
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+from sklearn.preprocessing import StandardScaler
+
+from libs.model_registry import ModelRegistry, file_hash
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.registry = ModelRegistry(self.tmp.name)
+        self.scaler = StandardScaler().fit(np.array([[1.0, 2.0], [3.0, 6.0]]))
+
+    def test_versions_are_indexed_and_loadable(self):
+        self.assertIsNone(self.registry.get())
+        first = self.registry.save(
+            {"w": 1}, self.scaler, ["a", "b"], "abc", {"cv": 0}, {}
+        )
+        second = self.registry.save(
+            {"w": 2}, self.scaler, ["a", "b"], "def", {"cv": 0}, {}
+        )
+        self.assertEqual((first["version"], second["version"]), ("v1", "v2"))
+        self.assertEqual(first["scaler"]["mean"], [2.0, 4.0])
+
+        entry, model, scaler = self.registry.load()
+        self.assertEqual((entry["version"], model), ("v2", {"w": 2}))
+        np.testing.assert_allclose(scaler.mean_, self.scaler.mean_)
+        self.assertEqual(self.registry.load("v1")[1], {"w": 1})
+        with self.assertRaises(LookupError):
+            self.registry.load("v3")
+
+        with open(self.registry.index_path) as fh:
+            self.assertEqual(len(json.load(fh)), 2)
+
+    def test_find_matches_dataset_and_params(self):
+        self.registry.save({}, self.scaler, ["a"], "abc", {"cv": 0}, {})
+        self.assertEqual(self.registry.find("abc", {"cv": 0})["version"], "v1")
+        self.assertIsNone(self.registry.find("abc", {"cv": 3}))
+        self.assertIsNone(self.registry.find("xyz", {"cv": 0}))
+
+    def test_file_hash(self):
+        with tempfile.NamedTemporaryFile("wb") as fh:
+            fh.write(b"sumo")
+            fh.flush()
+            self.assertEqual(
+                file_hash(fh.name, chunk_size=3),
+                "ef4095ba96e4950581a6cc5f9de4092a"
+                "20901a2cfaf9d2a3b02891afceae6e34",
+            )
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import httpx
+from django.test import SimpleTestCase
+
+from libs.ratelimit import AdaptiveLimiter, retry_after
+from libs.sumoapi import MAX_ATTEMPTS, SumoApiClient, SumoApiError
+
+
+class RetryAfterTests(SimpleTestCase):
+    def test_parses_seconds_and_dates(self):
+        self.assertEqual(retry_after("3"), 3.0)
+        self.assertIsNone(retry_after(None))
+        self.assertIsNone(retry_after("soon"))
+        now = datetime(2015, 10, 21, 7, 28, 0, tzinfo=UTC)
+        date = "Wed, 21 Oct 2015 07:28:10 GMT"
+        self.assertEqual(retry_after(date, now=now), 10.0)
+        self.assertEqual(retry_after(date), 0.0)
+
+
+class AdaptiveLimiterTests(SimpleTestCase):
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def test_additive_increase_multiplicative_decrease(self):
+        now = [0.0]
+        limiter = AdaptiveLimiter(window=4, max_window=6, clock=lambda: now[0])
+        for _ in range(4):
+            limiter.success()
+        self.assertEqual(limiter.limit, 5)
+        limiter.throttle()
+        self.assertEqual(limiter.limit, 2)
+        # responses already in flight do not shrink the window again
+        limiter.throttle()
+        self.assertEqual(limiter.limit, 2)
+        now[0] = 2.0
+        limiter.throttle(delay=5)
+        self.assertEqual(limiter.limit, 1)
+        self.assertEqual(limiter.paused_until, 7.0)
+        for _ in range(100):
+            limiter.success()
+        self.assertEqual(limiter.limit, 6)
+
+    def test_window_bounds_requests_in_flight(self):
+        limiter = AdaptiveLimiter(rate=1000, window=3)
+        active = peak = 0
+
+        async def request():
+            nonlocal active, peak
+            async with limiter.slot():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        async def main():
+            await asyncio.gather(*(request() for _ in range(10)))
+
+        self.run_async(main())
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_token_bucket_caps_rate(self):
+        limiter = AdaptiveLimiter(rate=100, burst=1, window=10)
+
+        async def main():
+            for _ in range(6):
+                async with limiter.slot():
+                    pass
+
+        started = time.monotonic()
+        self.run_async(main())
+        self.assertGreaterEqual(time.monotonic() - started, 0.045)
+
+
+class ClientThrottleTests(SimpleTestCase):
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def make_client(self, responses):
+        class Client:
+            calls = 0
+
+            async def get(self, *args, **kwargs):
+                Client.calls += 1
+                return responses.pop(0)
+
+            async def aclose(self):
+                pass
+
+        return Client()
+
+    def test_throttled_response_backs_off_and_retries(self):
+        request = httpx.Request("GET", "https://sumo-api.com/api/kimarite")
+        responses = [
+            httpx.Response(200, json={}, request=request),
+            httpx.Response(
+                429, headers={"Retry-After": "0.01"}, request=request
+            ),
+            httpx.Response(200, json={"ok": True}, request=request),
+        ]
+        limiter = AdaptiveLimiter(window=8)
+        client = self.make_client(responses)
+        with patch("libs.sumoapi.httpx.AsyncClient", return_value=client):
+            api = SumoApiClient(limiter=limiter)
+            self.run_async(api.get_kimarite_list())
+            self.assertGreater(limiter.window, 8)
+            self.assertEqual(
+                self.run_async(api.get_kimarite_list()), {"ok": True}
+            )
+        self.assertEqual(limiter.limit, 4)
+        self.assertGreater(limiter.paused_until, limiter.backed_off)
+
+    def test_persistent_throttling_raises(self):
+        request = httpx.Request("GET", "https://sumo-api.com/api/kimarite")
+        responses = [
+            httpx.Response(503, headers={"Retry-After": "0"}, request=request)
+            for _ in range(MAX_ATTEMPTS)
+        ]
+        client = self.make_client(responses)
+        with patch("libs.sumoapi.httpx.AsyncClient", return_value=client):
+            api = SumoApiClient(limiter=AdaptiveLimiter(window=8))
+            with self.assertRaises(SumoApiError):
+                self.run_async(api.get_kimarite_list())
+        self.assertEqual(client.calls, MAX_ATTEMPTS)
+
+    def test_timeouts_are_retried(self):
+        request = httpx.Request("GET", "https://sumo-api.com/api/kimarite")
+        results = [
+            httpx.ReadTimeout("slow"),
+            httpx.Response(200, json={"ok": True}, request=request),
+        ]
+
+        class Client:
+            async def get(self, *args, **kwargs):
+                result = results.pop(0)
+                if isinstance(result, Exception):
+                    raise result
+                return result
+
+            async def aclose(self):
+                pass
+
+        with (
+            patch("libs.sumoapi.httpx.AsyncClient", return_value=Client()),
+            patch("libs.sumoapi.RETRY_BACKOFF", 0.01),
+        ):
+            api = SumoApiClient(limiter=AdaptiveLimiter(window=8))
+            data = self.run_async(api.get_kimarite_list())
+        self.assertEqual(data, {"ok": True})
+
+    def test_rate_from_environment(self):
+        with (
+            patch.dict("os.environ", {"SUMO_API_RATE": "2.5"}),
+            patch("libs.sumoapi.httpx.AsyncClient"),
+        ):
+            self.assertEqual(SumoApiClient().limiter.rate, 2.5)
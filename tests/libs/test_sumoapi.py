@@ -4,13 +4,14 @@ from unittest.mock import patch
 import httpx
 from django.test import SimpleTestCase
 
-from libs.sumoapi import SumoApiClient, SumoApiError
+from libs.sumoapi import MAX_ATTEMPTS, SumoApiClient, SumoApiError
 
 
 class DummyResponse:
     def __init__(self, data):
         self._data = data
         self.status_code = 200
+        self.headers = httpx.Headers()
 
     def json(self):
         return self._data
@@ -131,7 +132,7 @@ class SumoApiClientTests(SimpleTestCase):
             async def get(self, *args, **kwargs):
                 self.calls += 1
                 if self.calls == 1:
-                    raise httpx.HTTPError("boom")
+                    raise httpx.ConnectError("boom")
                 if self.calls == 2:
                     return DummyResponse({"records": [1]})
                 return DummyResponse({"records": []})
@@ -165,24 +166,29 @@ class SumoApiClientTests(SimpleTestCase):
             self.run_async(api.__aexit__(None, None, None))
 
     def test_retries_fail_at_limit(self):
-        """_get_with_retries should re-raise when attempts are exhausted."""
+        """Transport errors are retried once per attempt, then raised."""
 
         class AlwaysFailClient:
+            calls = 0
+
             async def get(self, *args, **kwargs):
-                raise httpx.HTTPError("boom")
+                self.calls += 1
+                raise httpx.ConnectError("boom")
 
             async def aclose(self):
                 pass
 
-        with patch(
-            "libs.sumoapi.httpx.AsyncClient",
-            return_value=AlwaysFailClient(),
+        client = AlwaysFailClient()
+        with (
+            patch("libs.sumoapi.httpx.AsyncClient", return_value=client),
+            patch("libs.sumoapi.RETRY_BACKOFF", 0.001),
         ):
             api = SumoApiClient()
             self.run_async(api.__aenter__())
             with self.assertRaises(SumoApiError):
                 self.run_async(api.get_all_rikishi())
             self.run_async(api.__aexit__(None, None, None))
+        self.assertEqual(client.calls, MAX_ATTEMPTS)
 
     def test_env_base_url_override(self):
         """Environment variable should override the default base URL."""
@@ -195,3 +201,62 @@ class SumoApiClientTests(SimpleTestCase):
             mock_client.assert_called_with(
                 base_url="https://example.test", timeout=30.0
             )
+
+
+class PagedClient:
+    """Serve ``/rikishis`` pages from ``records`` and track concurrency."""
+
+    def __init__(self, records, total):
+        self.records = records
+        self.total = total
+        self.skips = []
+        self.active = 0
+        self.peak = 0
+
+    async def get(self, endpoint, **kwargs):
+        query = dict(p.split("=") for p in endpoint.split("?")[1].split("&"))
+        skip, limit = int(query["skip"]), int(query["limit"])
+        self.skips.append(skip)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01 if skip else 0)
+        self.active -= 1
+        return DummyResponse(
+            {"total": self.total, "records": self.records[skip : skip + limit]}
+        )
+
+    async def aclose(self):
+        pass
+
+
+class RikishiPaginationTests(SimpleTestCase):
+    def run_async(self, coro):
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def fetch(self, client, **kwargs):
+        with patch("libs.sumoapi.httpx.AsyncClient", return_value=client):
+            api = SumoApiClient()
+            return self.run_async(api.get_all_rikishi(**kwargs))
+
+    def test_pages_fetched_concurrently_in_order(self):
+        client = PagedClient(list(range(95)), total=95)
+        result = self.fetch(client, page_size=10, concurrency=4)
+        self.assertEqual(result, list(range(95)))
+        self.assertEqual(sorted(client.skips), list(range(0, 100, 10)))
+        self.assertEqual(client.peak, 4)
+
+    def test_walks_on_when_total_is_stale(self):
+        client = PagedClient(list(range(35)), total=20)
+        result = self.fetch(client, page_size=10, concurrency=4)
+        self.assertEqual(result, list(range(35)))
+        self.assertEqual(client.skips, [0, 10, 20, 30, 40])
+
+    def test_iter_pages_yields_each_page(self):
+        client = PagedClient(list(range(25)), total=25)
+
+        async def collect(api):
+            return [page async for page in api.iter_rikishi_pages(10)]
+
+        with patch("libs.sumoapi.httpx.AsyncClient", return_value=client):
+            pages = self.run_async(collect(SumoApiClient()))
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
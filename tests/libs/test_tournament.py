@@ -0,0 +1,98 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from libs.tournament import (
+    _pair_day,
+    make_schedule,
+    pair_indices,
+    simulate_basho,
+    simulate_round_robin,
+)
+
+
+class PairIndicesTests(SimpleTestCase):
+    def test_excludes_stablemates(self):
+        i, j = pair_indices(["a", "a", None, None, "b"])
+        pairs = set(zip(i.tolist(), j.tolist(), strict=True))
+        self.assertNotIn((0, 1), pairs)
+        self.assertIn((2, 3), pairs)
+        self.assertEqual(len(pairs), 9)
+
+
+class SimulateRoundRobinTests(SimpleTestCase):
+    def setUp(self):
+        self.prob = np.array(
+            [[0.5, 0.9, 0.7], [0.1, 0.5, 0.4], [0.3, 0.6, 0.5]]
+        )
+
+    def test_seed_is_reproducible(self):
+        first = simulate_round_robin(self.prob, 500, seed=3, chunk_size=64)
+        second = simulate_round_robin(self.prob, 500, seed=3)
+        np.testing.assert_array_equal(first[0], second[0])
+
+    def test_converges_to_expected_wins(self):
+        wins, bouts = simulate_round_robin(self.prob, 20000, seed=1)
+        self.assertEqual(bouts.tolist(), [40000, 40000, 40000])
+        self.assertEqual(wins.sum(), 3 * 20000)
+        expected = np.array([1.6, 0.5, 0.9]) / 2
+        np.testing.assert_allclose(wins / bouts, expected, atol=0.01)
+
+    def test_pairs_subset(self):
+        pairs = (np.array([0]), np.array([2]))
+        wins, bouts = simulate_round_robin(self.prob, 100, pairs, seed=0)
+        self.assertEqual(bouts.tolist(), [100, 0, 100])
+        self.assertEqual(wins[1], 0)
+
+
+class MakeScheduleTests(SimpleTestCase):
+    def test_fifteen_fresh_opponents_outside_own_heya(self):
+        heya = [f"h{k % 8}" for k in range(24)]
+        east, west = make_schedule(heya, rng=0)
+        bouts = np.bincount(east, minlength=24) + np.bincount(
+            west, minlength=24
+        )
+        self.assertEqual(bouts.tolist(), [15] * 24)
+        pairs = {tuple(sorted(p)) for p in zip(east, west, strict=True)}
+        self.assertEqual(len(pairs), len(east))
+        for a, b in pairs:
+            self.assertNotEqual(heya[a], heya[b])
+
+    def test_opponents_are_close_on_banzuke(self):
+        east, west = make_schedule([None] * 41, window=3, rng=1)
+        self.assertFalse((east == west).any())
+        bouts = np.bincount(np.concatenate([east, west]), minlength=41)
+        self.assertLessEqual(bouts.max(), 15)
+        self.assertLess(np.abs(east - west).mean(), 12)
+        first_day = slice(0, 20)
+        self.assertLess(np.abs(east - west)[first_day].mean(), 4)
+
+    def test_rematch_uses_closest_allowed_opponent(self):
+        banned = np.eye(5, dtype=bool)
+        met = banned.copy()
+        met[3, :] = met[:, 3] = True
+        pairs, rematches = _pair_day(met, banned, 3, np.random.default_rng(0))
+        self.assertEqual(rematches, 1)
+        self.assertIn((2, 3), pairs)
+
+
+class SimulateBashoTests(SimpleTestCase):
+    def setUp(self):
+        strength = np.linspace(1, -1, 16)
+        diff = strength[:, None] - strength[None, :]
+        self.prob = 1 / (1 + np.exp(-diff))
+        self.heya = [f"h{k % 6}" for k in range(16)]
+
+    def test_probabilities(self):
+        result = simulate_basho(self.prob, self.heya, 400, seed=5, batch=50)
+        self.assertAlmostEqual(result["yusho"].sum(), 1.0)
+        self.assertTrue((result["kachi_koshi"] <= 1).all())
+        self.assertGreater(result["wins"][0], result["wins"][-1])
+        self.assertGreater(result["yusho"][0], result["yusho"][-1])
+
+    def test_workers_do_not_change_results(self):
+        serial = simulate_basho(self.prob, self.heya, 300, seed=2, batch=50)
+        pooled = simulate_basho(
+            self.prob, self.heya, 300, seed=2, workers=2, batch=50
+        )
+        for key, values in serial.items():
+            np.testing.assert_allclose(values, pooled[key])